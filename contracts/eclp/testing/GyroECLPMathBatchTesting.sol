@@ -0,0 +1,88 @@
+// SPDX-License-Identifier: LicenseRef-Gyro-1.0
+// for information on licensing please see the README in the GitHub repository <https://github.com/gyrostable/concentrated-lps>.
+
+pragma solidity 0.7.6;
+pragma experimental ABIEncoderV2;
+
+import "../GyroECLPMath.sol";
+import "./GyroECLPMathTesting.sol";
+
+/** @dev Batch versions of GyroECLPMathTesting functions, to compare many inputs against the python implementation in a
+ * single call (see `tests/support/batch_call.py`).
+ *
+ * Each item is evaluated by an external call to `math`, so a revert only affects that item. The returned `errors[i]` is
+ * empty if item i succeeded, its revert reason if it reverted with one, and NO_REASON otherwise (e.g., invalid opcode or
+ * out of gas). Each item gets at most ITEM_GAS gas, so that an item that consumes all its gas (as failing asserts and
+ * divisions by 0 do) doesn't starve the remaining items. A batch can therefore use up to ITEM_GAS per item; the default
+ * batch size in batch_call.py is chosen such that this fits the gas limit of calls.
+ */
+contract GyroECLPMathBatchTesting {
+    string public constant NO_REASON = "NO_REASON";
+    uint256 public constant ITEM_GAS = 500_000;
+
+    GyroECLPMathTesting public immutable math;
+
+    struct InvariantInput {
+        uint256[] balances;
+        GyroECLPMath.Params params;
+        GyroECLPMath.DerivedParams derived;
+    }
+
+    struct SwapInput {
+        uint256[] balances;
+        uint256 amount;
+        bool tokenInIsToken0;
+        GyroECLPMath.Params params;
+        GyroECLPMath.DerivedParams derived;
+        GyroECLPMath.Vector2 invariant;
+    }
+
+    constructor(GyroECLPMathTesting _math) {
+        math = _math;
+    }
+
+    function calculateInvariantWithErrorBatch(InvariantInput[] memory inputs)
+        external
+        view
+        returns (
+            int256[] memory invariants,
+            int256[] memory errs,
+            string[] memory errors
+        )
+    {
+        invariants = new int256[](inputs.length);
+        errs = new int256[](inputs.length);
+        errors = new string[](inputs.length);
+        for (uint256 i = 0; i < inputs.length; i++) {
+            InvariantInput memory input = inputs[i];
+            try math.calculateInvariantWithError{gas: ITEM_GAS}(input.balances, input.params, input.derived) returns (
+                int256 invariant,
+                int256 err
+            ) {
+                invariants[i] = invariant;
+                errs[i] = err;
+            } catch Error(string memory reason) {
+                errors[i] = reason;
+            } catch {
+                errors[i] = NO_REASON;
+            }
+        }
+    }
+
+    function calcOutGivenInBatch(SwapInput[] memory inputs) external view returns (uint256[] memory amountsOut, string[] memory errors) {
+        amountsOut = new uint256[](inputs.length);
+        errors = new string[](inputs.length);
+        for (uint256 i = 0; i < inputs.length; i++) {
+            SwapInput memory input = inputs[i];
+            try
+                math.calcOutGivenIn{gas: ITEM_GAS}(input.balances, input.amount, input.tokenInIsToken0, input.params, input.derived, input.invariant)
+            returns (uint256 amountOut) {
+                amountsOut[i] = amountOut;
+            } catch Error(string memory reason) {
+                errors[i] = reason;
+            } catch {
+                errors[i] = NO_REASON;
+            }
+        }
+    }
+}
@@ -0,0 +1,33 @@
+import random
+import sys
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(__file__)))
+
+from tests.geclp.eclp_pool_simulator import Swap, benchmark_swaps
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParamsQD
+
+# Throughput of simulated ECLP swap sequences with the incremental vs. the from-scratch invariant calculation.
+# Run via:
+# $ brownie run $0 main [n_swaps]
+
+
+def main(n_swaps=1000):
+    params = ECLPMathParamsQD(
+        alpha=D("0.97"),
+        beta=D("1.02"),
+        c=D("0.707106781186547524"),
+        s=D("0.707106781186547524"),
+        l=D("200"),
+    )
+    balances = [D(1_000_000), D(1_000_000)]
+    rng = random.Random(0)
+    swaps = [
+        Swap(D(rng.uniform(0, 10_000)), rng.random() < 0.5, rng.random() < 0.5)
+        for _ in range(int(n_swaps))
+    ]
+    res = benchmark_swaps(params, balances, swaps, D("0.0002"))
+    print(f"from scratch: {res['from_scratch']:.0f} swaps/s")
+    print(f"incremental:  {res['incremental']:.0f} swaps/s")
+    print(f"speedup:      {res['speedup']:.2f}x")
@@ -0,0 +1,24 @@
+import sys
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(__file__)))
+
+from tests.geclp.eclp_derived_params import (
+    DEFAULT_PATH,
+    POOL_CONFIGS_DIR,
+    DerivedParamsStore,
+)
+
+# Regenerates the on-disk cache of ECLP derived params for all ECLP pools in config/pools.
+# Run via:
+# $ brownie run $0 main [config_dir] [outputfile.json]
+# Must be re-run whenever eclp_prec_implementation.calc_derived_values() changes.
+
+
+def main(config_dir=POOL_CONFIGS_DIR, outfile=DEFAULT_PATH):
+    store = DerivedParamsStore(maxsize=None)
+    n = store.add_pool_configs(config_dir)
+    store.save(outfile)
+    print(
+        f"Wrote derived params for {len(store)} parameter sets ({n} ECLP pools) to {outfile}"
+    )
@@ -11,6 +11,7 @@ from tests.g2clp import math_implementation as g2clp_mimpl
 
 from tests.geclp import eclp_prec_implementation
 from tests.geclp import eclp_derivatives
+from tests.geclp import eclp_derived_params
 
 gyro_two_math_testing = accounts[0].deploy(Gyro2CLPMathTesting)
 gyro_three_math_testing = accounts[0].deploy(Gyro3CLPMathTesting)
@@ -35,7 +36,7 @@ def calc_eclp_test_results():
 
     # NOTE: The SOR tests (in the SOR repo) uses `tokenInIsToken0=true`, i.e., xin and yout.
 
-    derived = eclp_prec_implementation.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     invariant, inv_err = eclp_prec_implementation.calculateInvariantWithError(
         balances, params, derived
     )
@@ -129,7 +130,7 @@ def calc_eclp_test_results_solidity():
 
     # NOTE: The SOR tests (in the SOR repo) uses `tokenInIsToken0=true`, i.e., xin and yout.
 
-    derived = eclp_prec_implementation.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     invariant, inv_err = eclp_prec_implementation.calculateInvariantWithError(
         balances, params, derived
     )
@@ -355,7 +356,7 @@ def calc_rate_scaled_eclp_test_results():
 
     # NOTE: The SOR tests (in the SOR repo) uses `tokenInIsToken0=true`, i.e., xin and yout.
 
-    derived = eclp_prec_implementation.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     invariant, inv_err = eclp_prec_implementation.calculateInvariantWithError(
         balances, params, derived
     )
@@ -382,15 +383,13 @@ def calc_rate_scaled_eclp_test_results():
     print("--- should correctly calculate limit amount for swap exact out")
     print(balances[1] / ratey)
 
+    sor_context = eclp_derivatives.SORContext(balances, params, fee, r_vec)
+
     print("--- should correctly calculate normalized liquidity ---")
-    print(
-        D(1)
-        / ratey
-        * eclp_derivatives.normalized_liquidity_xin(balances, params, fee, r_vec)
-    )
+    print(D(1) / ratey * sor_context.normalized_liquidity_xin)
 
     print("--- should match universal normalized liquidity calculation ---")
-    print(D(1) / (ratey * eclp_derivatives.dpy_dxin(balances, params, fee, r_vec)))
+    print(D(1) / (ratey * sor_context.dpy_dxin))
 
     print("--- should correctly calculate swap amount for swap exact in ---")
     amount_in = D(10) * ratex
@@ -1,8 +1,20 @@
-from typing import Dict, List, Callable, TypeVar
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
 
-T = TypeVar("T")
+# Prices are resolved through a PriceSource: CoingeckoSource by default, or, if the PRICES_FILE environment variable is
+# set, JsonFileSource with that file (to run offline or reproducibly). The coingecko catalogues (coins and asset
+# platforms) are cached on disk in CACHE_DIR for CATALOGUE_TTL seconds; prices are only cached in-process.
+
+API_URL = "https://api.coingecko.com/api/v3"
+CACHE_DIR = Path(__file__).parents[1] / "build" / "coingecko"
+CATALOGUE_TTL = 24 * 3600
 
 LEGACY_MAPPINGS = {
     "0x9c9e5fd8bbc25984b178fdce6117defa39d2db39": "0xdab529f40e671a1d4bf91361c21bf9f0c9712ab7",
@@ -13,61 +25,162 @@ COIN_IDS = {
 }
 
 
-def get_asset_platforms():
-    r = requests.get("https://api.coingecko.com/api/v3/asset_platforms")
+def _get_json(path: str) -> Any:
+    r = requests.get(f"{API_URL}/{path}")
     r.raise_for_status()
     return r.json()
 
 
+def _cached_json(name: str, fetch: Callable[[], Any], ttl: float = CATALOGUE_TTL):
+    filename = CACHE_DIR / name
+    if filename.exists() and time.time() - filename.stat().st_mtime <= ttl:
+        with open(filename) as f:
+            return json.load(f)
+    data = fetch()
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Replace atomically, so that concurrent runs never read a partial file.
+    tmp_filename = filename.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_filename, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_filename, filename)
+    return data
+
+
+def get_asset_platforms() -> List[dict]:
+    return _cached_json("asset_platforms.json", lambda: _get_json("asset_platforms"))
+
+
 def get_coins() -> List[dict]:
-    r = requests.get(
-        "https://api.coingecko.com/api/v3/coins/list?include_platform=true"
+    return _cached_json(
+        "coins.json", lambda: _get_json("coins/list?include_platform=true")
     )
-    r.raise_for_status()
-    return r.json()
 
 
-def find(
-    haystack: List[T],
-    predicate: Callable[[T], bool],
-    error_msg: str = "could not find item in list",
-) -> T:
-    for item in haystack:
-        if predicate(item):
-            return item
-    raise ValueError(error_msg)
+class CoinIndex:
+    """Coingecko coin ids by asset platform and (case-insensitive) token address."""
+
+    def __init__(self, coins: List[dict], asset_platforms: List[dict]):
+        self.platform_ids: Dict[int, str] = {
+            p["chain_identifier"]: p["id"]
+            for p in asset_platforms
+            if p["chain_identifier"] is not None
+        }
+        self.coin_ids: Dict[Tuple[str, str], str] = {}
+        for coin in coins:
+            for platform_id, address in coin["platforms"].items():
+                # The first coin wins, like a linear search would.
+                if address:
+                    self.coin_ids.setdefault((platform_id, address.lower()), coin["id"])
+
+    def get_platform_id(self, chain_id: int) -> str:
+        if chain_id not in self.platform_ids:
+            raise ValueError(f"no coingecko asset platform for chain {chain_id}")
+        return self.platform_ids[chain_id]
+
+    def get_coin_id(self, address: str, platform_id: str) -> str:
+        coin_id = COIN_IDS.get(address)
+        if coin_id:
+            return coin_id
+        key = (platform_id, address.lower())
+        if key not in self.coin_ids:
+            raise ValueError(f"no coingecko coin for {address} on {platform_id}")
+        return self.coin_ids[key]
+
+
+@lru_cache(maxsize=None)
+def get_coin_index() -> CoinIndex:
+    return CoinIndex(get_coins(), get_asset_platforms())
 
 
 def get_asset_platform_id(chain_id: int) -> str:
-    asset_platforms = get_asset_platforms()
-    return find(asset_platforms, lambda x: x["chain_identifier"] == chain_id)["id"]
+    return get_coin_index().get_platform_id(chain_id)
 
 
 def get_coin_ids(addresses: List[str], platform_id: str) -> List[str]:
-    coins = get_coins()
-    coin_ids = []
-    for address in addresses:
-        coin_id = COIN_IDS.get(address)
-        if not coin_id:
-            coin_id = find(
-                coins,
-                lambda x: x["platforms"].get(platform_id, "").lower()
-                == address.lower(),
-            )["id"]
-        coin_ids.append(coin_id)
-    return coin_ids
+    index = get_coin_index()
+    return [index.get_coin_id(address, platform_id) for address in addresses]
+
+
+class PriceSource(ABC):
+    """Source of USD prices of tokens, by address."""
+
+    @abstractmethod
+    def get_prices(self, addresses: List[str], chain_id: int) -> Dict[str, float]:
+        ...
+
+
+class CoingeckoSource(PriceSource):
+    """Current prices from the coingecko API. Prices are cached for the lifetime of the object, so that processing
+    many pool configs only queries each token once."""
 
+    def __init__(self):
+        self._prices: Dict[Tuple[int, str], float] = {}
 
-def get_prices(addresses: List[str], chain_id: int = 1) -> Dict[str, float]:
+    def get_prices(self, addresses: List[str], chain_id: int) -> Dict[str, float]:
+        to_fetch = [a for a in addresses if (chain_id, a) not in self._prices]
+        if to_fetch:
+            platform_id = get_asset_platform_id(chain_id)
+            mapped_addresses = [LEGACY_MAPPINGS.get(a.lower(), a) for a in to_fetch]
+            coin_ids = get_coin_ids(mapped_addresses, platform_id)
+            formatted_ids = ",".join(sorted(set(coin_ids)))
+            results = _get_json(f"simple/price?ids={formatted_ids}&vs_currencies=usd")
+            for a, cid in zip(to_fetch, coin_ids):
+                self._prices[(chain_id, a)] = results[cid]["usd"]
+        return {a: self._prices[(chain_id, a)] for a in addresses}
+
+
+class FixedPriceSource(PriceSource):
+    """Fixed prices, given as {chain id: {address: price}}. Addresses are case-insensitive."""
+
+    def __init__(self, prices: Dict[int, Dict[str, float]], name: str = "fixed prices"):
+        self.name = name
+        self.prices: Dict[int, Dict[str, float]] = {
+            int(chain_id): {a.lower(): float(p) for a, p in chain_prices.items()}
+            for chain_id, chain_prices in prices.items()
+        }
+
+    def get_prices(self, addresses: List[str], chain_id: int) -> Dict[str, float]:
+        prices = self.prices.get(chain_id, {})
+        missing = [a for a in addresses if a.lower() not in prices]
+        if missing:
+            raise ValueError(
+                f"no prices for {', '.join(missing)} on chain {chain_id} in {self.name}"
+            )
+        return {a: prices[a.lower()] for a in addresses}
+
+
+class JsonFileSource(FixedPriceSource):
+    """Fixed prices from a JSON file of the form {chain id: {address: price}}."""
+
+    def __init__(self, filename: str):
+        with open(filename) as f:
+            super().__init__(json.load(f), filename)
+
+
+_default_source: Optional[PriceSource] = None
+
+
+def get_default_source() -> PriceSource:
+    global _default_source
+    if _default_source is None:
+        prices_file = os.environ.get("PRICES_FILE")
+        _default_source = (
+            JsonFileSource(prices_file) if prices_file else CoingeckoSource()
+        )
+    return _default_source
+
+
+def set_default_source(source: Optional[PriceSource]):
+    """None resets to the default."""
+    global _default_source
+    _default_source = source
+
+
+def get_prices(
+    addresses: List[str], chain_id: int = 1, source: Optional[PriceSource] = None
+) -> Dict[str, float]:
     if not addresses:
         return {}
-    asset_platform_id = get_asset_platform_id(chain_id)
-    mapped_addresses = [LEGACY_MAPPINGS.get(a.lower(), a) for a in addresses]
-    coin_ids = get_coin_ids(mapped_addresses, asset_platform_id)
-    formatted_ids = ",".join(coin_ids)
-    base_url = "https://api.coingecko.com/api/v3/simple/price"
-    url = f"{base_url}?ids={formatted_ids}&vs_currencies=usd"
-    r = requests.get(url)
-    r.raise_for_status()
-    results = r.json()
-    return {a: results[cid]["usd"] for a, cid in zip(addresses, coin_ids)}
+    if source is None:
+        source = get_default_source()
+    return source.get_prices(addresses, chain_id)
@@ -5,6 +5,7 @@ from decimal import Decimal
 import os
 from os import path
 import pprint
+from typing import Optional
 
 sys.path.insert(0, path.dirname(path.dirname(__file__)))
 
@@ -16,7 +17,7 @@ from tests.geclp import eclp_100 as mimpl
 from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
 
 from scripts.coingecko import get_prices
-from scripts.rate_providers import get_rates
+from scripts.rate_providers import get_rate_provider_addresses, get_rates
 from scripts.constants import DECIMALS, TOKEN_ADDRESSES
 from scripts.pool_utils import compute_bounds_sqrts
 
@@ -27,6 +28,9 @@ from icecream import ic
 
 # Run via:
 # $ brownie run --network=polygon-main $0 main <configfile.json> [outputfile.json]
+# or, for all pool configs at once, see scripts/plan_seeding.py.
+#
+# Prices come from coingecko, or from the file in the PRICES_FILE environment variable (see scripts/coingecko.py).
 
 # Environment price & amount info:
 # ONLY implemented for ECLP right now.
@@ -94,7 +98,10 @@ E_CLP_L_INIT = Decimal("2e-2")  # can set to w/e, choose so that x,y,z are small
 # initialize from portfolio value instead.
 
 
-def compute_amounts_2clp(pool_config: dict, chain_id: int):
+def compute_amounts_2clp(
+    pool_config: dict, chain_id: int, rates: Optional[list[Decimal]] = None
+):
+    """`rates` are read from the chain if not given."""
     tokens = pool_config["tokens"]
     assert len(tokens) == 2, "2CLP should have 2 tokens"
 
@@ -102,9 +109,8 @@ def compute_amounts_2clp(pool_config: dict, chain_id: int):
     dx, dy = [DECIMALS[t] for t in pool_config["tokens"]]
 
     # Rate scaling
-    rate_providers_dict = pool_config.get("rate_providers", dict())
-    rate_provider_addresses = [rate_providers_dict.get(k) for k in tokens]
-    rates = get_rates(rate_provider_addresses)
+    if rates is None:
+        rates = get_rates(get_rate_provider_addresses(pool_config))
     rx, ry = rates
 
     prices = get_prices_or_configured(tokens, token_addresses, rates, chain_id)
@@ -230,7 +236,10 @@ def compute_amounts_3clp(pool_config: dict, chain_id: int):
     }
 
 
-def compute_amounts_eclp(pool_config: dict, chain_id: int):
+def compute_amounts_eclp(
+    pool_config: dict, chain_id: int, rates: Optional[list[Decimal]] = None
+):
+    """`rates` are read from the chain if not given."""
     tokens = pool_config["tokens"]
 
     assert len(tokens) == 2, "ECLP should have 2 tokens"
@@ -239,9 +248,8 @@ def compute_amounts_eclp(pool_config: dict, chain_id: int):
     dx, dy = [DECIMALS[t] for t in tokens]
 
     # Rate scaling
-    rate_providers_dict = pool_config.get("rate_providers", dict())
-    rate_provider_addresses = [rate_providers_dict.get(k) for k in tokens]
-    rates = get_rates(rate_provider_addresses)
+    if rates is None:
+        rates = get_rates(get_rate_provider_addresses(pool_config))
     rx, ry = rates
 
     prices = get_prices_or_configured(tokens, token_addresses, rates, chain_id)
@@ -333,19 +341,27 @@ def compute_amounts_eclp(pool_config: dict, chain_id: int):
     }
 
 
+def compute_amounts(
+    pool_config: dict, chain_id: int, rates: Optional[list[Decimal]] = None
+):
+    """Initial amounts etc. for the pool config. `rates` (of the config's tokens) are read from the chain if not
+    given."""
+    pool_type = pool_config["pool_type"]
+    if pool_type == "eclp":
+        return compute_amounts_eclp(pool_config, chain_id, rates)
+    elif pool_type == "2clp":
+        return compute_amounts_2clp(pool_config, chain_id, rates)
+    elif pool_type == "3clp":
+        return compute_amounts_3clp(pool_config, chain_id)
+    else:
+        raise ValueError(f"invalid pool type {pool_type}")
+
+
 def main(config: str, output: str = None):
     chain_id = chain.id
     with open(config) as f:
         pool_config = json.load(f)
-        pool_type = pool_config["pool_type"]
-        if pool_type == "eclp":
-            result = compute_amounts_eclp(pool_config, chain_id)
-        elif pool_type == "2clp":
-            result = compute_amounts_2clp(pool_config, chain_id)
-        elif pool_type == "3clp":
-            result = compute_amounts_3clp(pool_config, chain_id)
-        else:
-            raise ValueError(f"invalid pool type {pool_type}")
+    result = compute_amounts(pool_config, chain_id)
     if output:
         pprint.pprint(result)
         with open(output, "w") as f:
@@ -0,0 +1,66 @@
+import os
+import sys
+from os import path
+
+from brownie import chain
+
+from scripts.gas_scenarios import DEPLOYERS, POOL_TYPES, measure
+from tests.support.gas_benchmark import (
+    compare,
+    format_comparison,
+    load_results,
+    save_results,
+)
+
+# Gas benchmark of the join / swap / exit scenarios of scripts/show_gas_usage_*.py, compared against the baselines in
+# analysis/gas/baselines. Baselines are only ever written by this script's "update" mode on a compiled project, so that
+# they include the gas of each function. Run on a local ganache via:
+# $ brownie run $0 main [pool types, comma-separated] [compare|update]
+#
+# Results are written to build/gas/<pool type>.json. With "update", they also replace the baselines. Otherwise, exits
+# with status 1 if a scenario's transaction or one of the functions it calls got more expensive than the tolerances
+# below allow, or if a scenario or the whole baseline of a pool type is missing.
+
+ROOT_DIR = path.join(path.dirname(__file__), "..")
+BASELINE_DIR = path.join(ROOT_DIR, "analysis", "gas", "baselines")
+RESULTS_DIR = path.join(ROOT_DIR, "build", "gas")
+
+# Changes are only reported if they exceed both.
+REL_TOLERANCE = 0.005
+ABS_TOLERANCE = 50
+
+
+def main(pool_types=",".join(POOL_TYPES), mode="compare"):
+    if mode not in ("compare", "update"):
+        raise ValueError(f"Unknown mode {mode}")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    failed = []
+    for pool_type in pool_types.split(","):
+        # Start from the same state as a fresh chain, so that addresses match the baseline.
+        chain.reset()
+        results, _, _ = measure(DEPLOYERS[pool_type]())
+        save_results(path.join(RESULTS_DIR, f"{pool_type}.json"), results)
+
+        baseline_file = path.join(BASELINE_DIR, f"{pool_type}.json")
+        print(f"----- {pool_type} -----\n")
+        if mode == "update":
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            save_results(baseline_file, results)
+            print(f"Updated {path.relpath(baseline_file, ROOT_DIR)}\n")
+            continue
+        if not path.exists(baseline_file):
+            print("No baseline, run with 'update' to create one.\n")
+            failed.append(pool_type)
+            continue
+        comparison = compare(
+            results, load_results(baseline_file), REL_TOLERANCE, ABS_TOLERANCE
+        )
+        print(format_comparison(comparison))
+        print()
+        if comparison.failed:
+            failed.append(pool_type)
+
+    if failed:
+        print(f"Gas regressions or missing baselines in: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,304 @@
+from math import cos, pi, sin
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+from brownie import (
+    accounts,
+    Authorizer,
+    Gyro2CLPMath,
+    Gyro2CLPMathTesting,
+    Gyro2CLPPool,
+    Gyro3CLPMath,
+    Gyro3CLPMathTesting,
+    Gyro3CLPPool,
+    GyroECLPMath,
+    GyroECLPMathTesting,
+    GyroECLPPool,
+    MockGyroConfig,
+    MockVault,
+    QueryProcessor,
+    SimpleERC20,
+)
+from brownie.network.transaction import TransactionReceipt
+
+from tests.conftest import scale_derived_values, scale_eclp_params
+from tests.geclp import eclp_prec_implementation
+from tests.support.gas_benchmark import BenchmarkResults, ScenarioResult
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import (
+    CallJoinPoolGyroParams,
+    ECLPMathParams,
+    ECLPPoolParams,
+    SwapKind,
+    SwapRequest,
+    ThreePoolFactoryCreateParams,
+    ThreePoolParams,
+    TwoPoolBaseParams,
+    TwoPoolParams,
+)
+from tests.support.trace_analyzer import Context, GasProfile, Tracer
+from tests.support.utils import scale, unscale
+
+# Deployment and join / swap / exit scenarios of the gas measurements, for use from brownie scripts.
+#
+# Setup and scenarios are the same as in scripts/show_gas_usage_{2clp,3clp,eclp}.py, including the order of
+# deployments: it determines the contract addresses, which (slightly) affect gas.
+
+POOL_TYPES = ("2clp", "3clp", "eclp")
+
+# All of these values are unscaled.
+SWAP_FEE_PERCENTAGE = D("0.1") / D(100)
+PROTOCOL_SWAP_FEE_PERCENTAGE = D("0.5") / D(100)
+TOKENS_PER_USER = 1000
+INIT_AMOUNT_IN = 100
+SWAP_AMOUNT = 10
+
+DEFAULT_2CLP_SQRT_ALPHA = D("0.97").sqrt()
+DEFAULT_2CLP_SQRT_BETA = D("1.02").sqrt()
+DEFAULT_3CLP_ROOT_3_ALPHA = D("0.97") ** (D(1) / D(3))
+DEFAULT_ECLP_PARAMS = ECLPMathParams(
+    alpha=D("0.97"),
+    beta=D("1.02"),
+    c=D(cos(45 / 360 * 2 * pi)),
+    s=D(sin(45 / 360 * 2 * pi)),
+    l=D("2"),
+)
+
+
+class PoolSetup(NamedTuple):
+    vault: object
+    pool: object
+    # Sorted by address, like in the vault
+    tokens: Tuple
+    users: Tuple
+
+
+def _deploy_vault(admin):
+    authorizer = admin.deploy(Authorizer, admin)
+    mock_vault = admin.deploy(MockVault, authorizer)
+    mock_gyro_config = admin.deploy(MockGyroConfig)
+    return mock_vault, mock_gyro_config
+
+
+def _deploy_two_tokens(users, amount: int):
+    tokens = [accounts[0].deploy(SimpleERC20) for _ in range(2)]
+    for user in users[:2]:
+        for token in tokens:
+            token.mint(user, amount)
+    return tuple(sorted(tokens, key=lambda t: t.address.lower()))
+
+
+def _two_pool_base_params(vault, tokens, name: str, symbol: str) -> TwoPoolBaseParams:
+    return TwoPoolBaseParams(
+        vault=vault.address,
+        name=name,
+        symbol=symbol,
+        token0=tokens[0].address,
+        token1=tokens[1].address,
+        swapFeePercentage=SWAP_FEE_PERCENTAGE * 10**18,
+        pauseWindowDuration=0,
+        bufferPeriodDuration=0,
+        owner=accounts[0],
+    )
+
+
+def deploy_2clp(
+    sqrt_alpha: D = DEFAULT_2CLP_SQRT_ALPHA, sqrt_beta: D = DEFAULT_2CLP_SQRT_BETA
+) -> PoolSetup:
+    admin = accounts[0]
+    users = (accounts[1], accounts[2], accounts[3])
+    mock_vault, mock_gyro_config = _deploy_vault(admin)
+    admin.deploy(Gyro2CLPMathTesting)
+    tokens = _deploy_two_tokens(users, TOKENS_PER_USER * 10**18)
+    # Not used in code, but needs to be deployed.
+    admin.deploy(QueryProcessor)
+    admin.deploy(Gyro2CLPMath)
+
+    args = TwoPoolParams(
+        baseParams=_two_pool_base_params(mock_vault, tokens, "Gyro2CLPPool", "GTP"),
+        sqrtAlpha=scale(sqrt_alpha),
+        sqrtBeta=scale(sqrt_beta),
+    )
+    pool = admin.deploy(Gyro2CLPPool, args, mock_gyro_config.address)
+    return PoolSetup(mock_vault, pool, tokens, users)
+
+
+def deploy_3clp(root_3_alpha: D = DEFAULT_3CLP_ROOT_3_ALPHA) -> PoolSetup:
+    admin = accounts[0]
+    users = (accounts[1], accounts[2], accounts[3])
+    mock_vault, mock_gyro_config = _deploy_vault(admin)
+    admin.deploy(Gyro3CLPMathTesting)
+    # Unused, but deployed by show_gas_usage_3clp.py as well
+    _deploy_two_tokens(users, scale(TOKENS_PER_USER))
+    tokens = [admin.deploy(SimpleERC20) for _ in range(3)]
+    for user in users[:2]:
+        for token in tokens:
+            token.mint(user, scale(TOKENS_PER_USER))
+    tokens = tuple(sorted(tokens, key=lambda t: t.address.lower()))
+    # Not used in code, but needs to be deployed.
+    admin.deploy(QueryProcessor)
+    admin.deploy(Gyro3CLPMath)
+
+    args = ThreePoolParams(
+        vault=mock_vault.address,
+        config=ThreePoolFactoryCreateParams(
+            name="Gyro3CLPPool",
+            symbol="G3P",
+            tokens=list(tokens),
+            swapFeePercentage=scale(SWAP_FEE_PERCENTAGE),
+            owner=admin,
+            root3Alpha=scale(root_3_alpha),
+        ),
+        config_address=mock_gyro_config.address,
+    )
+    pool = admin.deploy(Gyro3CLPPool, args)
+    return PoolSetup(mock_vault, pool, tokens, users)
+
+
+def deploy_eclp(params: Optional[ECLPMathParams] = None) -> PoolSetup:
+    """`params` are unscaled."""
+    if params is None:
+        params = DEFAULT_ECLP_PARAMS
+    admin = accounts[0]
+    users = (accounts[1], accounts[2], accounts[3])
+    # For experiments with external library calls. Not normally needed.
+    admin.deploy(GyroECLPMath)
+    mock_vault, mock_gyro_config = _deploy_vault(admin)
+    admin.deploy(GyroECLPMathTesting)
+    tokens = _deploy_two_tokens(users, TOKENS_PER_USER * 10**18)
+    # Not used in code, but needs to be deployed.
+    admin.deploy(QueryProcessor)
+    admin.deploy(GyroECLPMath)
+
+    derived_params = eclp_prec_implementation.calc_derived_values(params)
+    args = ECLPPoolParams(
+        _two_pool_base_params(mock_vault, tokens, "GyroECLPTwoPool", "GCTP"),
+        scale_eclp_params(params),
+        scale_derived_values(derived_params),
+    )
+    pool = admin.deploy(
+        GyroECLPPool, args, mock_gyro_config.address, gas_limit=11250000
+    )
+    return PoolSetup(mock_vault, pool, tokens, users)
+
+
+DEPLOYERS = {"2clp": deploy_2clp, "3clp": deploy_3clp, "eclp": deploy_eclp}
+
+
+def deploy_from_config(pool_config: dict) -> PoolSetup:
+    """Mock setup with the pool parameters from a config/pools/*.json file. Tokens, fees, rate providers, caps etc. are
+    those of the default setup."""
+    pool_type = pool_config["pool_type"]
+    if pool_type == "eclp":
+        params = {k: D(str(v)) for k, v in pool_config["params"].items()}
+        return deploy_eclp(ECLPMathParams(**params))
+    if pool_type == "3clp":
+        return deploy_3clp(D(str(pool_config["root_3_alpha"])))
+    if pool_type == "2clp":
+        if "sqrts" in pool_config:
+            sqrt_alpha, sqrt_beta = (D(v) for v in pool_config["sqrts"])
+        else:
+            sqrt_alpha, sqrt_beta = (D(v).sqrt() for v in pool_config["bounds"])
+        return deploy_2clp(sqrt_alpha, sqrt_beta)
+    raise ValueError(f"Unknown pool type {pool_type}")
+
+
+def _join(
+    setup: PoolSetup, user, balances, amounts_in, bpt_amount_out
+) -> TransactionReceipt:
+    return setup.vault.callJoinPoolGyro(
+        CallJoinPoolGyroParams(
+            setup.pool.address,
+            setup.pool.getPoolId(),
+            user,
+            user,
+            balances,  # current balances
+            0,
+            PROTOCOL_SWAP_FEE_PERCENTAGE * 10**18,
+            amounts_in,
+            bpt_amount_out,
+        )
+    )
+
+
+def _join_proportional(setup: PoolSetup, supply_fraction: D) -> TransactionReceipt:
+    (_, balances) = setup.vault.getPoolTokens(setup.pool.getPoolId())
+    bpt_amount_out = unscale(setup.pool.totalSupply()) * supply_fraction
+    # amounts in not used outside init
+    return _join(
+        setup,
+        setup.users[1],
+        balances,
+        [0] * len(setup.tokens),
+        scale(bpt_amount_out),
+    )
+
+
+def _swap(setup: PoolSetup, i: int, j: int) -> TransactionReceipt:
+    pool_id = setup.pool.getPoolId()
+    (_, balances) = setup.vault.getPoolTokens(pool_id)
+    swap_request = SwapRequest(
+        kind=SwapKind.GivenIn,
+        tokenIn=setup.tokens[i].address,
+        tokenOut=setup.tokens[j].address,
+        amount=scale(SWAP_AMOUNT),
+        poolId=pool_id,
+        lastChangeBlock=0,
+        from_aux=setup.users[1],
+        to=setup.users[1],
+        userData=(0).to_bytes(32, "big"),
+    )
+    return setup.vault.callMinimalGyroPoolSwap(
+        setup.pool.address, swap_request, balances[i], balances[j]
+    )
+
+
+def _exit(setup: PoolSetup, balance_fraction: D) -> TransactionReceipt:
+    (_, balances) = setup.vault.getPoolTokens(setup.pool.getPoolId())
+    bpt_amount_in = unscale(setup.pool.balanceOf(setup.users[0])) * balance_fraction
+    return setup.vault.callExitPoolGyro(
+        setup.pool.address,
+        0,
+        setup.users[0],
+        setup.users[0],
+        balances,
+        0,
+        0,
+        bpt_amount_in,
+    )
+
+
+def run_scenarios(setup: PoolSetup) -> Iterator[Tuple[str, TransactionReceipt]]:
+    """Runs the scenarios one after the other (each starts from the state left by the previous one) and yields
+    (label, transaction)."""
+    n_tokens = len(setup.tokens)
+    yield "1: Join (Initial)", _join(
+        setup,
+        setup.users[0],
+        (0,) * n_tokens,  # current balances
+        scale([INIT_AMOUNT_IN] * n_tokens),
+        0,  # amount_out not used for init
+    )
+    yield "2: Join (Non-Initial After Initial)", _join_proportional(setup, D("0.2"))
+    yield "3: Swap (After Join)", _swap(setup, 0, 1)
+    # The 3CLP swaps between the other pair of tokens.
+    yield "4: Swap (After Swap)", _swap(setup, *((1, 2) if n_tokens == 3 else (0, 1)))
+    yield "5: Join (After Swap)", _join_proportional(setup, D("1.2"))
+    yield "6: Swap (Again After Join)", _swap(setup, 0, 1)
+    yield "7: Exit (After Swap)", _exit(setup, D("0.7"))
+
+
+def measure(
+    setup: PoolSetup,
+) -> Tuple[BenchmarkResults, Dict[str, Context], Dict[str, GasProfile]]:
+    """Runs the scenarios and traces their transactions. Must be called after all contracts are deployed. Contexts and
+    profiles only include the transactions the Tracer could process."""
+    tracer = Tracer.load()
+    results, contexts, profiles = {}, {}, {}
+    for label, tx in run_scenarios(setup):
+        # The gas tracer isn't super reliable; we still get the totals without it.
+        try:
+            contexts[label], profiles[label] = tracer.profile_tx(tx)
+        except Exception as e:
+            print(f"{label}: tracer failed ({e!r})")
+        results[label] = ScenarioResult.from_tx(tx.gas_used, contexts.get(label))
+    return results, contexts, profiles
@@ -0,0 +1,225 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from tabulate import tabulate
+
+from tests.support.gas_benchmark import BenchmarkResults, results_to_json
+from tests.support.trace_analyzer import Context, GasProfile, merge_contexts
+
+# Runs the gas scenarios of scripts/gas_scenarios.py for many pool setups in parallel. Each worker process starts its
+# own local chain (on its own port) and runs one setup at a time on it, resetting the chain in between.
+#
+# Run via:
+# $ python $0 [setups ...] [-n WORKERS] [--base-port PORT] [--output FILE] [--trees] [--profile-dir DIR]
+#
+# A setup is a pool config (e.g., config/pools/eclp-wsteth-weth.json), of which only the pool parameters are used, or a
+# pool type (2clp, 3clp, eclp) for the default setup of scripts/gas_benchmark.py. The default is all ECLP configs.
+#
+# Gas used by each scenario and setup is written to --output (in the format of the gas benchmark, per setup) and
+# printed as a table. Per pool type, the traces of each scenario are merged across setups: --trees prints the merged
+# call trees and --profile-dir writes the merged gas profiles as collapsed stacks (for flamegraph.pl, inferno or
+# speedscope).
+
+ROOT_DIR = Path(__file__).parents[1]
+DEFAULT_OUTPUT = ROOT_DIR / "build" / "gas" / "sweep.json"
+DEFAULT_BASE_PORT = 8600
+
+
+class GasJob(NamedTuple):
+    name: str
+    pool_type: str
+    # None for the default setup of the pool type
+    pool_config: Optional[dict]
+
+
+class JobResult(NamedTuple):
+    job: GasJob
+    results: BenchmarkResults
+    contexts: Dict[str, Context]
+    profiles: Dict[str, GasProfile]
+    # Set if deployment or one of the scenarios failed
+    error: Optional[str]
+    duration: float
+
+
+def make_jobs(setups: List[str]) -> List[GasJob]:
+    jobs = []
+    for setup in setups:
+        if setup in ("2clp", "3clp", "eclp"):
+            jobs.append(GasJob(f"{setup} (default)", setup, None))
+            continue
+        with open(setup) as f:
+            pool_config = json.load(f)
+        jobs.append(GasJob(Path(setup).stem, pool_config["pool_type"], pool_config))
+    return jobs
+
+
+def _init_worker(ports: "multiprocessing.Queue"):
+    from brownie import network, project
+    from brownie._config import CONFIG
+
+    # Already compiled by the main process, so this only loads the build artifacts.
+    project.load(ROOT_DIR)
+    CONFIG.networks["development"]["cmd_settings"]["port"] = ports.get()
+    network.connect("development")
+
+
+def run_job(job: GasJob, with_profiles: bool) -> JobResult:
+    # Only importable once the project is loaded.
+    from brownie import chain
+
+    from scripts.gas_scenarios import DEPLOYERS, deploy_from_config, measure
+
+    start = time.perf_counter()
+    # Every setup starts from a fresh chain, so that addresses (which slightly affect gas) are the same everywhere.
+    chain.reset()
+    try:
+        if job.pool_config is None:
+            setup = DEPLOYERS[job.pool_type]()
+        else:
+            setup = deploy_from_config(job.pool_config)
+        results, contexts, profiles = measure(setup)
+        error = None
+    except Exception as e:
+        results, contexts, profiles = {}, {}, {}
+        error = f"{type(e).__name__}: {e}"
+    if not with_profiles:
+        profiles = {}
+    return JobResult(
+        job, results, contexts, profiles, error, time.perf_counter() - start
+    )
+
+
+def merge_by_pool_type(job_results: List[JobResult]):
+    """Returns {pool type: {scenario: (number of setups, merged context, merged profile)}}."""
+    merged = {}
+    for pool_type in sorted({r.job.pool_type for r in job_results}):
+        by_scenario: Dict[str, List[JobResult]] = {}
+        for r in job_results:
+            if r.job.pool_type != pool_type:
+                continue
+            for label in r.contexts:
+                by_scenario.setdefault(label, []).append(r)
+        merged[pool_type] = {}
+        for label, rs in sorted(by_scenario.items()):
+            profile = GasProfile()
+            for r in rs:
+                if label in r.profiles:
+                    profile.update(r.profiles[label])
+            context = merge_contexts([r.contexts[label] for r in rs])
+            merged[pool_type][label] = (len(rs), context, profile)
+    return merged
+
+
+def write_output(filename: Path, job_results: List[JobResult]):
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        r.job.name: {
+            "pool_type": r.job.pool_type,
+            "error": r.error,
+            "results": results_to_json(r.results),
+        }
+        for r in job_results
+    }
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def format_summary(job_results: List[JobResult]) -> str:
+    labels = sorted({label for r in job_results for label in r.results})
+    rows = [
+        (
+            r.job.name,
+            *(
+                r.results[label].gas_used if label in r.results else ""
+                for label in labels
+            ),
+            f"{r.duration:.0f}s",
+            r.error or "",
+        )
+        for r in job_results
+    ]
+    headers = ("Setup", *(label.split(":")[0] for label in labels), "Time", "Error")
+    legend = "\n".join(labels)
+    return tabulate(rows, headers=headers) + "\n\n" + legend
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure the gas scenarios for many pool setups on parallel local chains."
+    )
+    parser.add_argument(
+        "setups",
+        nargs="*",
+        default=sorted(map(str, (ROOT_DIR / "config" / "pools").glob("eclp-*.json"))),
+    )
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--trees", action="store_true")
+    parser.add_argument("--profile-dir", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    jobs = make_jobs(args.setups)
+    n_workers = min(args.workers, len(jobs))
+
+    # Compile once up front, so that the workers don't all compile (and write the build directory) at the same time.
+    from brownie import project
+
+    project.load(ROOT_DIR).close()
+
+    # Workers are spawned, not forked, so that each one loads the project and connects to the network on its own.
+    mp_context = multiprocessing.get_context("spawn")
+    ports = mp_context.Queue()
+    for i in range(n_workers):
+        ports.put(args.base_port + i)
+
+    print(f"Running {len(jobs)} setups on {n_workers} local chains")
+    start = time.perf_counter()
+    job_results = []
+    with ProcessPoolExecutor(
+        n_workers, mp_context=mp_context, initializer=_init_worker, initargs=(ports,)
+    ) as executor:
+        futures = [
+            executor.submit(run_job, job, args.profile_dir is not None) for job in jobs
+        ]
+        for future in as_completed(futures):
+            r = future.result()
+            print(
+                f"{r.job.name}: {'failed' if r.error else 'done'} ({r.duration:.0f}s)"
+            )
+            job_results.append(r)
+    job_results.sort(key=lambda r: jobs.index(r.job))
+
+    write_output(args.output, job_results)
+    print()
+    print(format_summary(job_results))
+    print(f"\nWrote {args.output} in {time.perf_counter() - start:.0f}s")
+
+    for pool_type, scenarios in merge_by_pool_type(job_results).items():
+        for label, (n_setups, context, profile) in scenarios.items():
+            if args.trees:
+                print(
+                    f"\n----- {pool_type} / {label}, summed over {n_setups} setups -----\n"
+                )
+                print(context.format())
+            if args.profile_dir is not None:
+                args.profile_dir.mkdir(parents=True, exist_ok=True)
+                name = f"{pool_type}-{label.split(':')[0]}.folded"
+                profile.write_collapsed_stacks(args.profile_dir / name, leaf="line")
+
+    return 1 if any(r.error for r in job_results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from brownie import chain
+from icecream import ic
+
+from scripts import coingecko
+from scripts.compute_supply import compute_amounts
+from scripts.constants import TOKEN_ADDRESSES
+from scripts.rate_providers import get_pool_config_rates
+
+# Computes the seed data (initial amounts, see compute_supply.py) for all pool configs in config/pools whose tokens are
+# known on the current chain, and writes it to config/pools/seed-data/<config>-<network>.json.
+#
+# Run via:
+# $ brownie run --network=<network> $0 main [output dir] [overwrite: yes|no] [workers]
+#
+# Rates of all pools are read in one batch and the prices of all tokens are fetched once, up front. The amounts are
+# then computed on a pool of worker processes. The PRICE_* environment variables of compute_supply.py apply to all
+# pools, and PRICES_FILE (see coingecko.py) works as well.
+#
+# Existing seed data is only overwritten with "overwrite" = yes, since it records the amounts that pools were actually
+# seeded with.
+
+ROOT_DIR = Path(__file__).parents[1]
+POOL_CONFIG_DIR = ROOT_DIR / "config" / "pools"
+SEED_DATA_DIR = POOL_CONFIG_DIR / "seed-data"
+
+# Suffix of the seed data files on each chain
+NETWORK_SUFFIXES = {
+    1: "mainnet",
+    10: "optimism",
+    137: "polygon",
+    1101: "zkevm",
+    42161: "arbitrum",
+}
+
+
+class SeedJob(NamedTuple):
+    name: str
+    pool_config: dict
+    rates: List[Decimal]
+    output: Path
+
+
+def load_pool_configs(config_dir: Path, chain_id: int) -> Dict[str, dict]:
+    """{config file name without extension: config} for the configs whose tokens are known on the chain, except those
+    whose name ends in the suffix of another network."""
+    known_tokens = TOKEN_ADDRESSES.get(chain_id, {})
+    suffix = NETWORK_SUFFIXES.get(chain_id)
+    other_suffixes = tuple(f"-{s}" for s in NETWORK_SUFFIXES.values() if s != suffix)
+    ret = {}
+    for filename in sorted(config_dir.glob("*.json")):
+        # Configs for other networks can have tokens that are known here as well.
+        if filename.stem.endswith(other_suffixes):
+            continue
+        with open(filename) as f:
+            pool_config = json.load(f)
+        if all(t in known_tokens for t in pool_config["tokens"]):
+            ret[filename.stem] = pool_config
+    return ret
+
+
+def seed_data_path(output_dir: Path, name: str, chain_id: int) -> Path:
+    suffix = NETWORK_SUFFIXES.get(chain_id, str(chain_id))
+    if not name.endswith(f"-{suffix}"):
+        name = f"{name}-{suffix}"
+    return output_dir / f"{name}.json"
+
+
+def existing_seed_data(output_dir: Path, name: str, chain_id: int) -> Optional[Path]:
+    """The seed data file of the config, if there is one. Older seed data is stored as <config>.json, without the
+    network suffix."""
+    for path in (
+        seed_data_path(output_dir, name, chain_id),
+        output_dir / f"{name}.json",
+    ):
+        if path.exists():
+            return path
+    return None
+
+
+def price_addresses(pool_config: dict, chain_id: int) -> List[str]:
+    """Addresses of the tokens whose prices compute_supply.py fetches for the pool config. This respects the
+    PRICE_XXX and PRICE_XXX_VIA_RATE environment variables, which the 3CLP ignores."""
+    addresses = TOKEN_ADDRESSES[chain_id]
+    if pool_config["pool_type"] == "3clp":
+        return [addresses[t] for t in pool_config["tokens"]]
+    ret = []
+    for token in pool_config["tokens"]:
+        if os.environ.get(f"PRICE_{token}") is not None:
+            continue
+        via = os.environ.get(f"PRICE_{token}_VIA_RATE")
+        ret.append(addresses[via] if via is not None else addresses[token])
+    return ret
+
+
+def prefetch_prices(pool_configs: List[dict], chain_id: int) -> Dict[str, float]:
+    addresses = sorted(
+        {a for cfg in pool_configs for a in price_addresses(cfg, chain_id)}
+    )
+    try:
+        return coingecko.get_prices(addresses, chain_id)
+    except ValueError:
+        pass
+    # Some token has no price. Fetch per pool, so that only the pools with that token fail.
+    prices = {}
+    for cfg in pool_configs:
+        try:
+            prices.update(
+                coingecko.get_prices(price_addresses(cfg, chain_id), chain_id)
+            )
+        except ValueError as e:
+            print(f"{cfg['name']}: no prices ({e})")
+    return prices
+
+
+def _init_worker(chain_id: int, prices: Dict[str, float]):
+    ic.disable()
+    coingecko.set_default_source(
+        coingecko.FixedPriceSource({chain_id: prices}, "prefetched prices")
+    )
+
+
+def run_job(job: SeedJob, chain_id: int) -> Optional[str]:
+    """Computes and writes the seed data. Returns an error message if that failed."""
+    try:
+        result = compute_amounts(job.pool_config, chain_id, job.rates)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    with open(job.output, "w") as f:
+        json.dump(result, f, indent=2)
+    return None
+
+
+def main(output_dir: str = str(SEED_DATA_DIR), overwrite="no", workers=None):
+    chain_id = chain.id
+    output_dir = Path(output_dir)
+    overwrite = overwrite in ("yes", "true", "1")
+    n_workers = int(workers) if workers else os.cpu_count()
+
+    pool_configs = load_pool_configs(POOL_CONFIG_DIR, chain_id)
+    outputs = {
+        name: seed_data_path(output_dir, name, chain_id) for name in pool_configs
+    }
+    if not overwrite:
+        existing = {
+            name: existing_seed_data(output_dir, name, chain_id)
+            for name in pool_configs
+        }
+        for name, path in existing.items():
+            if path is not None:
+                print(f"{name}: skipped, {path.name} exists")
+        pool_configs = {
+            name: cfg for name, cfg in pool_configs.items() if existing[name] is None
+        }
+    if not pool_configs:
+        print(f"Nothing to do for chain {chain_id}")
+        return
+
+    start = time.perf_counter()
+    rates = get_pool_config_rates(list(pool_configs.values()))
+    prices = prefetch_prices(list(pool_configs.values()), chain_id)
+    print(
+        f"Read rates and prices for {len(pool_configs)} pools in {time.perf_counter() - start:.1f}s"
+    )
+
+    jobs = [
+        SeedJob(name, cfg, pool_rates, outputs[name])
+        for (name, cfg), pool_rates in zip(pool_configs.items(), rates)
+    ]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # The workers don't talk to the chain, so forking a connected process is fine.
+    mp_context = multiprocessing.get_context("fork")
+    failed = []
+    with ProcessPoolExecutor(
+        min(n_workers, len(jobs)),
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(chain_id, prices),
+    ) as executor:
+        futures = {executor.submit(run_job, job, chain_id): job for job in jobs}
+        for future in as_completed(futures):
+            job, error = futures[future], future.result()
+            if error:
+                failed.append(job.name)
+                print(f"{job.name}: failed ({error})")
+            else:
+                print(f"{job.name}: wrote {job.output.name}")
+
+    print(
+        f"\nWrote seed data for {len(jobs) - len(failed)} of {len(jobs)} pools in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
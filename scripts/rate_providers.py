@@ -1,18 +1,94 @@
-from brownie import *
+import time
 from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from brownie import *
 
 # This has to be run from inside brownie with the appropriate network.
+#
+# Rates are read in batches through brownie's multicall (Multicall2 at the address configured for the network; on
+# development networks, brownie deploys one). Rates read within the last RATE_CACHE_TTL seconds are served from an
+# in-process cache, so scripts that process many pool configs only query each rate provider once.
+
+RATE_CACHE_TTL = 30.0
+# Calls per eth_call. Rate providers are cheap, but some wrap other contracts.
+MULTICALL_BATCH_SIZE = 100
 
+# (chain id, address) -> (time read, rate)
+_rate_cache: Dict[Tuple[int, str], Tuple[float, Decimal]] = {}
 
-def get_rates(rate_provider_addresses) -> list[Decimal]:
-    """Get rates from a list of IRateProvider addresses."""
-    ret = []
-    for address in rate_provider_addresses:
-        if address:
-            c = interface.IRateProvider(address)
-            rate = c.getRate()
+
+def clear_rate_cache():
+    _rate_cache.clear()
+
+
+def _read_uncached(addresses: List[str]) -> Dict[str, Decimal]:
+    ret = {}
+    for start in range(0, len(addresses), MULTICALL_BATCH_SIZE):
+        batch = addresses[start : start + MULTICALL_BATCH_SIZE]
+        with multicall():
+            results = [interface.IRateProvider(a).getRate() for a in batch]
+        for address, rate in zip(batch, results):
+            # Failed calls come back as None, wrapped in a proxy (so `is None` doesn't work).
+            if rate == None:  # noqa: E711
+                raise ValueError(f"getRate() failed for rate provider {address}")
             # Rates are always 18-decimal.
-            ret.append(Decimal(rate) / Decimal(10**18))
+            ret[address] = Decimal(int(rate)) / Decimal(10**18)
+    return ret
+
+
+def read_rates(
+    rate_provider_addresses: Iterable[str], ttl: float = RATE_CACHE_TTL
+) -> Dict[str, Decimal]:
+    """Rates of a set of IRateProvider addresses. Only those not read within the last `ttl` seconds are queried, in
+    as few calls as possible."""
+    now = time.monotonic()
+    chain_id = chain.id
+    ret = {}
+    to_read = []
+    for address in dict.fromkeys(rate_provider_addresses):
+        cached = _rate_cache.get((chain_id, address))
+        if cached is not None and now - cached[0] < ttl:
+            ret[address] = cached[1]
         else:
-            ret.append(Decimal(1))
+            to_read.append(address)
+    if to_read:
+        rates = _read_uncached(to_read)
+        for address, rate in rates.items():
+            _rate_cache[(chain_id, address)] = (now, rate)
+        ret.update(rates)
     return ret
+
+
+def get_rates(
+    rate_provider_addresses: List[Optional[str]], ttl: float = RATE_CACHE_TTL
+) -> List[Decimal]:
+    """Get rates from a list of IRateProvider addresses. Tokens without a rate provider (None) have rate 1."""
+    rates = read_rates([a for a in rate_provider_addresses if a], ttl)
+    return [rates[a] if a else Decimal(1) for a in rate_provider_addresses]
+
+
+def get_rate_provider_addresses(pool_config: dict) -> List[Optional[str]]:
+    """Rate provider of each token of a pool config (config/pools/*.json), in the order of its "tokens"; None if the
+    token has none. "rate_providers" is either a dict by token name or a list in token order, where ZERO_ADDRESS stands
+    for no rate provider."""
+    rate_providers = pool_config.get("rate_providers", dict())
+    if isinstance(rate_providers, list):
+        if len(rate_providers) != len(pool_config["tokens"]):
+            raise ValueError(
+                f"{len(rate_providers)} rate providers for {len(pool_config['tokens'])} tokens"
+            )
+        return [a if a != ZERO_ADDRESS else None for a in rate_providers]
+    return [rate_providers.get(t) for t in pool_config["tokens"]]
+
+
+def get_pool_config_rates(
+    pool_configs: List[dict], ttl: float = RATE_CACHE_TTL
+) -> List[List[Decimal]]:
+    """Rates of the tokens of each of the given pool configs (config/pools/*.json), in the order of their "tokens".
+    The rate providers of all configs are read together."""
+    addresses_by_config = [get_rate_provider_addresses(cfg) for cfg in pool_configs]
+    rates = read_rates((a for addrs in addresses_by_config for a in addrs if a), ttl)
+    return [
+        [rates[a] if a else Decimal(1) for a in addrs] for addrs in addresses_by_config
+    ]
@@ -0,0 +1,274 @@
+import argparse
+import contextlib
+import hashlib
+import importlib
+import inspect
+import io
+import math
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+sys.path.insert(0, path.dirname(path.dirname(__file__)))
+
+import brownie.test
+import hypothesis
+from brownie._config import CONFIG
+from brownie.test.managers.runner import RevertContextManager
+from hypothesis import HealthCheck, Phase, settings
+
+# Runs the hypothesis property tests that don't use any fixtures (and therefore can't touch the chain) across a
+# process pool, outside of brownie's test runner.
+#
+# Run via:
+# $ python $0 [paths ...] [-n WORKERS] [--seed SEED] [--shards SHARDS] [--max-examples N] [-k SUBSTRING]
+#
+# Paths are test files or directories (default: tests). A test is "pure" if it is a hypothesis test whose remaining
+# arguments (after @given) are empty. Each test is split into `--shards` shards that run with distinct, deterministic
+# seeds derived from `--seed`, the test id and the shard index, and the test's max_examples is divided among them.
+# `--max-examples` replaces max_examples for all tests, including those that set their own with @settings.
+# Explicit @example()s only run in shard 0. Modules that can only be imported inside `brownie test` with a loaded project
+# (e.g., they import contract types) are skipped.
+#
+# brownie.test.given is replaced by plain hypothesis.given in this process and the workers: brownie's version only
+# adds chain snapshots around each example, which pure tests don't need (and which need a network connection).
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+class Unit(NamedTuple):
+    module: str
+    name: str
+    shard: int
+    n_shards: int
+    seed: int
+    # Overrides the test's max_examples if not None
+    max_examples: Optional[int] = None
+
+    @property
+    def test_id(self) -> str:
+        return f"{self.module}::{self.name}"
+
+
+class Result(NamedTuple):
+    unit: Unit
+    passed: bool
+    duration: float
+    output: str
+
+
+def _patch_brownie():
+    """The parts of brownie's test runner setup that pure tests need."""
+    brownie.test.given = hypothesis.given
+    brownie.reverts = RevertContextManager
+
+
+def _load_profile(max_examples: Optional[int]):
+    """Same defaults as `brownie test`."""
+    cfg = CONFIG.settings["hypothesis"]
+    settings.register_profile(
+        "pure-parallel",
+        deadline=cfg["deadline"],
+        max_examples=max_examples or cfg["max_examples"],
+        report_multiple_bugs=cfg["report_multiple_bugs"],
+        stateful_step_count=cfg["stateful_step_count"],
+        phases=[p for p in Phase if cfg["phases"].get(p.name, True)],
+        database=None,
+        # Timings are meaningless when all cores are busy.
+        suppress_health_check=[HealthCheck.too_slow],
+    )
+    settings.load_profile("pure-parallel")
+
+
+def _init_worker(max_examples: Optional[int]):
+    _patch_brownie()
+    _load_profile(max_examples)
+
+
+def _is_skipped(fn) -> bool:
+    for mark in getattr(fn, "pytestmark", []):
+        if mark.name == "skip":
+            return True
+        if mark.name == "skipif" and any(
+            c is True for c in mark.args + (mark.kwargs.get("condition"),)
+        ):
+            return True
+    return False
+
+
+def _is_pure_property_test(fn) -> bool:
+    return (
+        getattr(fn, "is_hypothesis_test", False)
+        and len(inspect.signature(fn).parameters) == 0
+        and not _is_skipped(fn)
+    )
+
+
+def _module_names(paths: List[str]) -> List[str]:
+    files = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.rglob("test_*.py")) if p.is_dir() else [p])
+    return [
+        ".".join(f.resolve().relative_to(ROOT_DIR).with_suffix("").parts) for f in files
+    ]
+
+
+def _shard_seed(base_seed: int, test_id: str, shard: int) -> int:
+    digest = hashlib.sha256(f"{base_seed}:{test_id}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def discover(paths: List[str], keyword: Optional[str] = None):
+    """Returns (test ids, {module: reason it was skipped})."""
+    tests, skipped = [], {}
+    for module in _module_names(paths):
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                mod = importlib.import_module(module)
+        except Exception as e:
+            skipped[module] = f"{type(e).__name__}: {e}"
+            continue
+        for name, fn in vars(mod).items():
+            if not name.startswith("test_") or not _is_pure_property_test(fn):
+                continue
+            if keyword is not None and keyword not in f"{module}::{name}":
+                continue
+            tests.append((module, name))
+    return tests, skipped
+
+
+def run_unit(unit: Unit) -> Result:
+    fn = getattr(importlib.import_module(unit.module), unit.name)
+    # A worker can run several shards of the same test, so always start from the test's own settings.
+    if not hasattr(fn, "_pure_original_settings"):
+        fn._pure_original_settings = fn._hypothesis_internal_use_settings
+    current = fn._pure_original_settings
+    phases = current.phases
+    if unit.shard > 0:
+        phases = [p for p in phases if p != Phase.explicit]
+    # Same mechanism as hypothesis.seed(), which we can't apply twice to the same function.
+    fn._hypothesis_internal_use_seed = unit.seed
+    max_examples = unit.max_examples or current.max_examples
+    fn._hypothesis_internal_use_settings = settings(
+        current,
+        max_examples=max(1, math.ceil(max_examples / unit.n_shards)),
+        phases=phases,
+        database=None,
+        suppress_health_check=list(current.suppress_health_check)
+        + [HealthCheck.too_slow],
+    )
+
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        try:
+            fn()
+            passed = True
+        except Exception:
+            traceback.print_exc()
+            passed = False
+    return Result(unit, passed, time.perf_counter() - start, out.getvalue())
+
+
+def _falsifying_example(output: str) -> str:
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("Falsifying example"):
+            end = next(
+                (j for j in range(i + 1, len(lines)) if lines[j] == ")"), len(lines)
+            )
+            return "\n".join(lines[i : end + 1])
+    return ""
+
+
+def report(results: List[Result], skipped: dict, elapsed: float, file=sys.stdout):
+    by_test = {}
+    for r in results:
+        by_test.setdefault(r.unit.test_id, []).append(r)
+
+    failed = {k: rs for k, rs in by_test.items() if not all(r.passed for r in rs)}
+    for test_id, rs in sorted(by_test.items()):
+        status = "FAILED" if test_id in failed else "passed"
+        print(f"{status:6} {test_id} ({sum(r.duration for r in rs):.1f}s)", file=file)
+
+    for test_id, rs in sorted(failed.items()):
+        failures = sorted(
+            (r for r in rs if not r.passed),
+            # Prefer the smallest (most shrunk) falsifying example across shards.
+            key=lambda r: (
+                len(_falsifying_example(r.output)) or math.inf,
+                r.unit.shard,
+            ),
+        )
+        print(f"\n{'=' * 30} {test_id} {'=' * 30}", file=file)
+        print(
+            f"{len(failures)}/{len(rs)} shards failed, seeds: "
+            + ", ".join(f"{r.unit.seed} (shard {r.unit.shard})" for r in failures),
+            file=file,
+        )
+        print(failures[0].output, file=file)
+        others = {_falsifying_example(r.output) for r in failures[1:]}
+        others -= {"", _falsifying_example(failures[0].output)}
+        for example in sorted(others, key=len):
+            print(f"Also failing:\n{example}", file=file)
+
+    if skipped:
+        print(
+            f"\nSkipped {len(skipped)} modules that can't be imported here:", file=file
+        )
+        for module, reason in sorted(skipped.items()):
+            print(f"  {module}: {reason}", file=file)
+
+    n_failed_shards = sum(not r.passed for r in results)
+    print(
+        f"\n{len(by_test) - len(failed)} passed, {len(failed)} failed "
+        f"({len(results)} shards, {n_failed_shards} failed) in {elapsed:.1f}s",
+        file=file,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run pure-Python hypothesis property tests across a process pool."
+    )
+    parser.add_argument("paths", nargs="*", default=["tests"])
+    parser.add_argument("-n", "--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--max-examples", type=int, default=None)
+    parser.add_argument("-k", dest="keyword", default=None)
+    args = parser.parse_args(argv)
+
+    _init_worker(args.max_examples)
+    tests, skipped = discover(args.paths, args.keyword)
+    units = [
+        Unit(
+            module,
+            name,
+            shard,
+            args.shards,
+            _shard_seed(args.seed, f"{module}::{name}", shard),
+            args.max_examples,
+        )
+        for module, name in tests
+        for shard in range(args.shards)
+    ]
+    print(f"Running {len(tests)} pure property tests as {len(units)} shards")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(
+        args.workers, initializer=_init_worker, initargs=(args.max_examples,)
+    ) as executor:
+        for future in as_completed([executor.submit(run_unit, u) for u in units]):
+            results.append(future.result())
+    report(results, skipped, time.perf_counter() - start)
+    return 0 if all(r.passed for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import os
 from math import cos, sin, pi
 from pprint import pprint
 
@@ -130,6 +131,24 @@ mock_vault_pool = admin.deploy(
 # Set to an integer to only show that deep of traces. Nice to avoid visual overload.
 MAXLVL = None
 
+# Set to a directory to write, for each operation, the gas profile as collapsed stacks (for flamegraph.pl, inferno or
+# speedscope) and a per-line gas heatmap of GyroECLPMath.sol.
+PROFILE_DIR = None
+
+
+def write_profile(tracer, profile, label):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = label.split(":")[0]
+    profile.write_collapsed_stacks(
+        os.path.join(PROFILE_DIR, f"{name}.folded"), leaf="line"
+    )
+    source = tracer.sources.find_contract("GyroECLPMath")
+    with open(os.path.join(PROFILE_DIR, f"{name}-GyroECLPMath.txt"), "w") as f:
+        f.write(profile.format_line_heatmap(source))
+    print("Gas by opcode class:")
+    print(tabulate(profile.by_opcode_class().items()))
+    print()
+
 
 def main():
     poolId = mock_vault_pool.getPoolId()
@@ -165,7 +184,9 @@ def main():
         # The gas tracer isn't super reliable, so we just let it crash if it has to; we still get the totals without it
         # at least.
         try:
-            ctx = tracer.trace_tx(tx)
+            ctx, profile = tracer.profile_tx(tx)
+            if PROFILE_DIR is not None:
+                write_profile(tracer, profile, label)
             assert len(ctx.children) == 1
             ctx1 = ctx.children[0][1]
             summary_table.append(
@@ -64,6 +64,13 @@ def gyro_eclp_math_testing(admin, GyroECLPMathTesting, GyroECLPMath):
     return admin.deploy(GyroECLPMathTesting)
 
 
+@pytest.fixture(scope="module")
+def gyro_eclp_math_batch_testing(
+    admin, GyroECLPMathBatchTesting, gyro_eclp_math_testing
+):
+    return admin.deploy(GyroECLPMathBatchTesting, gyro_eclp_math_testing)
+
+
 @pytest.fixture(scope="module")
 def gyro_three_math_testing(admin, Gyro3CLPMathTesting):
     return admin.deploy(Gyro3CLPMathTesting)
@@ -3,11 +3,10 @@
 #
 # Run using `brownie test`.
 from copy import copy
-from typing import Union, Tuple
+from typing import Optional
 
 from brownie import *
 from brownie.test import given
-import pandas as pd
 from hypothesis import settings, example
 from hypothesis import strategies as st
 from toolz import groupby, first, second, valmap
@@ -15,13 +14,13 @@ from toolz import groupby, first, second, valmap
 from tests.geclp import util
 from tests.geclp import test_eclp_properties
 from tests.geclp.util import gen_params
+from tests.support.columnar import ColumnarWriter
 from tests.support.util_common import gen_balances, BasicPoolParameters
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.types import ECLPMathParams
 from tests.support.utils import qdecimals
 
-error_values: Union[None, list[dict]]  # None means disabled.
-error_values = None
+error_values: Optional[ColumnarWriter] = None  # None means disabled.
 
 bpool_params = BasicPoolParameters(min_balance_ratio=D("1e-5"))  # Almost a dummy
 
@@ -73,8 +72,6 @@ def my_test_calcOutGivenIn(
 
 def test_main(gyro_eclp_math_testing):
     global error_values
-    error_values = []
-    my_test_calcOutGivenIn(gyro_eclp_math_testing)
-
-    df = pd.DataFrame(error_values)
-    df.to_feather("data/errors_solidity.feather")
+    with ColumnarWriter("data/errors_solidity.feather") as error_values:
+        my_test_calcOutGivenIn(gyro_eclp_math_testing)
+    error_values = None
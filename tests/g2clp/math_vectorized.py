@@ -0,0 +1,157 @@
+"""Batch evaluation of the Gyro2CLPMath routines over NumPy arrays.
+
+Unlike `math_implementation`, which works on QuantizedDecimal scalars and checks its own assumptions, everything here
+operates on raw 18-decimal fixed-point integers (i.e., the uint256 values the contract sees) and reproduces the
+rounding of Gyro2CLPMath.sol and GyroPoolMath._sqrt() exactly, operation by operation. Inputs can be Python ints, int
+arrays or object arrays of ints and are broadcast against each other, so e.g. many balances can be evaluated against
+one set of price bounds. Results are object arrays of ints.
+
+Where the Solidity code would revert, the corresponding entry of the result is None. Overflow of uint256 intermediates
+is not checked; it can't occur for balances in the range supported by the pool.
+
+Use `from_decimals()` / `to_decimals()` to convert from / to QuantizedDecimal arrays. The fixed-point primitives live in
+`tests.libraries.fixed_point_vectorized`.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from tests.libraries.fixed_point_vectorized import (
+    ONE,
+    as_ints,
+    divDown,
+    divUp,
+    from_decimals,
+    mulDown,
+    mulUp,
+    or_none,
+    select,
+    sqrt,
+    to_decimals,
+)
+
+# GyroPoolMath._sqrt() is always called with this tolerance by the 2CLP.
+SQRT_TOLERANCE = 5
+
+
+### Gyro2CLPMath
+
+
+def calculateQuadraticTerms(
+    balances: Iterable, sqrtAlpha, sqrtBeta
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    x, y = (as_ints(b) for b in balances)
+    sqrtAlpha, sqrtBeta = as_ints(sqrtAlpha), as_ints(sqrtBeta)
+    a = ONE - divDown(sqrtAlpha, sqrtBeta)
+    mb = divDown(y, sqrtBeta) + mulDown(x, sqrtAlpha)
+    mc = mulDown(x, y)
+    bSquare = mulDown(mulDown(mulDown(x, x), sqrtAlpha), sqrtAlpha)
+    bSq2 = divDown(mulDown(mulDown(mulDown(x, y), 2 * ONE), sqrtAlpha), sqrtBeta)
+    bSq3 = divDown(mulDown(y, y), mulUp(sqrtBeta, sqrtBeta))
+    return a, mb, bSquare + bSq2 + bSq3, mc
+
+
+def calculateQuadratic(a, mb, bSquare, mc) -> np.ndarray:
+    """Same as Gyro2CLPMath._calculateQuadratic(), i.e., for the special case a > 0, b < 0, c <= 0."""
+    a, mb, bSquare, mc = as_ints(a), as_ints(mb), as_ints(bSquare), as_ints(mc)
+    # a <= 0 means sqrtAlpha >= sqrtBeta, where the contract reverts on the subtraction or division by zero.
+    ok = a > 0
+    denominator = mulUp(select(ok, a, 1), 2 * ONE)
+    addTerm = mulDown(mulDown(mc, 4 * ONE), a)
+    sqrResult = sqrt(select(ok, bSquare + addTerm, 0), SQRT_TOLERANCE)
+    ok &= sqrResult != None  # noqa: E711 (elementwise)
+    numerator = mb + select(ok, sqrResult, 0)
+    return or_none(ok, divDown(numerator, denominator))
+
+
+def calculateInvariant(balances: Iterable, sqrtAlpha, sqrtBeta) -> np.ndarray:
+    """`balances` is a pair (x, y) of arrays (or a (2, n) array)."""
+    return calculateQuadratic(*calculateQuadraticTerms(balances, sqrtAlpha, sqrtBeta))
+
+
+def calculateVirtualParameter0(invariant, sqrtBeta) -> np.ndarray:
+    return divDown(as_ints(invariant), as_ints(sqrtBeta))
+
+
+def calculateVirtualParameter1(invariant, sqrtAlpha) -> np.ndarray:
+    return mulDown(as_ints(invariant), as_ints(sqrtAlpha))
+
+
+def _virtualBalances(balanceIn, balanceOut, virtualOffsetIn, virtualOffsetOut):
+    virtInOver = balanceIn + mulUp(virtualOffsetIn, ONE + 2)
+    virtOutUnder = balanceOut + mulDown(virtualOffsetOut, ONE - 1)
+    return virtInOver, virtOutUnder
+
+
+def calcOutGivenIn(
+    balanceIn, balanceOut, amountIn, virtualOffsetIn, virtualOffsetOut
+) -> np.ndarray:
+    balanceIn, balanceOut, amountIn = (
+        as_ints(balanceIn),
+        as_ints(balanceOut),
+        as_ints(amountIn),
+    )
+    virtInOver, virtOutUnder = _virtualBalances(
+        balanceIn, balanceOut, as_ints(virtualOffsetIn), as_ints(virtualOffsetOut)
+    )
+    denominator = virtInOver + amountIn
+    nonzero = denominator != 0
+    amountOut = divDown(
+        mulDown(virtOutUnder, amountIn), select(nonzero, denominator, 1)
+    )
+    return or_none(nonzero & (amountOut <= balanceOut), amountOut)
+
+
+def calcInGivenOut(
+    balanceIn, balanceOut, amountOut, virtualOffsetIn, virtualOffsetOut
+) -> np.ndarray:
+    balanceIn, balanceOut, amountOut = (
+        as_ints(balanceIn),
+        as_ints(balanceOut),
+        as_ints(amountOut),
+    )
+    virtInOver, virtOutUnder = _virtualBalances(
+        balanceIn, balanceOut, as_ints(virtualOffsetIn), as_ints(virtualOffsetOut)
+    )
+    denominator = virtOutUnder - amountOut
+    ok = (amountOut <= balanceOut) & (denominator > 0)
+    amountIn = divUp(mulUp(virtInOver, amountOut), select(ok, denominator, 1))
+    return or_none(ok, amountIn)
+
+
+### Full swap quotes as in Gyro2CLPPool.onSwap(), without fees and scaling
+
+
+def _swapInputs(balances, tokenInIsToken0: bool, sqrtAlpha, sqrtBeta):
+    x, y = (as_ints(b) for b in balances)
+    invariant = calculateInvariant((x, y), sqrtAlpha, sqrtBeta)
+    ok = invariant != None  # noqa: E711 (elementwise)
+    invariant = select(ok, invariant, 0)
+    virtualParam0 = calculateVirtualParameter0(invariant, sqrtBeta)
+    virtualParam1 = calculateVirtualParameter1(invariant, sqrtAlpha)
+    if tokenInIsToken0:
+        return ok, (x, y, virtualParam0, virtualParam1)
+    return ok, (y, x, virtualParam1, virtualParam0)
+
+
+def quoteOutGivenIn(
+    balances: Iterable, amountIn, tokenInIsToken0: bool, sqrtAlpha, sqrtBeta
+) -> np.ndarray:
+    """Invariant, virtual parameters and calcOutGivenIn() in one go. `balances` and `amountIn` broadcast."""
+    ok, (balIn, balOut, vIn, vOut) = _swapInputs(
+        balances, tokenInIsToken0, sqrtAlpha, sqrtBeta
+    )
+    amountOut = calcOutGivenIn(balIn, balOut, amountIn, vIn, vOut)
+    return or_none(ok, amountOut)
+
+
+def quoteInGivenOut(
+    balances: Iterable, amountOut, tokenInIsToken0: bool, sqrtAlpha, sqrtBeta
+) -> np.ndarray:
+    """Invariant, virtual parameters and calcInGivenOut() in one go. `balances` and `amountOut` broadcast."""
+    ok, (balIn, balOut, vIn, vOut) = _swapInputs(
+        balances, tokenInIsToken0, sqrtAlpha, sqrtBeta
+    )
+    amountIn = calcInGivenOut(balIn, balOut, amountOut, vIn, vOut)
+    return or_none(ok, amountIn)
@@ -0,0 +1,118 @@
+import hypothesis.strategies as st
+from brownie import reverts
+from brownie.test import given
+from hypothesis import assume
+
+from tests.g2clp import math_implementation
+from tests.g2clp import math_vectorized as mv
+from tests.g2clp.test_math_implementations_match import faulty_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.utils import to_decimal
+
+billion_balance_strategy = st.integers(min_value=0, max_value=100_000_000_000)
+balances_strategy = st.tuples(billion_balance_strategy, billion_balance_strategy)
+sqrt_alpha_strategy = st.decimals(min_value="0.02", max_value="0.99995")
+sqrt_beta_strategy = st.decimals(min_value="1.00005", max_value="1.8")
+
+
+@given(
+    balances=st.lists(balances_strategy, min_size=1, max_size=10),
+    amounts=st.lists(st.decimals(min_value="0", max_value="1000000"), min_size=10),
+    sqrt_alpha=sqrt_alpha_strategy,
+    sqrt_beta=sqrt_beta_strategy,
+)
+def test_batch_matches_math_implementation(balances, amounts, sqrt_alpha, sqrt_beta):
+    assume(not any(faulty_params(b, sqrt_alpha, sqrt_beta) for b in balances))
+    sqrt_alpha, sqrt_beta = to_decimal(sqrt_alpha), to_decimal(sqrt_beta)
+    amounts = amounts[: len(balances)]
+
+    sqrt_params = mv.from_decimals([sqrt_alpha, sqrt_beta])
+    raw_amounts = mv.from_decimals(amounts)
+    xs, ys = mv.from_decimals(balances).T
+    invariants = mv.calculateInvariant((xs, ys), *sqrt_params)
+    amounts_out = mv.quoteOutGivenIn((xs, ys), raw_amounts, True, *sqrt_params)
+    amounts_in = mv.quoteInGivenOut((xs, ys), raw_amounts, True, *sqrt_params)
+
+    for (x, y), amount, invariant, amount_out, amount_in in zip(
+        [(D(x), D(y)) for x, y in balances],
+        to_decimal(amounts),
+        mv.to_decimals(invariants),
+        mv.to_decimals(amounts_out),
+        mv.to_decimals(amounts_in),
+    ):
+        invariant_py = math_implementation.calculateInvariant(
+            [x, y], sqrt_alpha, sqrt_beta
+        )
+        assert invariant == invariant_py.approxed(abs=D("5e-18"))
+
+        virtual_param0 = math_implementation.calculateVirtualParameter0(
+            invariant, sqrt_beta
+        )
+        virtual_param1 = math_implementation.calculateVirtualParameter1(
+            invariant, sqrt_alpha
+        )
+
+        # math_implementation rounds the final division of calcOutGivenIn() up, the contract rounds it down.
+        amount_out_py = math_implementation.calcOutGivenIn(
+            x, y, amount, virtual_param0, virtual_param1
+        )
+        if amount_out is None:
+            assert amount_out_py > y
+        else:
+            assert amount_out_py - D("1e-18") <= amount_out <= amount_out_py
+
+        if amount > y:
+            assert amount_in is None
+        elif y + virtual_param1 * (1 - D("1e-18")) > amount:
+            assert amount_in == math_implementation.calcInGivenOut(
+                x, y, amount, virtual_param0, virtual_param1
+            )
+
+
+@given(
+    balances=st.lists(balances_strategy, min_size=1, max_size=5),
+    amount=st.decimals(min_value="1", max_value="1000000"),
+    sqrt_alpha=sqrt_alpha_strategy,
+    sqrt_beta=sqrt_beta_strategy,
+)
+def test_batch_matches_contract(
+    gyro_two_math_testing, balances, amount, sqrt_alpha, sqrt_beta
+):
+    assume(not any(faulty_params(b, sqrt_alpha, sqrt_beta) for b in balances))
+    assume(all(x > 0 and y > 0 for x, y in balances))
+    sqrt_params = mv.from_decimals([sqrt_alpha, sqrt_beta])
+    xs, ys = mv.from_decimals(balances).T
+    amount = D(amount).raw_int
+
+    invariants = mv.calculateInvariant((xs, ys), *sqrt_params)
+    virtual_params0 = mv.calculateVirtualParameter0(invariants, sqrt_params[1])
+    virtual_params1 = mv.calculateVirtualParameter1(invariants, sqrt_params[0])
+    amounts_out = mv.calcOutGivenIn(xs, ys, amount, virtual_params0, virtual_params1)
+    amounts_in = mv.calcInGivenOut(xs, ys, amount, virtual_params0, virtual_params1)
+
+    for x, y, invariant, v0, v1, amount_out, amount_in in zip(
+        xs, ys, invariants, virtual_params0, virtual_params1, amounts_out, amounts_in
+    ):
+        assert invariant == gyro_two_math_testing.calculateInvariant(
+            [x, y], *sqrt_params
+        )
+        assert v0 == gyro_two_math_testing.calculateVirtualParameter0(
+            invariant, sqrt_params[1]
+        )
+        assert v1 == gyro_two_math_testing.calculateVirtualParameter1(
+            invariant, sqrt_params[0]
+        )
+        if amount_out is None:
+            with reverts():
+                gyro_two_math_testing.calcOutGivenIn(x, y, amount, v0, v1)
+        else:
+            assert amount_out == gyro_two_math_testing.calcOutGivenIn(
+                x, y, amount, v0, v1
+            )
+        if amount_in is None:
+            with reverts():
+                gyro_two_math_testing.calcInGivenOut(x, y, amount, v0, v1)
+        else:
+            assert amount_in == gyro_two_math_testing.calcInGivenOut(
+                x, y, amount, v0, v1
+            )
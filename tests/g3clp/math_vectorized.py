@@ -0,0 +1,192 @@
+"""Batch computation of the 3CLP invariant over many balance triples, exactly as Gyro3CLPMath._calculateInvariant().
+
+All values are raw 18-decimal fixed-point integers (see `tests.libraries.fixed_point_vectorized`). The Newton iteration
+of Gyro3CLPMath._runNewtonIteration() runs on all lanes simultaneously; each lane stops according to the contract's own
+stopping criterion, and later iterations only process the lanes that are still active. Results are bit-identical to the
+contract. Lanes where the contract would revert are None.
+
+Like the contract, this assumes root3Alpha within the bounds enforced by the pool, so that unchecked operations don't
+overflow.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from tests.libraries.fixed_point_vectorized import (
+    ONE,
+    as_ints,
+    divDown,
+    divDownLarge,
+    divUp,
+    from_decimals,
+    mulDown,
+    mulDownLargeSmall,
+    mulUp,
+    or_none,
+    select,
+    sqrt,
+    to_decimals,
+)
+
+_INVARIANT_SHRINKING_FACTOR_PER_STEP = 8
+_INVARIANT_MIN_ITERATIONS = 5
+_MAX_ITERATIONS = 255
+
+_MAX_BALANCES = 10**29
+_L_THRESHOLD_SIMPLE_NUMERICS = 2 * 10**31
+_L_MAX = 10**34
+_L_VS_LPLUS_MIN = 13 * 10**17
+
+SQRT_TOLERANCE = 5
+
+
+def calculateCubicTerms(
+    balances: Iterable, root3Alpha
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    x, y, z = (as_ints(b) for b in balances)
+    root3Alpha = as_ints(root3Alpha)
+    a = ONE - mulDown(mulDown(root3Alpha, root3Alpha), root3Alpha)
+    mb = mulDown(mulDown(x + y + z, root3Alpha), root3Alpha)
+    mc = mulDown(mulDown(x, y) + mulDown(y, z) + mulDown(z, x), root3Alpha)
+    md = mulDown(mulDown(x, y), z)
+    return a, mb, mc, md
+
+
+def calculateCubicStartingPoint(a, mb, mc) -> Tuple[np.ndarray, np.ndarray]:
+    """(l_lower, l0). None where GyroPoolMath._sqrt() fails."""
+    radic = mulUp(mb, mb) + mulUp(a, mc * 3)
+    sqrtRadic = sqrt(radic, SQRT_TOLERANCE)
+    ok = sqrtRadic != None  # noqa: E711 (elementwise)
+    lplus = divUp(mb + select(ok, sqrtRadic, 0), a * 3)
+    alpha = ONE - a
+    l0 = mulUp(lplus, select(alpha >= ONE // 2, 3 * ONE // 2, 2 * ONE))
+    l_lower = mulUp(lplus, _L_VS_LPLUS_MIN)
+    return or_none(ok, l_lower), or_none(ok, l0)
+
+
+def calcNewtonDelta(mb, mc, md, root3Alpha, rootEst) -> Tuple[np.ndarray, np.ndarray]:
+    """(deltaAbs, deltaIsPos) of Gyro3CLPMath._calcNewtonDelta(), without the range checks on rootEst. deltaAbs is
+    None where the contract reverts on a division by zero."""
+    rootEst2 = mulDown(rootEst, rootEst)
+
+    dfRootEst = mulDown(rootEst * 3, rootEst)
+    dfRootEst = dfRootEst - mulDown(
+        mulDown(mulDown(dfRootEst, root3Alpha), root3Alpha), root3Alpha
+    )
+    dfRootEst = dfRootEst - 2 * mulDown(rootEst, mb) - mc
+    # dfRootEst > 0 for rootEst >= l_lower unless all balances are 0.
+    ok = dfRootEst > 0
+    dfRootEst = select(ok, dfRootEst, 1)
+
+    simple = rootEst <= _L_THRESHOLD_SIMPLE_NUMERICS
+
+    deltaMinus = mulDown(rootEst2, rootEst)
+    deltaMinus = deltaMinus - mulDown(
+        mulDown(mulDown(deltaMinus, root3Alpha), root3Alpha), root3Alpha
+    )
+    deltaMinus = divDown(deltaMinus, dfRootEst)
+    deltaPlus = mulDown(rootEst2, mb)
+    deltaPlus = divDown(deltaPlus + mulDown(rootEst, mc), dfRootEst)
+    deltaPlus = deltaPlus + divDown(md, dfRootEst)
+
+    if not np.all(simple):
+        deltaMinusL = mulDownLargeSmall(rootEst2, rootEst)
+        deltaMinusL = deltaMinusL - mulDownLargeSmall(
+            mulDownLargeSmall(mulDownLargeSmall(deltaMinusL, root3Alpha), root3Alpha),
+            root3Alpha,
+        )
+        deltaMinusL = divDownLarge(deltaMinusL, dfRootEst)
+        deltaPlusL = mulDownLargeSmall(rootEst2, mb)
+        deltaPlusL = deltaPlusL + mulDown(mc, rootEst)
+        deltaPlusL = divDownLarge(deltaPlusL, dfRootEst, 10**12, 10**6)
+        deltaPlusL = deltaPlusL + divDown(md, dfRootEst)
+        deltaMinus = select(simple, deltaMinus, deltaMinusL)
+        deltaPlus = select(simple, deltaPlus, deltaPlusL)
+
+    deltaIsPos = deltaPlus >= deltaMinus
+    deltaAbs = select(deltaIsPos, deltaPlus - deltaMinus, deltaMinus - deltaPlus)
+    return or_none(ok, deltaAbs), deltaIsPos
+
+
+def runNewtonIteration(
+    mb, mc, md, root3Alpha, l_lower, rootEst
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Gyro3CLPMath._runNewtonIteration() on all lanes at once.
+
+    Returns (rootEst, iterations), where iterations is the number of Newton deltas computed per lane. rootEst is None
+    for lanes where the contract reverts."""
+    arrays = np.broadcast_arrays(
+        *(as_ints(v) for v in (mb, mc, md, root3Alpha, l_lower, rootEst))
+    )
+    shape = arrays[0].shape
+    # Work on flat copies so that lanes can be selected with a single index array.
+    mb, mc, md, root3Alpha, l_lower, rootEst = (v.ravel().copy() for v in arrays)
+    reverted = np.zeros(rootEst.shape, dtype=bool)
+    iterations = np.zeros(rootEst.shape, dtype=int)
+    deltaAbsPrev = np.zeros(rootEst.shape, dtype=object)
+    # Per-lane convergence mask. Inactive lanes are never touched again.
+    active = np.ones(rootEst.shape, dtype=bool)
+
+    for iteration in range(_MAX_ITERATIONS):
+        (ix,) = np.nonzero(active)
+        if len(ix) == 0:
+            break
+        l = rootEst[ix]
+        iterations[ix] += 1
+
+        outOfRange = ~((l <= _L_MAX) & (l >= l_lower[ix]))
+        deltaAbs, deltaIsPos = calcNewtonDelta(
+            mb[ix], mc[ix], md[ix], root3Alpha[ix], select(outOfRange, l_lower[ix], l)
+        )
+        outOfRange |= deltaAbs == None  # noqa: E711 (elementwise)
+        deltaAbs = select(outOfRange, 0, deltaAbs)
+
+        done = deltaAbs <= 1
+        if iteration >= _INVARIANT_MIN_ITERATIONS:
+            done |= deltaIsPos
+            done |= deltaAbs >= deltaAbsPrev[ix] // _INVARIANT_SHRINKING_FACTOR_PER_STEP
+        underflow = ~done & ~deltaIsPos & (deltaAbs > l)
+        revert = outOfRange | underflow
+
+        step = ~done & ~revert
+        deltaAbsPrev[ix] = deltaAbs
+        rootEst[ix] = select(
+            step,
+            select(deltaIsPos, l + deltaAbs, l - select(underflow, 0, deltaAbs)),
+            l,
+        )
+        reverted[ix] |= revert
+        active[ix] = step
+
+    # Lanes still active have run out of iterations: INVARIANT_DIDNT_CONVERGE
+    reverted |= active
+    return or_none(~reverted, rootEst).reshape(shape), iterations.reshape(shape)
+
+
+def calculateCubic(a, mb, mc, md, root3Alpha) -> Tuple[np.ndarray, np.ndarray]:
+    """(invariant, iterations)"""
+    l_lower, l0 = calculateCubicStartingPoint(a, mb, mc)
+    ok = l_lower != None  # noqa: E711 (elementwise)
+    rootEst, iterations = runNewtonIteration(
+        mb, mc, md, root3Alpha, select(ok, l_lower, 0), select(ok, l0, 0)
+    )
+    ok &= rootEst != None  # noqa: E711 (elementwise)
+    ok &= select(ok, rootEst, 0) <= _L_MAX
+    return or_none(ok, rootEst), iterations
+
+
+def calculateInvariantWithIterations(
+    balances: Iterable, root3Alpha
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Like calculateInvariant(), but also returns the number of Newton iterations for each lane."""
+    x, y, z = (as_ints(b) for b in balances)
+    ok = (x <= _MAX_BALANCES) & (y <= _MAX_BALANCES) & (z <= _MAX_BALANCES)
+    (a, mb, mc, md) = calculateCubicTerms((x, y, z), root3Alpha)
+    invariant, iterations = calculateCubic(a, mb, mc, md, root3Alpha)
+    return or_none(ok & (invariant != None), invariant), iterations  # noqa: E711
+
+
+def calculateInvariant(balances: Iterable, root3Alpha) -> np.ndarray:
+    """`balances` is a triple (x, y, z) of arrays (or a (3, n) array); `root3Alpha` is broadcast against them."""
+    return calculateInvariantWithIterations(balances, root3Alpha)[0]
@@ -0,0 +1,82 @@
+from typing import List, Tuple
+
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import example
+
+import tests.g3clp.v3_math_implementation as math_implementation
+from tests.g3clp import math_vectorized as mv
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.utils import qdecimals
+
+billion_balance_strategy = st.integers(min_value=0, max_value=100_000_000_000)
+balances_strategy = st.tuples(
+    billion_balance_strategy, billion_balance_strategy, billion_balance_strategy
+)
+
+ROOT_ALPHA_MAX = "0.99996666555"
+ROOT_ALPHA_MIN = "0.2"
+
+
+@given(
+    balances=st.lists(balances_strategy, min_size=1, max_size=10),
+    root_three_alpha=qdecimals(ROOT_ALPHA_MIN, ROOT_ALPHA_MAX),
+)
+@example(
+    balances=[(10**11, 10**11, 10**11), (0, 0, 0)],
+    root_three_alpha=ROOT_ALPHA_MAX,
+)
+def test_batch_invariant_matches_math_implementation(
+    balances: List[Tuple[int, int, int]], root_three_alpha
+):
+    root_three_alpha_raw = D(root_three_alpha).raw_int
+    invariants = mv.calculateInvariant(
+        mv.from_decimals(balances).T, root_three_alpha_raw
+    )
+    assert invariants.dtype == object
+
+    for b, invariant in zip(balances, mv.to_decimals(invariants)):
+        # Lanes are independent of each other.
+        assert mv.calculateInvariant(
+            mv.from_decimals(b), root_three_alpha_raw
+        ).item() == (None if invariant is None else invariant.raw_int)
+        if sum(b) == 0:
+            # Division by zero in the contract
+            assert invariant is None
+            continue
+        invariant_py = math_implementation.calculateInvariant(
+            [D(x) for x in b], D(root_three_alpha)
+        )
+        # The contract's Newton iteration loses a few decimals for very small invariants (balances ~1e-18 to 1).
+        assert invariant == invariant_py.approxed(rel=D("5e-18"), abs=D("1e-15"))
+
+    # Different root3Alpha per lane
+    root_three_alphas = np.array(
+        [root_three_alpha_raw - i for i in range(len(balances))], dtype=object
+    )
+    assert list(
+        mv.calculateInvariant(mv.from_decimals(balances).T, root_three_alphas)
+    ) == [
+        mv.calculateInvariant(mv.from_decimals(b), r).item()
+        for b, r in zip(balances, root_three_alphas)
+    ]
+
+
+@given(
+    balances=st.lists(balances_strategy, min_size=1, max_size=5),
+    root_three_alpha=qdecimals(ROOT_ALPHA_MIN, ROOT_ALPHA_MAX),
+)
+def test_batch_invariant_matches_contract(
+    gyro_three_math_testing, balances, root_three_alpha
+):
+    root_three_alpha_raw = D(root_three_alpha).raw_int
+    balances_raw = mv.from_decimals(balances)
+    invariants = mv.calculateInvariant(balances_raw.T, root_three_alpha_raw)
+
+    for b, invariant in zip(balances_raw, invariants):
+        if invariant is None:
+            continue
+        assert invariant == gyro_three_math_testing.calculateInvariant(
+            list(b), root_three_alpha_raw
+        )
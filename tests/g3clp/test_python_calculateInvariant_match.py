@@ -3,7 +3,8 @@ from typing import Iterable
 
 import pytest
 from brownie.test import given
-from hypothesis import settings, HealthCheck, example
+import hypothesis.strategies as st
+from hypothesis import assume, settings, HealthCheck, example
 
 from tests.support.util_common import gen_balances, BasicPoolParameters
 from tests.support.utils import to_decimal, qdecimals
@@ -103,3 +104,26 @@ def test_calculateInvariant_reconstruction_alt(args):
 
     invariant = float(invariant)
     assert invariant_re == approx(invariant, rel=5e-12)
+
+
+@settings(max_examples=200)
+@given(
+    balances=gen_balances(3, bpool_params),
+    root3Alpha=qdecimals(ROOT_ALPHA_MIN, ROOT_ALPHA_MAX),
+    factors=st.tuples(*[qdecimals("0.99", "1.01")] * 3),
+)
+def test_calculateInvariantWarm(balances, root3Alpha, factors):
+    """Warm-starting at the invariant before a small balance change gives the same result as a cold start."""
+    assume(sum(balances) > 0)
+    balances_new = [b * f for b, f in zip(balances, factors)]
+
+    last_invariant = mimpl.calculateInvariant(balances, root3Alpha)
+    invariant = mimpl.calculateInvariant(balances_new, root3Alpha)
+
+    cold = mimpl.calculateInvariantWarm(balances_new, root3Alpha, debug=True)
+    assert cold.invariant == invariant
+    assert cold.iterations == len(cold.log)
+
+    warm = mimpl.calculateInvariantWarm(balances_new, root3Alpha, last_invariant)
+    assert warm.log is None
+    assert warm.invariant == invariant.approxed(rel=D("5e-16"))
@@ -1,6 +1,6 @@
 from logging import warning
 from math import sqrt
-from typing import Iterable, List, Tuple, Callable
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Callable
 
 from tests.support.utils import scale, to_decimal, unscale, qdecimals
 
@@ -32,8 +32,7 @@ def calculateCubicTerms(balances: Iterable[D], root3Alpha: D) -> tuple[D, D, D,
 def calculateCubic(
     a: D, mb: D, mc: D, md: D, root3Alpha: D, balances: Iterable[D]
 ) -> D:
-    invariant, log_steps = calculateInvariantNewton(a, mb, mc, md, root3Alpha, balances)
-    return invariant
+    return solveInvariantNewton(a, mb, mc, md, root3Alpha, balances).invariant
 
 
 def calculateLocalMinimum(a: D, mb: D, mc: D) -> D:
@@ -48,25 +47,54 @@ def calculateLocalMinimum(a: D, mb: D, mc: D) -> D:
 def calculateInvariantNewton(
     a: D, mb: D, mc: D, md: D, alpha1: D, balances: Iterable[D]
 ) -> tuple[D, list]:
-    b = -mb
-    c = -mc
-    d = -md
+    res = solveInvariantNewton(a, mb, mc, md, alpha1, balances, debug=True)
+    return res.invariant, res.log
 
-    log = []
-    # def test_calc_out_given_in(gyro_three_math_testing, amount_in, balances, root_three_alpha):
 
-    #     if amount_in > to_decimal('0.3') * (balances[0]):
-    #         return
+class NewtonResult(NamedTuple):
+    invariant: D
+    iterations: int
+    # Per-iteration dicts with l, delta, f_l, dx, dy, dz. None unless debug=True.
+    log: Optional[list]
 
-    #     if faulty_params(balances, root_three_alpha):
-    #         return
 
-    #     invariant = math_implementation.calculateInvariant(
-    #         to_decimal(balances), to_decimal(root_three_alpha))
+def calculateInvariantWarm(
+    balances: Iterable[D],
+    root3Alpha: D,
+    lastInvariant: Optional[D] = None,
+    debug: bool = False,
+) -> NewtonResult:
+    """Like calculateInvariant(), but starts the Newton iteration at `lastInvariant` (typically the invariant before a
+    small balance change) instead of the generic starting point.
+
+    The result satisfies the same convergence criterion as calculateInvariant(), but may differ from it in the last
+    couple of decimals since the iterates are different."""
+    balances = tuple(balances)
+    (a, mb, mc, md) = calculateCubicTerms(balances, root3Alpha)
+    return solveInvariantNewton(
+        a, mb, mc, md, root3Alpha, balances, l0=lastInvariant, debug=debug
+    )
 
-    #     virtual_param_in = math_implementation.calculateVirtualParameter0(
-    #         to_decimal(invariant))
-    x, y, z = balances
+
+def solveInvariantNewton(
+    a: D,
+    mb: D,
+    mc: D,
+    md: D,
+    alpha1: D,
+    balances: Iterable[D],
+    l0: Optional[D] = None,
+    debug: bool = False,
+) -> NewtonResult:
+    """Newton iteration of calculateInvariantNewton(), optionally warm-started at l0.
+
+    l0 is ignored if it's not above the local minimum of the cubic, where Newton would not converge to the right root.
+    The log is only recorded if `debug` is set."""
+    b = -mb
+    c = -mc
+    d = -md
+
+    log = [] if debug else None
 
     # Lower-order special case
     # if d == 0:
@@ -79,15 +107,20 @@ def calculateInvariantNewton(
         a * 3
     )  # Sqrt is not gonna make a problem b/c all summands are positive.
     # ^ Local minimum, and also the global minimum of f among l > 0; towards a starting point
-    l0 = lmin * D(
-        "1.5"
-    )  # 1.5 is a magic number, experimentally found; it seems this becomes exact for alpha -> 1.
-
-    l = l0
+    if l0 is None or not D(l0) > lmin:
+        l0 = lmin * D(
+            "1.5"
+        )  # 1.5 is a magic number, experimentally found; it seems this becomes exact for alpha -> 1.
+    # Coming from the left (f(l0) < 0), the first step overshoots to the right of the root, from where the iteration
+    # proceeds as for a cold start.
+
+    l = D(l0)
     delta = D(1)
     delta_pre = None  # Not really used, only to flag the first iteration.
+    iterations = 0
 
     while True:
+        iterations += 1
         # delta = f(l)/f'(l)
         l3 = l**3
         l2 = l**2
@@ -100,7 +133,8 @@ def calculateInvariantNewton(
         # (slightly more involved exit condition here)
         dx, dy, dz = invariantErrorsInAssets(l, balances, alpha1)
 
-        log.append(dict(l=l, delta=delta, f_l=f_l, dx=dx, dy=dy, dz=dz))
+        if debug:
+            log.append(dict(l=l, delta=delta, f_l=f_l, dx=dx, dy=dy, dz=dz))
 
         # if abs(f_l) < prec_convergence:
         if (
@@ -108,7 +142,7 @@ def calculateInvariantNewton(
             and abs(dy) < prec_convergence
             and abs(dz) < prec_convergence
         ):
-            return l, log
+            return NewtonResult(l, iterations, log)
 
         # Ordering optimization. Doesn't seem to matter as much as the first one above.
         # df_l = a * 3 * l ** 2 + b * 2 * l + c
@@ -118,7 +152,7 @@ def calculateInvariantNewton(
         # delta==0 can happen with poor numerical precision! In this case, this is all we can get.
         if delta_pre is not None and (delta == 0 or f_l < 0):
             # warning("Early exit due to numerical instability")
-            return l, log
+            return NewtonResult(l, iterations, log)
 
         l += delta
         delta_pre = delta
@@ -9,7 +9,7 @@ from math import cos, sin, pi
 
 # import dfuzzy
 # from dfuzzy import isle, isge
-from typing import Optional
+from typing import Callable, Optional
 
 from tests.support.dfuzzy_100 import (
     isclose,
@@ -200,8 +200,12 @@ class ECLP:
         return ret
 
     @staticmethod
-    def from_px_r(px: D, r: D, params: Params):
-        """Proposition 8"""
+    def from_px_r(
+        px: D, r: D, params: Params, tau: Optional[Callable[[D], Vector]] = None
+    ):
+        """Proposition 8
+
+        `tau` replaces `params.tau()`, e.g., by `TauGrid.tau()` of eclp_tau_grid.py."""
         # Sanity check. If this is not the case, the following yields a negative reserve point. - Which is ok
         # mathematically, but almost never what we mean.
         # This check fails sometimes due to numerical errors:
@@ -210,9 +214,8 @@ class ECLP:
 
         ret = ECLP(params)
         ret.r = r
-        taupx: Vector = params.tau(
-            px
-        )  # Compute these in one step b/c then we only need one square root.
+        # Compute these in one step b/c then we only need one square root.
+        taupx: Vector = (tau or params.tau)(px)
         ret.x = r * (
             params.Ainv_times_x(*params.tau_beta) - params.Ainv_times_x(*taupx)
         )
@@ -222,7 +225,9 @@ class ECLP:
         return ret
 
     @staticmethod
-    def from_px_v(px: D, v: D, params: Params):
+    def from_px_v(
+        px: D, v: D, params: Params, tau: Optional[Callable[[D], Vector]] = None
+    ):
         """
         Initialize from price and portfolio value. This is nice b/c portfolio value is comparable across parameter
         choices and also with other AMMs. (which r need not be)
@@ -230,11 +235,11 @@ class ECLP:
         Proposition 9, applied in reverse, paired with `from_px_r()`."""
         px = soft_clamp(px, params.alpha, params.beta, prec_input)
 
-        taupx = params.tau(px)  # Somewhat expensive
+        taupx = (tau or params.tau)(px)  # Somewhat expensive
         xn = params.Ainv_times_x(*params.tau_beta) - params.Ainv_times_x(*taupx)
         yn = params.Ainv_times_y(*params.tau_alpha) - params.Ainv_times_y(*taupx)
         r = v / (px * xn + yn)
-        return ECLP.from_px_r(px, r, params)
+        return ECLP.from_px_r(px, r, params, tau)
 
     # Offsets. Note that, in contrast to (say) virtual reserve offsets, these are *subtracted* from the real reserve.
     # Equivalently, we shift the curve up-right rather than down-left.
@@ -0,0 +1,25 @@
+"""38-decimal version of the ECLP reference model in eclp.py.
+
+This is eclp.py itself, executed with QuantizedDecimal and dfuzzy replaced by their 38-decimal versions, so that the
+two can't diverge.
+"""
+
+from pathlib import Path
+
+_SOURCE = Path(__file__).with_name("eclp.py")
+_REPLACEMENTS = {
+    "from tests.support.quantized_decimal import": "from tests.support.quantized_decimal_38 import",
+    "from tests.support.dfuzzy import": "from tests.support.dfuzzy_38 import",
+}
+
+
+def _load():
+    source = _SOURCE.read_text()
+    for old, new in _REPLACEMENTS.items():
+        if source.count(old) != 1:
+            raise ImportError(f"expected one '{old}' in {_SOURCE.name}")
+        source = source.replace(old, new)
+    exec(compile(source, str(_SOURCE), "exec"), globals())
+
+
+_load()
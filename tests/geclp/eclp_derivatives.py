@@ -1,8 +1,10 @@
+from functools import cached_property
 from typing import Optional
 
 from tests.support.types import ECLPMathParams
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import eclp_derived_params
 
 # Derivative calculations used in the SOR. See `E-CLP SOR derivatives.pdf`. These calculations are all in 18 decimals
 # and they have *not* been optimized for precision. So don't expect super high prec from them (which we also don't
@@ -14,40 +16,200 @@ from tests.geclp import eclp_prec_implementation as prec_impl
 # but this could be done, too.
 
 
-def _setup(
-    balances: list[D],
-    params: ECLPMathParams,
-    fee: D,
-    r_vec: tuple[D, D],
-    r: Optional[D],
-    ix_var: int,
-) -> tuple:
+class SORContext:
     """
-    Convenience function extracts some values we need again and again.
+    State of a pool as seen by the SOR: balances, params, fee and invariant. All values we need again and again
+    (derived params, virtual offsets, the two square roots) as well as all the derivative and liquidity metrics below
+    are computed lazily, at most once per context. Use this instead of the module-level functions when several
+    metrics for the same pool state are needed.
 
-    ix_var: 0 if our variable is x, 1 if it's y.
-    """
-    if r is None:
-        r = r_vec[1]  # Kinda arbitrary choice
+    r: If given, must be one of the elements of r_vec. Defaults to r_vec[1] (kinda arbitrary choice).
 
-    _, _, c, s, l = params
-    x0, y0 = balances
-
-    derived = prec_impl.calc_derived_values(params)
-    # The 'None' case allows ppl to pass None for balances that aren't actually used in the calculation, which can be
-    # convenient.
-    a = prec_impl.virtualOffset0(params, derived, r_vec)
-    b = prec_impl.virtualOffset1(params, derived, r_vec)
-
-    ls = 1 - 1 / l**2
-    f = 1 - fee
-
-    if ix_var == 0:
-        R = (r**2 * (1 - ls * s**2) - (x0 - a) ** 2 / l**2).sqrt()
-    else:
-        R = (r**2 * (1 - ls * c**2) - (y0 - b) ** 2 / l**2).sqrt()
+    Balances may be None if they aren't used in the metrics that are queried; metrics in x only use x0 :=
+    balances[0], metrics in y only use y0 := balances[1]. This can be convenient.
+    """
 
-    return x0, y0, c, s, l, a, b, ls, f, r, R
+    def __init__(
+        self,
+        balances: list[D],
+        params: ECLPMathParams,
+        fee: D,
+        r_vec: tuple[D, D],
+        r: Optional[D] = None,
+    ):
+        if r is None:
+            r = r_vec[1]
+        self.x0, self.y0 = balances
+        self.params = params
+        _, _, self.c, self.s, self.l = params
+        self.fee = fee
+        self.r_vec = r_vec
+        self.r = r
+
+    @cached_property
+    def derived(self):
+        return eclp_derived_params.calc_derived_values(self.params)
+
+    @cached_property
+    def a(self) -> D:
+        return prec_impl.virtualOffset0(self.params, self.derived, self.r_vec)
+
+    @cached_property
+    def b(self) -> D:
+        return prec_impl.virtualOffset1(self.params, self.derived, self.r_vec)
+
+    @cached_property
+    def ls(self) -> D:
+        return 1 - 1 / self.l**2
+
+    @cached_property
+    def f(self) -> D:
+        return 1 - self.fee
+
+    @cached_property
+    def Rx(self) -> D:
+        """R when our variable is x."""
+        r, ls, s, l = self.r, self.ls, self.s, self.l
+        return (r**2 * (1 - ls * s**2) - (self.x0 - self.a) ** 2 / l**2).sqrt()
+
+    @cached_property
+    def Ry(self) -> D:
+        """R when our variable is y."""
+        r, ls, c, l = self.r, self.ls, self.c, self.l
+        return (r**2 * (1 - ls * c**2) - (self.y0 - self.b) ** 2 / l**2).sqrt()
+
+    @cached_property
+    def dyin_dxout(self) -> D:
+        """
+        Derivative of yin as a function of xout at 0. Accounts for fees.
+        = d yin / d xout
+        = Price of x ito. y including fees.
+        """
+        c, s, l, ls, f = self.c, self.s, self.l, self.ls, self.f
+        x0, a, R = self.x0, self.a, self.Rx
+        return 1 / (f * (1 - ls * s**2)) * (ls * s * c - (x0 - a) / (l**2 * R))
+
+    @cached_property
+    def dxin_dyout(self) -> D:
+        """
+        Derivative of xin as a function of yout at 0. Accounts for fees.
+        = d xin / d yout
+        = Price of x ito. y including fees.
+        """
+        c, s, l, ls, f = self.c, self.s, self.l, self.ls, self.f
+        y0, b, R = self.y0, self.b, self.Ry
+        return 1 / (f * (1 - ls * c**2)) * (ls * s * c - (y0 - b) / (l**2 * R))
+
+    @cached_property
+    def dyout_dxin(self) -> D:
+        c, s, l, ls, f = self.c, self.s, self.l, self.ls, self.f
+        x0, a, R = self.x0, self.a, self.Rx
+        return f / (1 - ls * s**2) * (ls * s * c - (x0 - a) / (l**2 * R))
+
+    @cached_property
+    def dxout_dyin(self) -> D:
+        c, s, l, ls, f = self.c, self.s, self.l, self.ls, self.f
+        y0, b, R = self.y0, self.b, self.Ry
+        return f / (1 - ls * c**2) * (ls * s * c - (y0 - b) / (l**2 * R))
+
+    @cached_property
+    def dpx_dxout(self) -> D:
+        """
+        Derivative of (Derivative of yin as a fct of xout) as a fct of xout at 0.
+        = d^2 yin / d xout^2
+
+        Accounts for fees but *not* for the compounding of fees. This is what you use to analyze slippage for the
+        purpose I, but it'd probably be wrong to use it for the behavior of the pool over time.
+        """
+        s, l, ls, f = self.s, self.l, self.ls, self.f
+        x0, a, R = self.x0, self.a, self.Rx
+        return (
+            1
+            / (f * (1 - ls * s**2))
+            * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
+        )
+
+    @cached_property
+    def dpy_dyout(self) -> D:
+        """
+        Derivative of (price of y ito. x) as a fct of yout at 0
+        = Derivative of (Derivative of xin as a fct of yout) as a fct of yout at 0.
+        = d^2 xin / d yout^2
+
+        Accounts for fees but *not* for the compounding of fees.
+        """
+        c, l, ls, f = self.c, self.l, self.ls, self.f
+        y0, b, R = self.y0, self.b, self.Ry
+        return (
+            1
+            / (f * (1 - ls * c**2))
+            * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
+        )
+
+    @cached_property
+    def dpy_dxin(self) -> D:
+        """
+        Derivative of (price of y ito x incl fees as a fct of xin) as a fct of xin at 0.
+        = d (1 / (d yout / d xin)) / dxin at 0
+        """
+        c, s, l, ls = self.c, self.s, self.l, self.ls
+        x0, a, R = self.x0, self.a, self.Rx
+        return (
+            (1 - ls * s**2)
+            * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
+            / (ls * s * c - (x0 - a) / (l**2 * R)) ** 2
+        )
+
+    @cached_property
+    def dpx_dyin(self) -> D:
+        """
+        Derivative of (price of x ito y incl fees as a fct of yin) as a fct of yin at 0.
+        = d (1 / (d xout / d yin)) / d yin at 0
+        """
+        c, s, l, ls = self.c, self.s, self.l, self.ls
+        y0, b, R = self.y0, self.b, self.Ry
+        return (
+            (1 - ls * c**2)
+            * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
+            / (ls * s * c - (y0 - b) / (l**2 * R)) ** 2
+        )
+
+    @cached_property
+    def normalized_liquidity_yin(self) -> D:
+        """
+        0.5 * 1 / (Derivative of (effective price of x ito y incl fees as a fct of yin)) as a fct of yin in the limit
+        yin -> 0.
+        = 0.5 * 1 / (d (yin / xout) / d yin) in the limit yin -> 0.
+
+        Note that (d (yin / xout) / d yin) is *not* the same as dpx_dyin (i.e., the derivative of the *marginal* price.
+        Because math...)
+        """
+        c, s, l, ls = self.c, self.s, self.l, self.ls
+        y0, b, R = self.y0, self.b, self.Ry
+        return (
+            1
+            / (1 - ls * c**2)
+            * (R * (ls * s * c * l**2 * R - (y0 - b)) ** 2)
+            / (l**2 * R**2 + (y0 - b) ** 2)
+        )
+
+    @cached_property
+    def normalized_liquidity_xin(self) -> D:
+        """
+        See normalized_liquidity_yin. Here with yout and xin.
+        """
+        c, s, l, ls = self.c, self.s, self.l, self.ls
+        x0, a, R = self.x0, self.a, self.Rx
+        return (
+            1
+            / (1 - ls * s**2)
+            * (R * (ls * s * c * l**2 * R - (x0 - a)) ** 2)
+            / (l**2 * R**2 + (x0 - a) ** 2)
+        )
+
+
+# One-shot wrappers around SORContext, kept for convenience and compatibility. See the SORContext properties of the
+# same names for what they compute.
 
 
 def dyin_dxout(
@@ -57,18 +219,7 @@ def dyin_dxout(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of yin as a function of xout at 0. Accounts for fees.
-    = d yin / d xout
-    = Price of x ito. y including fees.
-
-    r: If given, must be one of the elements of r_vec.
-
-    Only x0 := balances[0] is used.
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 0)
-    ret = 1 / (f * (1 - ls * s**2)) * (ls * s * c - (x0 - a) / (l**2 * R))
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dyin_dxout
 
 
 def dxin_dyout(
@@ -78,16 +229,7 @@ def dxin_dyout(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of xin as a function of yout at 0. Accounts for fees.
-    = d xin / d yout
-    = Price of x ito. y including fees.
-
-    Only y0 := balances[1] is used.
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 1)
-    ret = 1 / (f * (1 - ls * c**2)) * (ls * s * c - (y0 - b) / (l**2 * R))
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dxin_dyout
 
 
 def dyout_dxin(
@@ -97,9 +239,7 @@ def dyout_dxin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 0)
-    ret = f / (1 - ls * s**2) * (ls * s * c - (x0 - a) / (l**2 * R))
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dyout_dxin
 
 
 def dxout_dyin(
@@ -109,9 +249,7 @@ def dxout_dyin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 1)
-    ret = f / (1 - ls * c**2) * (ls * s * c - (y0 - b) / (l**2 * R))
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dxout_dyin
 
 
 def dpx_dxout(
@@ -121,22 +259,7 @@ def dpx_dxout(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of (Derivative of yin as a fct of xout) as a fct of xout at 0.
-    = d^2 yin / d xout^2
-
-    Accounts for fees but *not* for the compounding of fees. This is what you use to analyze slippage for the purpose
-    I, but it'd probably be wrong to use it for the behavior of the pool over time.
-
-    Only x0 := balances[0] is used.
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 0)
-    ret = (
-        1
-        / (f * (1 - ls * s**2))
-        * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dpx_dxout
 
 
 def dpy_dyout(
@@ -146,22 +269,7 @@ def dpy_dyout(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of (price of y ito. x) as a fct of yout at 0
-    = Derivative of (Derivative of xin as a fct of yout) as a fct of yout at 0.
-    = d^2 xin / d yout^2
-
-    Accounts for fees but *not* for the compounding of fees.
-
-    Only y0 := balances[1] is used.
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 1)
-    ret = (
-        1
-        / (f * (1 - ls * c**2))
-        * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dpy_dyout
 
 
 def dpy_dxin(
@@ -171,17 +279,7 @@ def dpy_dxin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of (price of y ito x incl fees as a fct of xin) as a fct of xin at 0.
-    = d (1 / (d yout / d xin)) / dxin at 0
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 0)
-    ret = (
-        (1 - ls * s**2)
-        * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
-        / (ls * s * c - (x0 - a) / (l**2 * R)) ** 2
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dpy_dxin
 
 
 def dpx_dyin(
@@ -191,17 +289,7 @@ def dpx_dyin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    Derivative of (price of x ito y incl fees as a fct of yin) as a fct of yin at 0.
-    = d (1 / (d xout / d yin)) / d yin at 0
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 1)
-    ret = (
-        (1 - ls * c**2)
-        * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
-        / (ls * s * c - (y0 - b) / (l**2 * R)) ** 2
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).dpx_dyin
 
 
 def normalized_liquidity_yin(
@@ -211,21 +299,7 @@ def normalized_liquidity_yin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    0.5 * 1 / (Derivative of (effective price of x ito y incl fees as a fct of yin)) as a fct of yin in the limit yin -> 0.
-    = 0.5 * 1 / (d (yin / xout) / d yin) in the limit yin -> 0.
-
-    Note that (d (yin / xout) / d yin) is *not* the same as dpx_dyin (i.e., the derivative of the *marginal* price.
-    Because math...)
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 1)
-    ret = (
-        1
-        / (1 - ls * c**2)
-        * (R * (ls * s * c * l**2 * R - (y0 - b)) ** 2)
-        / (l**2 * R**2 + (y0 - b) ** 2)
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).normalized_liquidity_yin
 
 
 def normalized_liquidity_xin(
@@ -235,14 +309,4 @@ def normalized_liquidity_xin(
     r_vec: tuple[D, D],
     r: Optional[D] = None,
 ):
-    """
-    See normalized_normalized_liquidity_yin. Here with yout and xin.
-    """
-    x0, y0, c, s, l, a, b, ls, f, r, R = _setup(balances, params, fee, r_vec, r, 0)
-    ret = (
-        1
-        / (1 - ls * s**2)
-        * (R * (ls * s * c * l**2 * R - (x0 - a)) ** 2)
-        / (l**2 * R**2 + (x0 - a) ** 2)
-    )
-    return ret
+    return SORContext(balances, params, fee, r_vec, r).normalized_liquidity_xin
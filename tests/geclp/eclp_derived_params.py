@@ -0,0 +1,166 @@
+"""Memoizing store for ECLP derived parameters.
+
+`eclp_prec_implementation.calc_derived_values()` does its trig/sqrt work at 100 decimals, which is
+by far the most expensive part of setting up a pool for the python math. The derived values only
+depend on the (18-decimal) pool parameters, so we cache them here, keyed by the raw parameter
+values. The store is LRU-bounded and can be saved to / loaded from a small JSON file so that a cold
+process can skip the computation for known pools (e.g. the ones in `config/pools`).
+
+The file stores raw fixed-point integers (18 decimals for the params, 38 for the derived values).
+It must be regenerated (see `scripts/cache_eclp_derived_params.py`) whenever
+`calc_derived_values()` changes.
+"""
+
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
+from tests.support.types import ECLPMathParamsQD
+
+ROOT_DIR = Path(__file__).parents[2]
+DEFAULT_PATH = ROOT_DIR / "data" / "eclp_derived_params.json"
+POOL_CONFIGS_DIR = ROOT_DIR / "config" / "pools"
+
+FILE_VERSION = 1
+DEFAULT_MAXSIZE = 1024
+
+Key = Tuple[int, int, int, int, int]
+
+
+def params_key(p) -> Key:
+    """Cache key for `p`. Any object with alpha, beta, c, s, l attributes works (duck typed like
+    `calc_derived_values()`). Values are truncated to 18 decimals first, exactly as
+    `calc_derived_values()` does, so equal keys always give equal derived values."""
+    return (
+        D(p.alpha).raw_int,
+        D(p.beta).raw_int,
+        D(p.c).raw_int,
+        D(p.s).raw_int,
+        D(p.l).raw_int,
+    )
+
+
+def _derived_to_ints(d: prec_impl.DerivedParams) -> list:
+    return [D2(x).raw_int for x in (*d.tauAlpha, *d.tauBeta, d.u, d.v, d.w, d.z, d.dSq)]
+
+
+def _derived_from_ints(xs) -> prec_impl.DerivedParams:
+    tauAlpha0, tauAlpha1, tauBeta0, tauBeta1, u, v, w, z, dSq = (
+        D2.from_raw(int(x)) for x in xs
+    )
+    return prec_impl.DerivedParams(
+        tauAlpha=(tauAlpha0, tauAlpha1),
+        tauBeta=(tauBeta0, tauBeta1),
+        u=u,
+        v=v,
+        w=w,
+        z=z,
+        dSq=dSq,
+    )
+
+
+class DerivedParamsStore:
+    """LRU cache of `calc_derived_values()` results.
+
+    `maxsize=None` means unbounded. Entries added via `load()` count towards the bound like any
+    other entry.
+    """
+
+    def __init__(self, maxsize: Optional[int] = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Key, prec_impl.DerivedParams]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, p) -> bool:
+        return params_key(p) in self._entries
+
+    def get(self, p) -> prec_impl.DerivedParams:
+        key = params_key(p)
+        derived = self._entries.get(key)
+        if derived is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return derived
+        self.misses += 1
+        derived = prec_impl.calc_derived_values(p)
+        self._insert(key, derived)
+        return derived
+
+    def put(self, p, derived: prec_impl.DerivedParams):
+        self._insert(params_key(p), derived)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def _insert(self, key: Key, derived: prec_impl.DerivedParams):
+        self._entries[key] = derived
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def save(self, path: Union[str, Path] = DEFAULT_PATH):
+        """Write all entries, least recently used first, so that `load()` restores the LRU order."""
+        entries = [
+            [list(key), _derived_to_ints(derived)]
+            for key, derived in self._entries.items()
+        ]
+        data = {"version": FILE_VERSION, "entries": entries}
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.write("\n")
+
+    def load(self, path: Union[str, Path] = DEFAULT_PATH) -> int:
+        """Add the entries from `path` to the store. Returns the number of entries read."""
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != FILE_VERSION:
+            raise ValueError(
+                f"Unsupported derived params file version {data.get('version')!r} in {path}"
+            )
+        for key, derived in data["entries"]:
+            self._insert(tuple(int(x) for x in key), _derived_from_ints(derived))
+        return len(data["entries"])
+
+    def add_pool_configs(self, config_dir: Union[str, Path] = POOL_CONFIGS_DIR) -> int:
+        """Compute and add derived values for all ECLP pools in `config_dir`. Returns the number of
+        ECLP configs found."""
+        n = 0
+        for path in sorted(Path(config_dir).glob("*.json")):
+            with open(path) as f:
+                config = json.load(f)
+            if config.get("pool_type") != "eclp":
+                continue
+            params = ECLPMathParamsQD(
+                **{k: D(config["params"][k]) for k in ECLPMathParamsQD._fields}
+            )
+            self.get(params)
+            n += 1
+        return n
+
+
+_default_store: Optional[DerivedParamsStore] = None
+
+
+def default_store() -> DerivedParamsStore:
+    """Process-wide store, pre-populated from `DEFAULT_PATH` if that file exists."""
+    global _default_store
+    if _default_store is None:
+        _default_store = DerivedParamsStore()
+        if DEFAULT_PATH.exists():
+            _default_store.load(DEFAULT_PATH)
+    return _default_store
+
+
+def calc_derived_values(p) -> prec_impl.DerivedParams:
+    """Cached drop-in replacement for `eclp_prec_implementation.calc_derived_values()`."""
+    return default_store().get(p)
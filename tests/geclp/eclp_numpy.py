@@ -0,0 +1,463 @@
+"""Vectorized float64 version of the ECLP swap math for quoting many (balances, amount) pairs at once.
+
+The formulas follow `eclp_prec_implementation` (invariant, virtual offsets, solveQuadraticSwap()), evaluated with NumPy
+on whole arrays. Alongside each result we compute a first-order running error bound that covers both the float64
+rounding of this module and the deviation of `eclp_prec_implementation` from exact math (its fixed-point rounding and
+the invariant error it uses for r = (invariant + 2 * err, invariant)). So the bound is a bound on
+|float result - prec implementation result|. Where the bound is too wide for the caller's tolerance, or where we cannot
+tell if a swap would revert, `quote_out_given_in()` / `quote_in_given_out()` re-run only those elements through the
+exact prec implementation.
+
+This is meant for screening (e.g., route candidates); quotes that are acted upon should come from the exact path.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+# Unit roundoff of float64
+_U = np.finfo(np.float64).eps / 2
+# Quantum of the 18-decimal fixed point numbers used by the prec implementation
+_Q = 1e-18
+# Error per fixed point * 38-decimal multiplication, relative to the value, in the prec implementation
+_Q_XP = 1e-37
+# Safety factor on the first-order bounds
+_SAFETY = 4.0
+
+_MAX_BALANCES = float(prec_impl._MAX_BALANCES)
+
+
+def _gamma(n: int) -> float:
+    """Standard bound on the accumulated relative error of n float operations."""
+    return n * _U / (1 - n * _U)
+
+
+def _sqrt_with_error(val, err):
+    """sqrt(max(val, 0)) and a bound on the error given an error bound err on val."""
+    sq = np.sqrt(np.maximum(val, 0.0))
+    lower = np.sqrt(np.maximum(val - err, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        err_sq = np.minimum(np.sqrt(err), err / (sq + lower))
+    err_sq = np.where(sq + lower > 0, err_sq, np.sqrt(err))
+    return sq, err_sq + _U * sq
+
+
+class FloatParams(NamedTuple):
+    """ECLP params and derived params as floats, plus some balance-independent terms."""
+
+    c: float
+    s: float
+    l: float
+    lamBar: float
+    dSq: float
+    tauAlpha: tuple[float, float]
+    tauBeta: tuple[float, float]
+    # Coefficients of the invariant calculation, see calcAtAChi() and calcInvariantSqrt()
+    atAChiCoeffs: tuple[float, float, float]
+    sqrtCoeffs: tuple[float, float, float]
+    # calcAChiAChiInXp() - 1 and its error
+    denominator: float
+    denominatorErr: float
+    errDiv: float
+
+
+def float_params(p: prec_impl.Params, d: prec_impl.DerivedParams) -> FloatParams:
+    c, s, l = float(p.c), float(p.s), float(p.l)
+    w, z, u, v, dSq = (float(x) for x in (d.w, d.z, d.u, d.v, d.dSq))
+    dSq2 = dSq * dSq
+    dSq3 = dSq2 * dSq
+    dSq4 = dSq2 * dSq2
+
+    achiachi_terms = [
+        2 * u * v * l / dSq3,
+        u * u * l * l / dSq3,
+        v * v / dSq3,
+        (w / l + z) ** 2 / dSq3,
+    ]
+    denominator = sum(achiachi_terms) - 1
+    denominatorErr = _gamma(12) * (sum(abs(t) for t in achiachi_terms) + 1)
+
+    return FloatParams(
+        c=c,
+        s=s,
+        l=l,
+        lamBar=1 - 1 / (l * l),
+        dSq=dSq,
+        tauAlpha=(float(d.tauAlpha[0]), float(d.tauAlpha[1])),
+        tauBeta=(float(d.tauBeta[0]), float(d.tauBeta[1])),
+        atAChiCoeffs=((w / l + z) / l / dSq2, u / dSq2, v / dSq2),
+        sqrtCoeffs=(
+            (u * u + 2 * u * v / l + v * v / l / l) / dSq4,
+            (z * u + (w * u + z * v) / l + w * v / l / l) / dSq4,
+            (z * z + w * w / l / l + 2 * z * w / l) / dSq4,
+        ),
+        denominator=denominator,
+        denominatorErr=denominatorErr,
+        errDiv=float(int(p.l * p.l)),
+    )
+
+
+@np.errstate(all="ignore")
+def calculate_invariant(x, y, fp: FloatParams):
+    """Vectorized calculateInvariantWithError().
+
+    Returns (invariant, err, bound) where `err` is the error estimate that the prec implementation would report (it
+    uses invariant + 2 * err as the overestimate r[0]) and `bound` bounds |invariant - prec implementation invariant|.
+    """
+    c, s, l = fp.c, fp.s, fp.l
+    k1, k2, k3 = fp.atAChiCoeffs
+    K1, K2, K3 = fp.sqrtCoeffs
+
+    atAChi = (x * c - y * s) * k1 + (x * l * s + y * l * c) * k2 + (x * s + y * c) * k3
+    atAChiMag = (
+        (np.abs(x * c) + np.abs(y * s)) * abs(k1)
+        + (np.abs(x * l * s) + np.abs(y * l * c)) * abs(k2)
+        + (np.abs(x * s) + np.abs(y * c)) * abs(k3)
+    )
+
+    xx, yy, xy = x * x, y * y, x * y
+    n1 = xx * c * c + yy * s * s - 2 * xy * c * s
+    n1Mag = xx * c * c + yy * s * s + 2 * np.abs(xy * c * s)
+    n2 = (xx - yy) * 2 * c * s + 2 * xy * (c * c - s * s)
+    n2Mag = (xx + yy) * 2 * abs(c * s) + 2 * np.abs(xy) * (c * c + s * s)
+    n3 = xx * s * s + yy * c * c + 2 * xy * s * c
+    n3Mag = xx * s * s + yy * c * c + 2 * np.abs(xy * s * c)
+
+    val = -n1 * K1 + n1 / (l * l * fp.dSq) + n2 * K2 - n3 * K3 + n3 / fp.dSq
+    valMag = (
+        n1Mag * (abs(K1) + 1 / (l * l * fp.dSq))
+        + n2Mag * abs(K2)
+        + n3Mag * (abs(K3) + 1 / fp.dSq)
+    )
+    # Float rounding + fixed point rounding (incl. the deliberate 9e-18 shifts) in calcInvariantSqrt()
+    valErr = _gamma(16) * valMag + 40 * _Q
+    sqrt, sqrtErr = _sqrt_with_error(val, valErr)
+
+    numerator = atAChi + sqrt
+    numeratorErr = _gamma(10) * atAChiMag + sqrtErr + 10 * _Q + _U * np.abs(numerator)
+    invariant = numerator / fp.denominator
+
+    # The error estimate of the prec implementation, see calculateInvariantWithError()
+    sqrtErrIn = (xx + yy) / 1e38
+    err = np.where(
+        sqrt > 0,
+        (sqrtErrIn + _Q) / (2 * sqrt),
+        np.sqrt(np.maximum(sqrtErrIn, 0)),
+    )
+    err = np.where((sqrt <= 0) & (sqrtErrIn <= 0), 1e-9, err)
+    err = (l * (x + y) / 1e38 + err + _Q) * 20
+    err = err / fp.denominator + invariant / fp.denominator * fp.errDiv * 40 / 1e38
+    err = err + _Q
+
+    if fp.denominatorErr >= abs(fp.denominator) / 2:
+        bound = np.full_like(invariant, np.inf)
+    else:
+        bound = (
+            numeratorErr + np.abs(invariant) * fp.denominatorErr
+        ) / fp.denominator + _U * np.abs(invariant)
+    # The prec implementation subtracts err from the numerator and then rounds, so its result can be up to ~err below
+    # the true value.
+    bound = bound + 2 * err
+    return invariant, err, bound
+
+
+def _virtual_offset_coeffs(fp: FloatParams, mag: bool = False) -> tuple[float, float]:
+    """(a, b) / r, see virtualOffset0() and virtualOffset1(). With mag=True, the sums of the absolute values of the
+    terms instead."""
+    f = abs if mag else (lambda t: t)
+    a = (f(fp.l * fp.c * fp.tauBeta[0]) + f(fp.s * fp.tauBeta[1])) / fp.dSq
+    b = (f(-fp.l * fp.s * fp.tauAlpha[0]) + f(fp.c * fp.tauAlpha[1])) / fp.dSq
+    return a, b
+
+
+def _max_balance_coeffs(fp: FloatParams, ix: int) -> tuple[float, float]:
+    """maxBalances0/1() / r and the sum of the absolute values of its terms."""
+    t0 = (fp.tauBeta[0] - fp.tauAlpha[0]) / fp.dSq
+    if ix == 0:
+        t1, t2 = fp.l * fp.c * t0, fp.s * (fp.tauBeta[1] - fp.tauAlpha[1]) / fp.dSq
+    else:
+        t1, t2 = fp.l * fp.s * t0, fp.c * (fp.tauAlpha[1] - fp.tauBeta[1]) / fp.dSq
+    return t1 + t2, abs(t1) + abs(t2)
+
+
+def _solve_quadratic_swap(x, xErr, r, rErr, rMixErr, fp: FloatParams, swapped: bool):
+    """Vectorized calcYGivenX() (or calcXGivenY() if swapped). Returns the new balance and an error bound.
+
+    rErr: Bound on the error of r. rMixErr: Bound on the difference between r and each of the two components of the
+    invariant vector that the prec implementation uses in different terms.
+    """
+    aCoeff, bCoeff = _virtual_offset_coeffs(fp)
+    aCoeffMag, bCoeffMag = _virtual_offset_coeffs(fp, mag=True)
+    if swapped:
+        s, c = fp.c, fp.s
+        tb0, tb1 = -fp.tauAlpha[0], fp.tauAlpha[1]
+        aCoeff, bCoeff = bCoeff, aCoeff
+        aCoeffMag, bCoeffMag = bCoeffMag, aCoeffMag
+    else:
+        s, c = fp.s, fp.c
+        tb0, tb1 = fp.tauBeta
+    lam, lamBar, dSq = fp.l, fp.lamBar, fp.dSq
+    dSq2 = dSq * dSq
+
+    a = r * aCoeff
+    b = r * bCoeff
+    xp = x - a
+    qb = -xp * s * c * lamBar / dSq
+    sTerm = 1 - lamBar * s * s / dSq
+
+    # calcXpXpDivLambdaLambda(), split into terms so we can track magnitudes.
+    t_rr0 = r * r * c * c * tb0 * tb0 / dSq2
+    t_rr1 = r * r * 2 * s * c * tb0 * tb1 / dSq2
+    t_rx0 = -r * x * 2 * c * tb0 / dSq
+    t_rr2 = r * r * s * s * tb1 * tb1 / dSq2
+    t_rx1 = -r * x * 2 * s * tb1 / dSq
+    xpxp = t_rr0 + (t_rr1 + t_rx0 + (t_rr2 + t_rx1 + x * x) / lam) / lam
+    xpxpMag = (
+        np.abs(t_rr0)
+        + (
+            np.abs(t_rr1)
+            + np.abs(t_rx0)
+            + (np.abs(t_rr2) + np.abs(t_rx1) + x * x) / lam
+        )
+        / lam
+    )
+
+    rrSTerm = r * r * sTerm
+    qc2 = rrSTerm - xpxp
+    qc2Mag = xpxpMag + r * r * (1 + lamBar * s * s / dSq)
+    qc2Err = (_gamma(20) + 40 * _Q_XP) * qc2Mag + 40 * _Q
+    qc, qcErr = _sqrt_with_error(qc2, qc2Err)
+
+    # Partial derivatives for propagating the errors in r and x.
+    dxpxp_dr = (
+        2 * r * c * c * tb0 * tb0 / dSq2
+        + (
+            4 * r * s * c * tb0 * tb1 / dSq2
+            - 2 * x * c * tb0 / dSq
+            + (2 * r * s * s * tb1 * tb1 / dSq2 - 2 * x * s * tb1 / dSq) / lam
+        )
+        / lam
+    )
+    dxpxp_dx = (-2 * r * c * tb0 / dSq + (-2 * r * s * tb1 / dSq + 2 * x) / lam) / lam
+    # Sums of the absolute values of the partial derivatives of the individual terms wrt. r, for the effect of using
+    # different components of the invariant vector in different terms.
+    dxpxp_dr_mag = (
+        np.abs(2 * r * c * c * tb0 * tb0 / dSq2)
+        + (
+            np.abs(4 * r * s * c * tb0 * tb1 / dSq2)
+            + np.abs(2 * x * c * tb0 / dSq)
+            + (np.abs(2 * r * s * s * tb1 * tb1 / dSq2) + np.abs(2 * x * s * tb1 / dSq))
+            / lam
+        )
+        / lam
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dqc_dr = (2 * r * sTerm - dxpxp_dr) / (2 * qc)
+        dqc_dr_mag = (2 * np.abs(r) * (1 + lamBar * s * s / dSq) + dxpxp_dr_mag) / (
+            2 * qc
+        )
+        dqc_dx = -dxpxp_dx / (2 * qc)
+    dy_dr = (aCoeff * s * c * lamBar / dSq - dqc_dr) / sTerm + bCoeff
+    dy_dr_mag = (aCoeffMag * abs(s * c * lamBar / dSq) + dqc_dr_mag) / abs(
+        sTerm
+    ) + bCoeffMag
+    dy_dx = (-s * c * lamBar / dSq - dqc_dx) / sTerm
+
+    y = (qb - qc) / sTerm + b
+    qbErr = _gamma(6) * np.abs(qb) + (_U * np.abs(x) + _U * np.abs(a)) * abs(
+        s * c * lamBar / dSq
+    )
+    yErr = (
+        (qbErr + qcErr + 6 * _Q) / abs(sTerm)
+        + _gamma(3) * (np.abs(y) + np.abs(b))
+        + 4 * _Q
+    )
+    yErr = yErr + np.abs(dy_dr) * rErr + dy_dr_mag * rMixErr + np.abs(dy_dx) * xErr
+    yErr = np.where(np.isfinite(yErr) & (qc > qcErr), _SAFETY * yErr, np.inf)
+    return y, yErr
+
+
+class FloatQuotes(NamedTuple):
+    # NaN where the swap would revert.
+    amounts: np.ndarray
+    # Bound on |amounts - prec implementation result|. inf where the float result can't be trusted, including where
+    # we can't tell if the swap would revert.
+    errors: np.ndarray
+
+
+def _prepare(balances, amounts, fp: FloatParams):
+    balances = np.asarray(balances, dtype=np.float64).reshape(-1, 2)
+    amounts = np.asarray(amounts, dtype=np.float64).reshape(-1)
+    x, y = balances[:, 0], balances[:, 1]
+    invariant, err, invBound = calculate_invariant(x, y, fp)
+    # The prec implementation uses r = (invariant + 2 * err, invariant) in different places; we use the midpoint and
+    # account for the spread separately.
+    r = invariant + err
+    return balances, amounts, r, invBound, err
+
+
+def _in_bounds(newBal, newBalErr, r, rErr, rMixErr, fp: FloatParams, ix: int):
+    """checkAssetBounds(). Returns (ok, ambiguous)"""
+    coeff, coeffMag = _max_balance_coeffs(fp, ix)
+    maxBal = r * coeff
+    maxBalErr = (
+        abs(coeff) * rErr
+        + coeffMag * rMixErr
+        + _gamma(4) * np.abs(r) * coeffMag
+        + 4 * _Q
+    )
+    margin = np.minimum(maxBal - newBal, _MAX_BALANCES - newBal)
+    marginErr = _SAFETY * (maxBalErr + newBalErr) + _U * _MAX_BALANCES
+    return margin >= 0, np.abs(margin) <= marginErr
+
+
+@np.errstate(all="ignore")
+def calc_out_given_in(
+    balances, amountsIn, tokenInIsToken0: bool, fp: FloatParams
+) -> FloatQuotes:
+    """Vectorized calcOutGivenIn(), with the invariant computed from each row of `balances` like in the pool.
+
+    balances: array of shape (n, 2); amountsIn: array of shape (n,). Amounts are after fees.
+    """
+    balances, amountsIn, r, rErr, rMixErr = _prepare(balances, amountsIn, fp)
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    balIn, balOut = balances[:, ixIn], balances[:, ixOut]
+
+    balInNew = balIn + amountsIn
+    balInNewErr = _U * (np.abs(balIn) + np.abs(amountsIn) + np.abs(balInNew))
+    inBounds, ambiguous = _in_bounds(balInNew, balInNewErr, r, rErr, rMixErr, fp, ixIn)
+
+    balOutNew, balOutNewErr = _solve_quadratic_swap(
+        balInNew, balInNewErr, r, rErr, rMixErr, fp, swapped=not tokenInIsToken0
+    )
+    amountsOut = balOut - balOutNew
+    errors = balOutNewErr + _U * (np.abs(balOut) + np.abs(amountsOut))
+
+    valid = inBounds & (balOutNew >= 0) & (amountsOut >= 0)
+    ambiguous |= inBounds & (
+        (np.abs(balOutNew) <= balOutNewErr) | (np.abs(amountsOut) <= errors)
+    )
+    amountsOut = np.where(valid, amountsOut, np.nan)
+    errors = np.where(valid, errors, 0.0)
+    errors = np.where(ambiguous, np.inf, errors)
+    return FloatQuotes(amountsOut, errors)
+
+
+@np.errstate(all="ignore")
+def calc_in_given_out(
+    balances, amountsOut, tokenInIsToken0: bool, fp: FloatParams
+) -> FloatQuotes:
+    """Vectorized calcInGivenOut(). See calc_out_given_in()."""
+    balances, amountsOut, r, rErr, rMixErr = _prepare(balances, amountsOut, fp)
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    balIn, balOut = balances[:, ixIn], balances[:, ixOut]
+
+    balOutNew = balOut - amountsOut
+    balOutNewErr = _U * (np.abs(balOut) + np.abs(amountsOut) + np.abs(balOutNew))
+    outOk = amountsOut <= balOut
+    ambiguous = np.abs(balOutNew) <= balOutNewErr
+
+    balInNew, balInNewErr = _solve_quadratic_swap(
+        balOutNew, balOutNewErr, r, rErr, rMixErr, fp, swapped=tokenInIsToken0
+    )
+    inBounds, inAmbiguous = _in_bounds(
+        balInNew, balInNewErr, r, rErr, rMixErr, fp, ixIn
+    )
+    amountsIn = balInNew - balIn
+    errors = balInNewErr + _U * (np.abs(balIn) + np.abs(amountsIn))
+
+    valid = outOk & inBounds & (balInNew >= 0) & (amountsIn >= 0)
+    ambiguous |= outOk & (
+        inAmbiguous | (np.abs(balInNew) <= balInNewErr) | (np.abs(amountsIn) <= errors)
+    )
+    amountsIn = np.where(valid, amountsIn, np.nan)
+    errors = np.where(valid, errors, 0.0)
+    errors = np.where(ambiguous, np.inf, errors)
+    return FloatQuotes(amountsIn, errors)
+
+
+class Quotes(NamedTuple):
+    # Float quotes. NaN where the swap would revert. Elements that were recomputed exactly hold float(exact value).
+    amounts: np.ndarray
+    errors: np.ndarray
+    # Index -> result of the prec implementation (None if it would revert) for the elements that were recomputed.
+    exact: dict[int, Optional[D]]
+
+
+def _quote(
+    prec_fct,
+    float_fct,
+    balances,
+    amounts,
+    tokenInIsToken0: bool,
+    p: prec_impl.Params,
+    d: prec_impl.DerivedParams,
+    rtol: float,
+    atol: float,
+) -> Quotes:
+    fp = float_params(p, d)
+    quotes = float_fct(balances, amounts, tokenInIsToken0, fp)
+    amountsFloat, errors = quotes.amounts.copy(), quotes.errors.copy()
+
+    tol = np.maximum(atol, rtol * np.nan_to_num(np.abs(amountsFloat)))
+    exact = {}
+    for i in np.flatnonzero(~(errors <= tol)):
+        i = int(i)
+        bals = [D(balances[i][0]), D(balances[i][1])]
+        invariant, err = prec_impl.calculateInvariantWithError(bals, p, d)
+        r = (invariant + 2 * D(err), invariant)
+        res = prec_fct(bals, D(amounts[i]), tokenInIsToken0, p, d, r)
+        exact[i] = res
+        amountsFloat[i] = np.nan if res is None else float(res)
+        errors[i] = 0.0
+    return Quotes(amountsFloat, errors, exact)
+
+
+def quote_out_given_in(
+    balances,
+    amountsIn,
+    tokenInIsToken0: bool,
+    p: prec_impl.Params,
+    d: prec_impl.DerivedParams,
+    rtol: float = 1e-9,
+    atol: float = 1e-9,
+) -> Quotes:
+    """calc_out_given_in(), re-running the elements whose error bound exceeds max(atol, rtol * |amount|) through
+    eclp_prec_implementation.calcOutGivenIn()."""
+    return _quote(
+        prec_impl.calcOutGivenIn,
+        calc_out_given_in,
+        balances,
+        amountsIn,
+        tokenInIsToken0,
+        p,
+        d,
+        rtol,
+        atol,
+    )
+
+
+def quote_in_given_out(
+    balances,
+    amountsOut,
+    tokenInIsToken0: bool,
+    p: prec_impl.Params,
+    d: prec_impl.DerivedParams,
+    rtol: float = 1e-9,
+    atol: float = 1e-9,
+) -> Quotes:
+    """Like quote_out_given_in() for calcInGivenOut()."""
+    return _quote(
+        prec_impl.calcInGivenOut,
+        calc_in_given_out,
+        balances,
+        amountsOut,
+        tokenInIsToken0,
+        p,
+        d,
+        rtol,
+        atol,
+    )
@@ -0,0 +1,149 @@
+"""Stateful simulation of swap sequences against an ECLP pool, using `eclp_prec_implementation`.
+
+Like GyroECLPPool.onSwap(), every swap recomputes the invariant from the current balances. The terms of the invariant
+calculation that don't depend on the balances are computed once per pool (see
+`eclp_prec_implementation.prepareInvariant()`), so each swap only does the balance-dependent part. The result is
+bit-identical to calculateInvariantWithError().
+"""
+
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import eclp_derived_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+
+class Swap(NamedTuple):
+    amount: D
+    tokenInIsToken0: bool
+    givenIn: bool = True
+
+
+class ECLPPoolSimulator:
+    """
+    Two-asset ECLP pool holding (upscaled) balances. Swaps that GyroECLPPool would revert on return None and leave the
+    state unchanged.
+
+    incremental=False recomputes the full invariant with calculateInvariantWithError() on every swap; this is the
+    reference path for `benchmark_swaps()`.
+    """
+
+    def __init__(
+        self,
+        params: prec_impl.Params,
+        balances: Iterable[D],
+        fee: D = D(0),
+        derived: Optional[prec_impl.DerivedParams] = None,
+        incremental: bool = True,
+    ):
+        self.params = params
+        self.derived = (
+            derived
+            if derived is not None
+            else eclp_derived_params.calc_derived_values(params)
+        )
+        self.fee = D(fee)
+        self.balances = [D(b) for b in balances]
+        self.incremental = incremental
+        self.n_swaps = 0
+        self._terms = (
+            prec_impl.prepareInvariant(params, self.derived) if incremental else None
+        )
+        self._update_invariant()
+
+    @property
+    def r(self) -> tuple[D, D]:
+        """Invariant as passed to the swap functions: overestimate in x, underestimate in y, like in onSwap()."""
+        return (self.invariant + 2 * self.invariant_err, self.invariant)
+
+    def _update_invariant(self):
+        if self.incremental:
+            (
+                self.invariant,
+                self.invariant_err,
+            ) = prec_impl.calculateInvariantWithErrorPrepared(
+                self.balances, self._terms
+            )
+        else:
+            self.invariant, self.invariant_err = prec_impl.calculateInvariantWithError(
+                self.balances, self.params, self.derived
+            )
+
+    def _after_swap(self):
+        self.n_swaps += 1
+        self._update_invariant()
+
+    def swap_given_in(self, amountIn: D, tokenInIsToken0: bool) -> Optional[D]:
+        """Returns the amount out. The fee is taken from amountIn and stays in the pool."""
+        amountIn = D(amountIn)
+        ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+        feeAmount = amountIn.mul_up(self.fee)
+        amountOut = prec_impl.calcOutGivenIn(
+            self.balances,
+            amountIn - feeAmount,
+            tokenInIsToken0,
+            self.params,
+            self.derived,
+            self.r,
+        )
+        if amountOut is None:
+            return None
+        self.balances[ixIn] += amountIn
+        self.balances[ixOut] -= amountOut
+        self._after_swap()
+        return amountOut
+
+    def swap_given_out(self, amountOut: D, tokenInIsToken0: bool) -> Optional[D]:
+        """Returns the amount in, including the fee."""
+        amountOut = D(amountOut)
+        ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+        amountIn = prec_impl.calcInGivenOut(
+            self.balances,
+            amountOut,
+            tokenInIsToken0,
+            self.params,
+            self.derived,
+            self.r,
+        )
+        if amountIn is None:
+            return None
+        amountIn = amountIn.div_up(1 - self.fee)
+        self.balances[ixIn] += amountIn
+        self.balances[ixOut] -= amountOut
+        self._after_swap()
+        return amountIn
+
+    def swap(self, swap: Swap) -> Optional[D]:
+        if swap.givenIn:
+            return self.swap_given_in(swap.amount, swap.tokenInIsToken0)
+        return self.swap_given_out(swap.amount, swap.tokenInIsToken0)
+
+    def run(self, swaps: Iterable[Swap]) -> list[Optional[D]]:
+        return [self.swap(swap) for swap in swaps]
+
+
+def benchmark_swaps(
+    params: prec_impl.Params,
+    balances: Iterable[D],
+    swaps: list[Swap],
+    fee: D = D(0),
+) -> dict:
+    """Runs `swaps` with the incremental and with the from-scratch invariant and returns the throughput (swaps/s) of
+    both. Also checks that both paths end in the same state."""
+    derived = eclp_derived_params.calc_derived_values(params)
+    ret = {}
+    sims = {}
+    for name, incremental in [("from_scratch", False), ("incremental", True)]:
+        sim = ECLPPoolSimulator(params, balances, fee, derived, incremental)
+        start = time.perf_counter()
+        sim.run(swaps)
+        elapsed = time.perf_counter() - start
+        ret[name] = len(swaps) / elapsed if elapsed > 0 else float("inf")
+        sims[name] = sim
+
+    incr, full = sims["incremental"], sims["from_scratch"]
+    assert incr.balances == full.balances
+    assert (incr.invariant, incr.invariant_err) == (full.invariant, full.invariant_err)
+    ret["speedup"] = ret["incremental"] / ret["from_scratch"]
+    return ret
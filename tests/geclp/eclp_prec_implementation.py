@@ -1,5 +1,5 @@
 from operator import add, sub
-from typing import Iterable, NamedTuple, Tuple
+from typing import Iterable, NamedTuple, Optional, Tuple
 
 import pytest
 from tests.support.quantized_decimal import QuantizedDecimal as D
@@ -11,6 +11,7 @@ from tests.support.utils import scale, unscale
 
 _MAX_IN_RATIO = D("0.3")
 _MAX_OUT_RATIO = D("0.3")
+_MAX_BALANCES = D("1e16")  # Matches _MAX_BALANCES = 1e34 in GyroECLPMath (1e16 at 18 decimals)
 
 
 Params = ECLPMathParamsQD
@@ -390,6 +391,396 @@ def calcXGivenY(y: D, p: Params, d: DerivedParams, r: Iterable[D]) -> D:
     return x
 
 
+def checkAssetBounds(
+    p: Params, d: DerivedParams, r: Iterable[D], newBal: D, assetIndex: int
+) -> bool:
+    """Returns False where GyroECLPMath.checkAssetBounds() would revert."""
+    maxBal = maxBalances0(p, d, r) if assetIndex == 0 else maxBalances1(p, d, r)
+    return newBal <= _MAX_BALANCES and newBal <= maxBal
+
+
+def calcOutGivenIn(
+    balances: Iterable[D],
+    amountIn: D,
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    r: Iterable[D],
+) -> Optional[D]:
+    """Mirrors GyroECLPMath.calcOutGivenIn(). Returns None where the Solidity function would revert."""
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    calcGiven = calcYGivenX if tokenInIsToken0 else calcXGivenY
+    balInNew = D(balances[ixIn]) + amountIn
+    if not checkAssetBounds(p, d, r, balInNew, ixIn):
+        return None
+    balOutNew = calcGiven(balInNew, p, d, r)
+    if balOutNew < 0 or balOutNew > balances[ixOut]:
+        return None
+    return balances[ixOut] - balOutNew
+
+
+def calcInGivenOut(
+    balances: Iterable[D],
+    amountOut: D,
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    r: Iterable[D],
+) -> Optional[D]:
+    """Mirrors GyroECLPMath.calcInGivenOut(). Returns None where the Solidity function would revert."""
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    calcGiven = calcXGivenY if tokenInIsToken0 else calcYGivenX
+    if not amountOut <= balances[ixOut]:
+        return None
+    balOutNew = D(balances[ixOut]) - amountOut
+    balInNew = calcGiven(balOutNew, p, d, r)
+    if not checkAssetBounds(p, d, r, balInNew, ixIn):
+        return None
+    if balInNew < 0 or balInNew < balances[ixIn]:
+        return None
+    return balInNew - balances[ixIn]
+
+
+########################################################################################################################
+### Batch versions of the above for quoting many amounts against the same pool state.
+### The terms of solveQuadraticSwap() that only depend on (params, derived, invariant) are computed once in
+### prepareQuadraticSwap(), and solveQuadraticSwapPrepared() only does the x-dependent rest. The operations are the
+### same as in solveQuadraticSwap() / calcXpXpDivLambdaLambda(), in the same order, so results are bit-identical.
+
+
+class QuadraticSwapTerms(NamedTuple):
+    ab: tuple[D, D]
+    s: D
+    c: D
+    lam: D
+    r: tuple[D, D]
+    twoS: D
+    twoC: D
+    # Coefficients for qb in solveQuadraticSwap(), for xp > 0 and xp <= 0, respectively.
+    qbCoeffPos: D2
+    qbCoeffNeg: D2
+    # x-independent parts of calcXpXpDivLambdaLambda()
+    xpxpVal: D
+    xpxpQa: D
+    xpxpQb: D
+    tauBeta0IsNeg: bool
+    xpxpQbCoeff: D2
+    xpxpQcCoeff: D2
+    # mulDownXpToNp(r[1] * r[1], sTerm[1])
+    rySTerm: D
+    # Coefficients for the final multiplication, for qb - qc > 0 and <= 0, respectively.
+    qaCoeffPos: D2
+    qaCoeffNeg: D2
+
+
+def prepareQuadraticSwap(
+    lam: D,
+    s: D,
+    c: D,
+    r: Iterable[D],
+    ab: Iterable[D],
+    tauBeta: Iterable[D2],
+    dSq: D2,
+) -> QuadraticSwapTerms:
+    """Same arguments as solveQuadraticSwap() except for x."""
+    lam2 = D2(D(lam).raw)
+    lamBar = (D2(1) - (D2(1) / lam2 / lam2), D2(1) - D2(1).div_up(lam2).div_up(lam2))
+    s2 = D2(D(s).raw)
+    sTerm = (
+        D2(1) - lamBar[1] * s2 * s2 / dSq,
+        D2(1) - lamBar[0].mul_up(s2).mul_up(s2) / (dSq + D2("1e-38")) - D2("1e-38"),
+    )
+
+    # See calcXpXpDivLambdaLambda()
+    dSq2 = dSq * dSq
+
+    val = D(r[0]).mul_up(r[0]).mul_up(c).mul_up(c)
+    val = mulUpXpToNp(val, tauBeta[0] * tauBeta[0] / dSq2 + D2("7e-38"))
+
+    termXp = tauBeta[0] * tauBeta[1] / dSq2
+    if termXp > 0:
+        q_a = D(r[0]).mul_up(r[0]).mul_up(2 * s).mul_up(c)
+        q_a = mulUpXpToNp(q_a, termXp + D2("7e-38"))
+    else:
+        q_a = D(r[1]) * r[1] * (2 * s) * c
+        q_a = mulUpXpToNp(q_a, termXp)
+
+    termXp = tauBeta[0] / dSq
+    qbCoeff = -termXp + D2("3e-38") if tauBeta[0] < 0 else termXp
+
+    termXp = tauBeta[1] * tauBeta[1] / dSq2 + D2("7e-38")
+    q_b = D(r[0]).mul_up(r[0]).mul_up(s).mul_up(s)
+    q_b = mulUpXpToNp(q_b, termXp)
+
+    return QuadraticSwapTerms(
+        ab=(ab[0], ab[1]),
+        s=s,
+        c=c,
+        lam=lam,
+        r=(r[0], r[1]),
+        twoS=2 * s,
+        twoC=2 * c,
+        qbCoeffPos=lamBar[1] / dSq,
+        qbCoeffNeg=lamBar[0] / dSq + D2("1e-38"),
+        xpxpVal=val,
+        xpxpQa=q_a,
+        xpxpQb=q_b,
+        tauBeta0IsNeg=tauBeta[0] < 0,
+        xpxpQbCoeff=qbCoeff,
+        xpxpQcCoeff=tauBeta[1] / dSq,
+        rySTerm=mulDownXpToNp(r[1] * r[1], sTerm[1]),
+        qaCoeffPos=D2(1) / sTerm[1] + D2("1e-38"),
+        qaCoeffNeg=D2(1) / sTerm[0],
+    )
+
+
+def solveQuadraticSwapPrepared(x: D, t: QuadraticSwapTerms) -> D:
+    """Equal to solveQuadraticSwap(t.lam, x, t.s, t.c, t.r, t.ab, tauBeta, dSq) if t was prepared with these args."""
+    xp = x - t.ab[0]
+    if xp > 0:
+        qb = -xp * t.s * t.c
+        qb = mulUpXpToNp(qb, t.qbCoeffPos)
+    else:
+        qb = -D(xp).mul_up(t.s).mul_up(t.c)
+        qb = mulUpXpToNp(qb, t.qbCoeffNeg)
+
+    # x-dependent part of calcXpXpDivLambdaLambda()
+    if t.tauBeta0IsNeg:
+        q_b = D(t.r[0]).mul_up(x).mul_up(t.twoC)
+    else:
+        q_b = -D(t.r[1]) * x * t.twoC
+    q_b = mulUpXpToNp(q_b, t.xpxpQbCoeff)
+    q_a = t.xpxpQa + q_b
+
+    q_c = -D(t.r[1]) * x * t.twoS
+    q_c = mulUpXpToNp(q_c, t.xpxpQcCoeff)
+
+    q_b = t.xpxpQb + q_c + D(x).mul_up(x)
+    q_b = D(q_b).div_up(t.lam) if q_b > 0 else q_b / t.lam
+
+    q_a = q_a + q_b
+    q_a = D(q_a).div_up(t.lam) if q_a > 0 else q_a / t.lam
+    xpxp = t.xpxpVal + q_a
+
+    qc = -xpxp
+    qc += t.rySTerm
+    if qc < 0:
+        qc = 0
+    qc = D(qc).sqrt()
+
+    if qb - qc > 0:
+        qa = mulUpXpToNp(qb - qc, t.qaCoeffPos)
+        return qa + t.ab[1]
+    else:
+        qa = mulUpXpToNp(qb - qc, t.qaCoeffNeg)
+        return qa + t.ab[1]
+
+
+def prepareCalcYGivenX(p: Params, d: DerivedParams, r: Iterable[D]):
+    a = virtualOffset0(p, d, r)
+    b = virtualOffset1(p, d, r)
+    return prepareQuadraticSwap(p.l, p.s, p.c, r, (a, b), d.tauBeta, d.dSq)
+
+
+def prepareCalcXGivenY(p: Params, d: DerivedParams, r: Iterable[D]):
+    a = virtualOffset0(p, d, r)
+    b = virtualOffset1(p, d, r)
+    tau_beta = (-d.tauAlpha[0], d.tauAlpha[1])
+    return prepareQuadraticSwap(p.l, p.c, p.s, r, (b, a), tau_beta, d.dSq)
+
+
+def calcYGivenXBatch(
+    xs: Iterable[D], p: Params, d: DerivedParams, r: Iterable[D]
+) -> list[D]:
+    t = prepareCalcYGivenX(p, d, r)
+    return [solveQuadraticSwapPrepared(x, t) for x in xs]
+
+
+def calcXGivenYBatch(
+    ys: Iterable[D], p: Params, d: DerivedParams, r: Iterable[D]
+) -> list[D]:
+    t = prepareCalcXGivenY(p, d, r)
+    return [solveQuadraticSwapPrepared(y, t) for y in ys]
+
+
+def calcOutGivenInBatch(
+    balances: Iterable[D],
+    amountsIn: Iterable[D],
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    r: Iterable[D],
+) -> list[Optional[D]]:
+    """Like calcOutGivenIn() for each of amountsIn, but sharing all work that doesn't depend on the amount."""
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    if tokenInIsToken0:
+        t = prepareCalcYGivenX(p, d, r)
+        maxBalIn = maxBalances0(p, d, r)
+    else:
+        t = prepareCalcXGivenY(p, d, r)
+        maxBalIn = maxBalances1(p, d, r)
+    balIn, balOut = D(balances[ixIn]), D(balances[ixOut])
+
+    amountsOut = []
+    for amountIn in amountsIn:
+        balInNew = balIn + amountIn
+        if not (balInNew <= _MAX_BALANCES and balInNew <= maxBalIn):
+            amountsOut.append(None)
+            continue
+        balOutNew = solveQuadraticSwapPrepared(balInNew, t)
+        if balOutNew < 0 or balOutNew > balOut:
+            amountsOut.append(None)
+            continue
+        amountsOut.append(balOut - balOutNew)
+    return amountsOut
+
+
+def calcInGivenOutBatch(
+    balances: Iterable[D],
+    amountsOut: Iterable[D],
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    r: Iterable[D],
+) -> list[Optional[D]]:
+    """Like calcInGivenOut() for each of amountsOut, but sharing all work that doesn't depend on the amount."""
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    if tokenInIsToken0:
+        t = prepareCalcXGivenY(p, d, r)
+        maxBalIn = maxBalances0(p, d, r)
+    else:
+        t = prepareCalcYGivenX(p, d, r)
+        maxBalIn = maxBalances1(p, d, r)
+    balIn, balOut = D(balances[ixIn]), D(balances[ixOut])
+
+    amountsIn = []
+    for amountOut in amountsOut:
+        if not amountOut <= balOut:
+            amountsIn.append(None)
+            continue
+        balInNew = solveQuadraticSwapPrepared(balOut - amountOut, t)
+        if not (balInNew <= _MAX_BALANCES and balInNew <= maxBalIn):
+            amountsIn.append(None)
+            continue
+        if balInNew < 0 or balInNew < balIn:
+            amountsIn.append(None)
+            continue
+        amountsIn.append(balInNew - balIn)
+    return amountsIn
+
+
+########################################################################################################################
+### calculateInvariantWithError() with all terms that only depend on (params, derived) computed once in
+### prepareInvariant(). calculateInvariantWithErrorPrepared() only does the balance-dependent rest, with the same
+### operations in the same order as calcAtAChi(), calcInvariantSqrt() and calculateInvariantWithError(), so results are
+### bit-identical. Useful when the invariant is recomputed after every swap of a long swap sequence.
+
+
+class InvariantTerms(NamedTuple):
+    p: Params
+    # Coefficients in calcAtAChi()
+    atAChiCoeffCS: D2
+    atAChiCoeffLSC: D2
+    atAChiCoeffSC: D2
+    # Coefficients in calcMinAtxAChiySqPlusAtxSq(), calc2AtxAtyAChixAChiy() and calcMinAtyAChixSqPlusAtySq()
+    atxCoeff: D2
+    atxatyCoeff: D2
+    atyCoeff: D2
+    invDSq: D2
+    # 1 / (calcAChiAChiInXp() - 1)
+    mulDenominator: D2
+    errDiv: D
+
+
+def prepareInvariant(p: Params, d: DerivedParams) -> InvariantTerms:
+    w, z, u, v, lam, dSq = (
+        D2(d.w),
+        D2(d.z),
+        D2(d.u),
+        D2(d.v),
+        D2(D(p.l).raw),
+        D2(d.dSq),
+    )
+    dSq2 = dSq * dSq
+    dSq4 = dSq * dSq * dSq * dSq
+
+    denominator = calcAChiAChiInXp(p, d) - D2(1)
+    assert denominator > 0
+
+    return InvariantTerms(
+        p=p,
+        atAChiCoeffCS=(w / lam + z) / lam / dSq2,
+        atAChiCoeffLSC=u / dSq2,
+        atAChiCoeffSC=v / dSq2,
+        atxCoeff=(u * u + (2 * u) * v / lam + v * v / lam / lam) / dSq4,
+        atxatyCoeff=(z * u + (w * u + z * v) / lam + w * v / lam / lam) / dSq4,
+        atyCoeff=(z * z + w * w / lam / lam + (2 * z) * w / lam) / dSq4,
+        invDSq=D2(1) / dSq,
+        mulDenominator=D2(1) / denominator,
+        errDiv=D(int(p.l * p.l)),
+    )
+
+
+def calculateInvariantWithErrorPrepared(
+    balances: Iterable[D], t: InvariantTerms
+) -> tuple[D, D]:
+    """Equal to calculateInvariantWithError(balances, p, d) if t was prepared with p and d."""
+    p = t.p
+    x, y = (D(balances[0]), D(balances[1]))
+
+    # calcAtAChi()
+    AtAChi = mulDownXpToNp(D(x) * p.c - D(y) * p.s, t.atAChiCoeffCS)
+    AtAChi += mulDownXpToNp(D(x) * p.l * p.s + D(y) * p.l * p.c, t.atAChiCoeffLSC)
+    AtAChi += mulDownXpToNp(D(x) * p.s + D(y) * p.c, t.atAChiCoeffSC)
+
+    # calcInvariantSqrt()
+    termNp = D(x).mul_up(x).mul_up(p.c).mul_up(p.c) + D(y).mul_up(y).mul_up(p.s).mul_up(
+        p.s
+    )
+    termNp -= x * y * (2 * p.c) * p.s
+    val = mulDownXpToNp(-termNp, t.atxCoeff)
+    termNp = (termNp - D("9e-18")) / p.l / p.l
+    val = val + mulDownXpToNp(termNp, t.invDSq)
+    sqrtVal = val
+
+    xy = D(y) * (2 * D(x))
+    termNp = (
+        (D(x) * x - D(y).mul_up(y)) * (2 * p.c) * p.s + xy * p.c * p.c - xy * p.s * p.s
+    )
+    sqrtVal += mulDownXpToNp(termNp, t.atxatyCoeff)
+
+    termNp = D(x).mul_up(x).mul_up(p.s).mul_up(p.s) + D(y).mul_up(y).mul_up(p.c).mul_up(
+        p.c
+    )
+    termNp += D(x).mul_up(y).mul_up(p.s * 2).mul_up(p.c)
+    val = mulDownXpToNp(-termNp, t.atyCoeff)
+    termNp = termNp - D("9e-18")
+    val = val + mulDownXpToNp(termNp, t.invDSq)
+    sqrtVal += val
+
+    err = (D(x).mul_up(x) + D(y).mul_up(y)) / D("1e38")
+    if sqrtVal < 0:
+        sqrtVal = 0
+    sqrt = D(sqrtVal).sqrt()
+
+    # calculateInvariantWithError()
+    if sqrt > 0:
+        err = D(err + D("1e-18")).div_up(2 * sqrt)
+    else:
+        err = D(err).sqrt() if err > 0 else D("1e-9")
+
+    err = (D(p.l).mul_up(x + y) / D("1e38") + err + D("1e-18")) * 20
+
+    invariant = mulDownXpToNp(AtAChi + sqrt - err, t.mulDenominator)
+    err = mulUpXpToNp(err, t.mulDenominator)
+    err = (
+        err
+        + mulUpXpToNp(D(invariant), t.mulDenominator) * t.errDiv * 40 / D("1e38")
+        + D("1e-18")
+    )
+    return invariant, err
+
+
 def invariantOverestimate(rDown: D) -> D:
     return D(rDown) + D(rDown).mul_up(D("1e-12"))
 
@@ -406,34 +797,39 @@ def divXp(a: int, b: int) -> int:
     return a_inflated // int(b)
 
 
+# Operate on the raw fixed-point integers directly; equal to int(D(a) * D("1e18")), int(b * D2("1e38")) and
+# D(prod) / D("1e18"), respectively, but without the intermediate decimal objects.
+_ONE_XP_TO_NP = 10**19
+
+
 def mulDownXpToNp(a: D, b: D2) -> D:
-    a = int(D(a) * D("1e18"))
-    b = int(b * D2("1e38"))
-    b1 = b // int(D("1e19"))
-    b2 = b - b1 * int(D("1e19")) if b1 != 0 else b
+    a = D(a).raw_int
+    b = D2(b).raw_int
+    b1 = b // _ONE_XP_TO_NP
+    b2 = b - b1 * _ONE_XP_TO_NP if b1 != 0 else b
     prod1 = a * b1
     prod2 = a * b2
     if prod1 >= 0 and prod2 >= 0:
-        prod = (prod1 + prod2 // int(D("1e19"))) // int(D("1e19"))
+        prod = (prod1 + prod2 // _ONE_XP_TO_NP) // _ONE_XP_TO_NP
     else:
         # have to use double minus signs b/c of how // operator works
-        prod = -((-prod1 - prod2 // int(D("1e19")) - 1) // int(D("1e19"))) - 1
-    return D(prod) / D("1e18")
+        prod = -((-prod1 - prod2 // _ONE_XP_TO_NP - 1) // _ONE_XP_TO_NP) - 1
+    return D.from_raw(prod)
 
 
 def mulUpXpToNp(a: D, b: D2) -> D:
-    a = int(D(a) * D("1e18"))
-    b = int(b * D2("1e38"))
-    b1 = b // int(D("1e19"))
-    b2 = b - b1 * int(D("1e19")) if b1 != 0 else b
+    a = D(a).raw_int
+    b = D2(b).raw_int
+    b1 = b // _ONE_XP_TO_NP
+    b2 = b - b1 * _ONE_XP_TO_NP if b1 != 0 else b
     prod1 = a * b1
     prod2 = a * b2
     if prod1 <= 0 and prod2 <= 0:
         # have to use double minus signs b/c of how // operator works
-        prod = -((-prod1 + -prod2 // int(D("1e19"))) // int(D("1e19")))
+        prod = -((-prod1 + -prod2 // _ONE_XP_TO_NP) // _ONE_XP_TO_NP)
     else:
-        prod = (prod1 + prod2 // int(D("1e19")) - 1) // int(D("1e19")) + 1
-    return D(prod) / D("1e18")
+        prod = (prod1 + prod2 // _ONE_XP_TO_NP - 1) // _ONE_XP_TO_NP + 1
+    return D.from_raw(prod)
 
 
 def tauXp(p: Params, px: D, dPx: D2) -> tuple[D2, D2]:
@@ -0,0 +1,174 @@
+"""Tabulated tau(px) over the price range of an ECLP, for evaluating it densely (e.g., ECLP.from_px_v() over a range of
+prices) without a square root per price.
+
+tau(px) is interpolated piecewise with cubic Hermite polynomials, with a certified bound on the interpolation error for
+each cell. Prices in cells whose bound exceeds the grid's tolerance, and prices outside [alpha, beta], are evaluated
+exactly (i.e., by Params.tau()) instead.
+
+Math: tau(px) = eta(zeta(px)) = (sin θ, cos θ), where θ = atan(zeta(px)). For the ECLP, θ(px) = atan((px - v) / w) +
+const, where v and w only depend on the parameters (v is the price where the ellipse is flattest). Thus, up to a
+rotation, tau(px) = (u, w) / sqrt(u^2 + w^2) with u = px - v, and the derivatives of its components satisfy
+|d^4/dpx^4| <= 24 / (u^2 + w^2)^2 (by Faà di Bruno's formula and |θ^(m)| <= (m-1)! / (u^2 + w^2)^(m/2)). The Hermite
+interpolation error on a cell of width h is therefore at most h^4 / (16 (u_min^2 + w^2)^2), where u_min is the minimum of
+|u| on the cell. Nodes are spaced uniformly in asinh(u / w), which makes this bound about the same for all cells.
+
+Node values and derivatives are computed in 100 decimals, and the polynomials are evaluated on the raw fixed-point
+integers of the model's precision (like the *XpToNp functions in eclp_prec_implementation.py). The bound includes the
+rounding of both. It is relative to the exact tau; the model's own tau is off by up to ~1e4 units of the least precision
+in 18 decimals for large l.
+
+Works with the Params of eclp.py, eclp_38.py and eclp_100.py.
+"""
+
+import bisect
+from functools import lru_cache
+from math import asinh, ceil, sinh
+from typing import List, Optional, Tuple
+
+from tests.geclp import eclp_100
+from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
+
+DEFAULT_TOLERANCE = 1e-12
+# Limits memory and construction time. The number of cells grows with tolerance^(-1/4) and logarithmically with l; 1e-12
+# needs a few hundred to a few ten thousand cells. If a tolerance would need more than MAX_CELLS cells (or is below the
+# rounding error of the model), the grid is not built and all prices are evaluated exactly.
+MAX_CELLS = 100_000
+# Rounding of the coefficients and the Horner steps, in units of the least precision of the model
+ROUNDING_MARGIN = 8
+# Absolute error of the node values and derivatives, which are computed in 100 decimals. Generous, since rounding is
+# amplified by l there as well.
+NODE_ERROR = 1e-85
+
+
+def _theta_derivative(params, px):
+    """d/dpx of atan(zeta(px)), in the precision of `params`."""
+    c, s, l = params.c, params.s, params.l
+    q = (c + s * px) ** 2 + l**2 * (c * px - s) ** 2
+    return l * (c**2 + s**2) / q
+
+
+class TauGrid:
+    def __init__(
+        self,
+        params,
+        tolerance: float = DEFAULT_TOLERANCE,
+        n_cells: Optional[int] = None,
+        max_cells: int = MAX_CELLS,
+    ):
+        """`params` are the Params of one of the models. If `n_cells` is not given, it's chosen such that all cells
+        are precise enough for `tolerance`."""
+        self.params = params
+        self.tolerance = tolerance
+        self._D = D = type(params.alpha)
+        self._one = D(1).raw_int
+        self._ulp = float(D.from_raw(1))
+        self.exact_tau = lru_cache(maxsize=4096)(params.tau)
+
+        c, s, l = float(params.c), float(params.s), float(params.l)
+        a = s**2 + l**2 * c**2
+        self.v = c * s * (l**2 - 1) / a
+        self.w = l * (c**2 + s**2) / a
+
+        s_alpha = asinh((float(params.alpha) - self.v) / self.w)
+        s_beta = asinh((float(params.beta) - self.v) / self.w)
+        if n_cells is None:
+            # Cells where u doesn't change sign have h / (u_min^2 + w^2)^(1/2) <= step * (1 + O(step)).
+            step = (8 * tolerance) ** 0.25
+            n_cells = max(ceil((s_beta - s_alpha) / step), 1)
+            if n_cells > max_cells or ROUNDING_MARGIN * self._ulp >= tolerance:
+                n_cells = 1
+        nodes = [params.alpha]
+        for i in range(1, n_cells):
+            si = s_alpha + (s_beta - s_alpha) * i / n_cells
+            node = D(self.v + self.w * sinh(si))
+            # Nodes can coincide after rounding for very flat ellipses.
+            if nodes[-1] < node < params.beta:
+                nodes.append(node)
+        nodes.append(params.beta)
+        self.nodes: List = nodes
+        self._raw_nodes = [p.raw_int for p in nodes]
+
+        params_100 = eclp_100.Params(
+            *(
+                D3(x.raw)
+                for x in (params.alpha, params.beta, params.rx, params.ry, params.l)
+            )
+        )
+        nodes_100 = [D3(p.raw) for p in nodes]
+        taus = [params_100.tau(p) for p in nodes_100]
+        derivatives = []
+        for p, (tx, ty) in zip(nodes_100, taus):
+            dtheta = _theta_derivative(params_100, p)
+            derivatives.append((dtheta * ty, -dtheta * tx))
+
+        # Per cell and component, the raw coefficients of 1, u, u^2, u^3, where u is the offset from the cell's node.
+        self._coefficients: List[Tuple[Tuple[int, ...], ...]] = []
+        self.error_bounds: List[float] = []
+        for i in range(len(nodes) - 1):
+            h = nodes_100[i + 1] - nodes_100[i]
+            cell = []
+            for k in range(2):
+                f0, f1 = taus[i][k], taus[i + 1][k]
+                d0, d1 = derivatives[i][k], derivatives[i + 1][k]
+                slope = (f1 - f0) / h
+                a2 = (3 * slope - 2 * d0 - d1) / h
+                # Not divided by h * h, which may round to 0.
+                a3 = (d0 + d1 - 2 * slope) / h / h
+                cell.append(tuple(self._to_raw(x) for x in (f0, d0, a2, a3)))
+            self._coefficients.append(tuple(cell))
+            self.error_bounds.append(
+                self._cell_error_bound(float(nodes[i]), float(nodes[i + 1]))
+            )
+
+    def _to_raw(self, x: D3) -> int:
+        """Raw integer of x in the model's precision, rounded down"""
+        return x.raw_int // (D3(1).raw_int // self._one)
+
+    def _cell_error_bound(self, p0: float, p1: float) -> float:
+        h = p1 - p0
+        if p0 <= self.v <= p1:
+            u_min = 0.0
+        else:
+            u_min = min(abs(p0 - self.v), abs(p1 - self.v))
+        interpolation = h**4 / (16 * (u_min**2 + self.w**2) ** 2)
+        # Coefficient and Horner rounding, amplified by powers of the offset in the cell
+        rounding = (ROUNDING_MARGIN * self._ulp + NODE_ERROR) * (1 + h) ** 3
+        # The bound itself is computed in floating point.
+        return interpolation * (1 + 1e-9) + rounding
+
+    @property
+    def n_cells(self) -> int:
+        return len(self._coefficients)
+
+    def _cell(self, raw_px: int) -> Optional[int]:
+        if not self._raw_nodes[0] <= raw_px <= self._raw_nodes[-1]:
+            return None
+        i = bisect.bisect_right(self._raw_nodes, raw_px) - 1
+        # beta belongs to the last cell.
+        return min(i, self.n_cells - 1)
+
+    def tau_with_error(self, px) -> Tuple[Tuple, float]:
+        """(tau(px), error bound). The bound is 0 if tau(px) was evaluated exactly."""
+        raw_px = px.raw_int
+        i = self._cell(raw_px)
+        if i is None or self.error_bounds[i] > self.tolerance:
+            return self.exact_tau(px), 0.0
+        u, one = raw_px - self._raw_nodes[i], self._one
+        ret = []
+        for a0, a1, a2, a3 in self._coefficients[i]:
+            t = a3 * u // one + a2
+            t = t * u // one + a1
+            ret.append(self._D.from_raw(t * u // one + a0))
+        return tuple(ret), self.error_bounds[i]
+
+    def tau(self, px) -> Tuple:
+        """tau(px), within the tolerance of the exact value. Can be passed to ECLP.from_px_r() and .from_px_v()."""
+        return self.tau_with_error(px)[0]
+
+    def max_error_bound(self) -> float:
+        """Largest error of values returned by tau()."""
+        return max((e for e in self.error_bounds if e <= self.tolerance), default=0.0)
+
+    def exact_fraction(self) -> float:
+        """Fraction of cells that fall back to exact evaluation."""
+        return sum(e > self.tolerance for e in self.error_bounds) / self.n_cells
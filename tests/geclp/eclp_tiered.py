@@ -0,0 +1,284 @@
+"""The `ECLP` reference model (eclp.py) evaluated at the lowest precision that decides the outcome.
+
+Operations are first evaluated in floating point (eclp_float.py), together with an estimate of the rounding error of
+every value they compute. If a decision (does the swap revert?) is within that error of its threshold, or the error of
+the result exceeds the caller's tolerance, the operation is repeated at the next tier: 38, then 100 decimals. Revert
+decisions therefore match what the 100-decimal model decides, while most evaluations only pay for floats.
+
+The error estimates are a-priori bounds in terms of quantities that are cheap to compute in floating point, scaled by
+the unit of least precision of the tier. They were fitted against the 100-decimal model over the ranges of
+util.gen_params() and balances up to 1e11, where they overestimate the actual error by at most a factor of ~7 and
+typically by orders of magnitude. SAFETY_FACTOR adds margin on top of that.
+
+The 18-decimal model is available as TIER_18, but not used by default: with int-backed QuantizedDecimals, 18 decimals
+cost about the same as 38, and their error is 1e20 times larger.
+
+Balances and amounts are QuantizedDecimals of any precision.
+"""
+
+import decimal
+import sys
+from functools import lru_cache
+from math import sqrt
+from types import ModuleType
+from typing import Callable, NamedTuple, Optional, Sequence
+
+from tests.geclp import eclp, eclp_38, eclp_100, eclp_float
+from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
+from tests.support.types import ECLPMathParams
+
+# Matches _MAX_BALANCES in eclp_prec_implementation.py / GyroECLPMath.
+MAX_BALANCES = 10**16
+
+# An operation is escalated if a decision margin is within SAFETY_FACTOR times its estimated error.
+SAFETY_FACTOR = 100
+
+
+class Tier(NamedTuple):
+    name: str
+    # eclp_float, eclp, eclp_38 or eclp_100
+    module: ModuleType
+    # Absolute rounding unit for the fixed-point tiers, relative one (machine epsilon) for floats. The error model
+    # works for both, as its terms scale with the magnitudes of the values involved.
+    ulp: float
+
+
+TIER_FLOAT = Tier("float", eclp_float, sys.float_info.epsilon)
+TIER_18 = Tier("18 decimals", eclp, 1e-18)
+TIER_38 = Tier("38 decimals", eclp_38, 1e-38)
+TIER_100 = Tier("100 decimals", eclp_100, 1e-100)
+DEFAULT_TIERS = (TIER_FLOAT, TIER_38, TIER_100)
+
+
+class TieredResult(NamedTuple):
+    # None if the operation reverts
+    value: Optional[D3]
+    # Estimated absolute rounding error of `value`
+    error: float
+    # Name of the tier that produced the result
+    tier: str
+
+
+class _Evaluation(NamedTuple):
+    value: Optional[object]
+    error: float
+    # False if a decision was too close to call at this tier
+    decided: bool
+
+
+class _Decisions:
+    def __init__(self):
+        self.decided = True
+
+    def holds(self, margin, error: float) -> bool:
+        """Whether `margin >= 0`. Marks the evaluation as undecided if the margin is within the error."""
+        if abs(float(margin)) <= SAFETY_FACTOR * error:
+            self.decided = False
+        return margin >= 0
+
+
+@lru_cache(maxsize=256)
+def _tier_params(module: ModuleType, params: ECLPMathParams):
+    """Params of the tier's model. Cached, since every instance computes tau(alpha) and tau(beta) lazily."""
+    D = module.D
+    # D(Decimal) for all tiers, including floats
+    return module.Params(
+        D(params.alpha.raw),
+        D(params.beta.raw),
+        D(params.c.raw),
+        -D(params.s.raw),
+        D(params.l.raw),
+    )
+
+
+def _invariant_error(tier: Tier, e) -> float:
+    """Estimated error of e.r, which was computed by `ECLP.from_x_y()`. The terms are the ones of that computation.
+    Also bounds the error of the offsets and exhaustion points derived from r."""
+    p = e.params
+    c, s, l = float(p.c), float(p.s), float(p.l)
+    x, y, r = float(e.x), float(e.y), float(e.r)
+
+    def A_times(x, y):
+        return c * x / l - s * y / l, s * x + c * y
+
+    tau_beta_x, tau_beta_y = (float(v) for v in p.tau_beta)
+    tau_alpha_x, tau_alpha_y = (float(v) for v in p.tau_alpha)
+    achi = A_times(
+        tau_beta_x * l * c + s * tau_beta_y, -tau_alpha_x * l * s + c * tau_alpha_y
+    )
+    at = A_times(x, y)
+    achi_squared = achi[0] ** 2 + achi[1] ** 2
+    a = achi_squared - 1
+    b = at[0] * achi[0] + at[1] * achi[1]
+    cc = at[0] ** 2 + at[1] ** 2
+    d = b * b - a * cc
+    # a cancels for large l, and r is roughly proportional to 1 / a.
+    error_a = tier.ulp * achi_squared
+    if r <= 0 or a <= SAFETY_FACTOR * error_a or d <= 0:
+        return float("inf")
+    m = max(abs(x), abs(y), r)
+    return (
+        tier.ulp * l * l * ((1 + m) + (a * r * r + cc) / sqrt(d) + r / a)
+        + r * error_a / a
+    )
+
+
+def _swap_error(tier: Tier, e, given: float, other: float, x_given: bool) -> float:
+    """Estimated error of `e._compute_y_for_x(given)` (if `x_given`) or `e._compute_x_for_y(given)`, where `other`
+    is the current balance of the computed asset."""
+    p = e.params
+    c, s, l, r = float(p.c), float(p.s), float(p.l), float(e.r)
+    if not x_given:
+        c, s = s, c
+    offset = float(e.a) if x_given else float(e.b)
+    # Terms of the discriminant in the computation, which is small close to the exhaustion point.
+    ls = 1 - 1 / l**2
+    gp = given - offset
+    den = 1 - ls * s**2
+    positive = s**2 * c**2 * ls**2 * gp**2 + den * r**2
+    discriminant = positive - den * (1 - ls * c**2) * gp**2
+    # Below float resolution, assume the worst that float can't tell apart from zero.
+    discriminant = max(discriminant, 1e-15 * positive)
+    if r == 0 or discriminant <= 0:
+        return float("inf")
+    m = max(abs(given), abs(other), r)
+    err_r = _invariant_error(tier, e)
+    return (
+        err_r * (1 + m / r)
+        + tier.ulp * l * l * (m * m + r * r) / sqrt(discriminant) / den
+    )
+
+
+def _run(evaluate: Callable[[Tier], _Evaluation], tiers, tolerance) -> TieredResult:
+    for i, tier in enumerate(tiers):
+        is_last = i == len(tiers) - 1
+        try:
+            result = evaluate(tier)
+        except (decimal.InvalidOperation, ZeroDivisionError, OverflowError):
+            # Intermediate values exceed the range of the tier (78 digits in total for 18 and 38 decimals), or
+            # cancel to zero in floating point.
+            if is_last:
+                raise
+            continue
+        precise_enough = (
+            tolerance is None or result.value is None or result.error <= tolerance
+        )
+        if is_last or (result.decided and precise_enough):
+            return TieredResult(_to_d3(result.value), result.error, tier.name)
+
+
+def _to_d3(value) -> Optional[D3]:
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return D3(decimal.Decimal(value))
+    return D3(value.raw)
+
+
+def _from_balances(tier: Tier, balances: Sequence, params: ECLPMathParams):
+    D, p = tier.module.D, _tier_params(tier.module, params)
+    return tier.module.ECLP.from_x_y(D(balances[0].raw), D(balances[1].raw), p)
+
+
+def invariant(
+    balances: Sequence,
+    params: ECLPMathParams,
+    tolerance: Optional[float] = None,
+    tiers: Sequence[Tier] = DEFAULT_TIERS,
+) -> TieredResult:
+    """Invariant r of the pool with the given balances. Only escalates if the error exceeds `tolerance`."""
+
+    def evaluate(tier: Tier) -> _Evaluation:
+        e = _from_balances(tier, balances, params)
+        return _Evaluation(e.r, _invariant_error(tier, e), True)
+
+    return _run(evaluate, tiers, tolerance)
+
+
+def _compute_given(e, token0_given: bool, given):
+    """Balance of the other token for a new balance `given` of token 0 (if `token0_given`) or 1, None if it would be
+    negative."""
+    if token0_given:
+        return e._compute_y_for_x(given, nomaxvals=True)
+    return e._compute_x_for_y(given, nomaxvals=True)
+
+
+def calc_out_given_in(
+    balances: Sequence,
+    amount_in,
+    token_in_is_token0: bool,
+    params: ECLPMathParams,
+    tolerance: Optional[float] = None,
+    tiers: Sequence[Tier] = DEFAULT_TIERS,
+) -> TieredResult:
+    """Amount out of a swap in the model, with the same revert conditions as eclp_prec_implementation.calcOutGivenIn():
+    the new balance in must not exceed MAX_BALANCES or the exhaustion point, and the amount out must be non-negative
+    and at most the balance out. Reverts are returned as None."""
+    ix_in, ix_out = (0, 1) if token_in_is_token0 else (1, 0)
+
+    def evaluate(tier: Tier) -> _Evaluation:
+        D = tier.module.D
+        e = _from_balances(tier, balances, params)
+        decisions = _Decisions()
+        bal_in_new = D(balances[ix_in].raw) + D(amount_in.raw)
+        bal_out = D(balances[ix_out].raw)
+        if not bal_in_new <= MAX_BALANCES:
+            return _Evaluation(None, 0.0, True)
+
+        max_in = e.xmax if token_in_is_token0 else e.ymax
+        if not decisions.holds(max_in - bal_in_new, _invariant_error(tier, e)):
+            return _Evaluation(None, 0.0, decisions.decided)
+
+        bal_out_new = _compute_given(e, token_in_is_token0, bal_in_new)
+        if bal_out_new is None:
+            # Only possible beyond the exhaustion point, so the check above was off.
+            return _Evaluation(None, 0.0, False)
+        error = _swap_error(
+            tier, e, float(bal_in_new), float(bal_out), token_in_is_token0
+        )
+        if not decisions.holds(bal_out - bal_out_new, error):
+            return _Evaluation(None, 0.0, decisions.decided)
+        return _Evaluation(bal_out - bal_out_new, error, decisions.decided)
+
+    return _run(evaluate, tiers, tolerance)
+
+
+def calc_in_given_out(
+    balances: Sequence,
+    amount_out,
+    token_in_is_token0: bool,
+    params: ECLPMathParams,
+    tolerance: Optional[float] = None,
+    tiers: Sequence[Tier] = DEFAULT_TIERS,
+) -> TieredResult:
+    """Amount in of a swap in the model, with the same revert conditions as eclp_prec_implementation.calcInGivenOut().
+    Reverts are returned as None."""
+    ix_in, ix_out = (0, 1) if token_in_is_token0 else (1, 0)
+
+    def evaluate(tier: Tier) -> _Evaluation:
+        D = tier.module.D
+        e = _from_balances(tier, balances, params)
+        decisions = _Decisions()
+        bal_in = D(balances[ix_in].raw)
+        bal_out = D(balances[ix_out].raw)
+        if not D(amount_out.raw) <= bal_out:
+            return _Evaluation(None, 0.0, True)
+        bal_out_new = bal_out - D(amount_out.raw)
+
+        bal_in_new = _compute_given(e, not token_in_is_token0, bal_out_new)
+        if bal_in_new is None:
+            return _Evaluation(None, 0.0, False)
+        error = _swap_error(
+            tier, e, float(bal_out_new), float(bal_in), not token_in_is_token0
+        )
+        max_in = e.xmax if token_in_is_token0 else e.ymax
+        error_max_in = error + _invariant_error(tier, e)
+        if not (
+            decisions.holds(MAX_BALANCES - bal_in_new, error)
+            and decisions.holds(max_in - bal_in_new, error_max_in)
+            and decisions.holds(bal_in_new - bal_in, error)
+        ):
+            return _Evaluation(None, 0.0, decisions.decided)
+        return _Evaluation(bal_in_new - bal_in, error, decisions.decided)
+
+    return _run(evaluate, tiers, tolerance)
@@ -0,0 +1,148 @@
+from brownie.test import given
+from hypothesis import assume, settings
+from hypothesis import strategies as st
+
+from tests.geclp import eclp_derivatives
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.util import bpool_params, gen_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.util_common import gen_balances
+from tests.support.utils import qdecimals
+
+METRICS = [
+    "dyin_dxout",
+    "dxin_dyout",
+    "dyout_dxin",
+    "dxout_dyin",
+    "dpx_dxout",
+    "dpy_dyout",
+    "dpy_dxin",
+    "dpx_dyin",
+    "normalized_liquidity_yin",
+    "normalized_liquidity_xin",
+]
+
+
+def reference_metrics(balances, params, fee, r_vec, r):
+    """The metrics as computed by the module-level functions before SORContext, with all setup redone per metric. Maps
+    names to functions without arguments."""
+    _, _, c, s, l = params
+    x0, y0 = balances
+
+    def setup():
+        derived = prec_impl.calc_derived_values(params)
+        a = prec_impl.virtualOffset0(params, derived, r_vec)
+        b = prec_impl.virtualOffset1(params, derived, r_vec)
+        return a, b, 1 - 1 / l**2, 1 - fee
+
+    def setup_x():
+        a, b, ls, f = setup()
+        return a, ls, f, (r**2 * (1 - ls * s**2) - (x0 - a) ** 2 / l**2).sqrt()
+
+    def setup_y():
+        a, b, ls, f = setup()
+        return b, ls, f, (r**2 * (1 - ls * c**2) - (y0 - b) ** 2 / l**2).sqrt()
+
+    def dyin_dxout():
+        a, ls, f, R = setup_x()
+        return 1 / (f * (1 - ls * s**2)) * (ls * s * c - (x0 - a) / (l**2 * R))
+
+    def dxin_dyout():
+        b, ls, f, R = setup_y()
+        return 1 / (f * (1 - ls * c**2)) * (ls * s * c - (y0 - b) / (l**2 * R))
+
+    def dyout_dxin():
+        a, ls, f, R = setup_x()
+        return f / (1 - ls * s**2) * (ls * s * c - (x0 - a) / (l**2 * R))
+
+    def dxout_dyin():
+        b, ls, f, R = setup_y()
+        return f / (1 - ls * c**2) * (ls * s * c - (y0 - b) / (l**2 * R))
+
+    def dpx_dxout():
+        a, ls, f, R = setup_x()
+        return (
+            1
+            / (f * (1 - ls * s**2))
+            * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
+        )
+
+    def dpy_dyout():
+        b, ls, f, R = setup_y()
+        return (
+            1
+            / (f * (1 - ls * c**2))
+            * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
+        )
+
+    def dpy_dxin():
+        a, ls, f, R = setup_x()
+        return (
+            (1 - ls * s**2)
+            * (1 / (l**2 * R) + (x0 - a) ** 2 / (l**4 * R**3))
+            / (ls * s * c - (x0 - a) / (l**2 * R)) ** 2
+        )
+
+    def dpx_dyin():
+        b, ls, f, R = setup_y()
+        return (
+            (1 - ls * c**2)
+            * (1 / (l**2 * R) + (y0 - b) ** 2 / (l**4 * R**3))
+            / (ls * s * c - (y0 - b) / (l**2 * R)) ** 2
+        )
+
+    def normalized_liquidity_yin():
+        b, ls, f, R = setup_y()
+        return (
+            1
+            / (1 - ls * c**2)
+            * (R * (ls * s * c * l**2 * R - (y0 - b)) ** 2)
+            / (l**2 * R**2 + (y0 - b) ** 2)
+        )
+
+    def normalized_liquidity_xin():
+        a, ls, f, R = setup_x()
+        return (
+            1
+            / (1 - ls * s**2)
+            * (R * (ls * s * c * l**2 * R - (x0 - a)) ** 2)
+            / (l**2 * R**2 + (x0 - a) ** 2)
+        )
+
+    functions = locals()
+    return {name: functions[name] for name in METRICS}
+
+
+def outcome(f):
+    """Return value of f(), or the type of the arithmetic error it raises. The formulas are in 18 decimals and can fail
+    for extreme params or balances at the edge of the curve."""
+    try:
+        return f()
+    except ArithmeticError as e:
+        return type(e)
+
+
+@settings(max_examples=20)
+@given(
+    params=gen_params(),
+    balances=gen_balances(2, bpool_params),
+    fee=qdecimals("0", "0.1"),
+    use_overestimate=st.booleans(),
+)
+def test_sor_context_matches_reference(params, balances, fee, use_overestimate):
+    assume(balances[0] > 0 and balances[1] > 0)
+    derived = prec_impl.calc_derived_values(params)
+    invariant, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    r_vec = (invariant + 2 * D(err), invariant)
+    r = r_vec[0] if use_overestimate else None
+
+    expected = reference_metrics(
+        balances, params, fee, r_vec, r_vec[0] if use_overestimate else r_vec[1]
+    )
+    context = eclp_derivatives.SORContext(balances, params, fee, r_vec, r)
+    for name in METRICS:
+        wrapper = getattr(eclp_derivatives, name)
+        assert outcome(lambda: getattr(context, name)) == outcome(expected[name]), name
+        assert outcome(lambda: wrapper(balances, params, fee, r_vec, r)) == outcome(
+            expected[name]
+        ), name
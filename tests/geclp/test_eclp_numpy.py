@@ -0,0 +1,69 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+
+from tests.geclp import eclp_numpy
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.test_eclp_prec_impl import bpool_params, gen_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.util_common import gen_balances
+from tests.support.utils import qdecimals
+
+gen_balances_list = st.lists(gen_balances(2, bpool_params), min_size=1, max_size=10)
+gen_amounts = qdecimals(0, 1_000_000_000)
+
+
+def _exact(balances, amount, tokenInIsToken0, givenIn, params, derived):
+    invariant, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    r = (invariant + 2 * D(err), invariant)
+    fct = prec_impl.calcOutGivenIn if givenIn else prec_impl.calcInGivenOut
+    return fct(balances, amount, tokenInIsToken0, params, derived, r)
+
+
+@given(
+    params=gen_params(),
+    balances=gen_balances_list,
+    amount=gen_amounts,
+    tokenInIsToken0=st.booleans(),
+    givenIn=st.booleans(),
+)
+def test_float_error_bound(params, balances, amount, tokenInIsToken0, givenIn):
+    derived = prec_impl.calc_derived_values(params)
+    fp = eclp_numpy.float_params(params, derived)
+    amounts = [amount] * len(balances)
+    fct = eclp_numpy.calc_out_given_in if givenIn else eclp_numpy.calc_in_given_out
+    quotes = fct(balances, amounts, tokenInIsToken0, fp)
+
+    for bals, amount_float, error in zip(balances, quotes.amounts, quotes.errors):
+        if not np.isfinite(error):
+            continue
+        exact = _exact(bals, amount, tokenInIsToken0, givenIn, params, derived)
+        if exact is None:
+            assert np.isnan(amount_float)
+        else:
+            assert abs(amount_float - float(exact)) <= error
+
+
+@given(
+    params=gen_params(),
+    balances=gen_balances_list,
+    amount=gen_amounts,
+    tokenInIsToken0=st.booleans(),
+    givenIn=st.booleans(),
+)
+def test_quote_falls_back_to_exact(params, balances, amount, tokenInIsToken0, givenIn):
+    derived = prec_impl.calc_derived_values(params)
+    amounts = [amount] * len(balances)
+    fct = eclp_numpy.quote_out_given_in if givenIn else eclp_numpy.quote_in_given_out
+    rtol = 1e-12
+    quotes = fct(balances, amounts, tokenInIsToken0, params, derived, rtol=rtol)
+
+    for i, bals in enumerate(balances):
+        exact = _exact(bals, amount, tokenInIsToken0, givenIn, params, derived)
+        if i in quotes.exact:
+            assert quotes.exact[i] == exact
+        elif exact is None:
+            assert np.isnan(quotes.amounts[i])
+        else:
+            assert quotes.errors[i] <= max(1e-9, rtol * abs(quotes.amounts[i]))
+            assert abs(quotes.amounts[i] - float(exact)) <= quotes.errors[i]
@@ -1,4 +1,6 @@
 import decimal
+import os
+import tempfile
 from decimal import Decimal
 from decimal import Decimal
 from math import pi, sin, cos
@@ -20,6 +22,9 @@ from tests.support.util_common import (
 )
 from tests.geclp import eclp_100 as mimpl
 from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import eclp_derived_params
+from tests.geclp import util
+from tests.geclp.eclp_pool_simulator import ECLPPoolSimulator, Swap
 from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
 from tests.support.types import *
 from tests.support.utils import scale, to_decimal, qdecimals, unscale, apply_deep
@@ -891,6 +896,160 @@ def test_calcYGivenX_sense_check(params, balances):
     assert convd(x, D3) == x_py.approxed(abs=D("1e-8"))
 
 
+@given(
+    params=gen_params(),
+    balances=gen_balances(2, bpool_params),
+    amounts=st.lists(qdecimals(0, 1_000_000_000), min_size=1, max_size=10),
+    tokenInIsToken0=st.booleans(),
+)
+def test_swap_batch_matches_scalar(params, balances, amounts, tokenInIsToken0):
+    derived = prec_impl.calc_derived_values(params)
+    invariant, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    r = (invariant + 2 * D(err), invariant)
+
+    amounts_out = prec_impl.calcOutGivenInBatch(
+        balances, amounts, tokenInIsToken0, params, derived, r
+    )
+    amounts_in = prec_impl.calcInGivenOutBatch(
+        balances, amounts, tokenInIsToken0, params, derived, r
+    )
+    for amount, amount_out, amount_in in zip(amounts, amounts_out, amounts_in):
+        assert amount_out == prec_impl.calcOutGivenIn(
+            balances, amount, tokenInIsToken0, params, derived, r
+        )
+        assert amount_in == prec_impl.calcInGivenOut(
+            balances, amount, tokenInIsToken0, params, derived, r
+        )
+
+    xs = [balances[0] + amount for amount in amounts]
+    assert prec_impl.calcYGivenXBatch(xs, params, derived, r) == [
+        prec_impl.calcYGivenX(x, params, derived, r) for x in xs
+    ]
+    assert prec_impl.calcXGivenYBatch(xs, params, derived, r) == [
+        prec_impl.calcXGivenY(x, params, derived, r) for x in xs
+    ]
+
+
+@given(
+    params=gen_params(),
+    balances=gen_balances(2, bpool_params),
+    swaps=st.lists(
+        st.builds(Swap, qdecimals(0, 1_000_000), st.booleans(), st.booleans()),
+        min_size=1,
+        max_size=10,
+    ),
+)
+def test_pool_simulator_incremental_invariant(params, balances, swaps):
+    derived = prec_impl.calc_derived_values(params)
+    assert prec_impl.calculateInvariantWithErrorPrepared(
+        balances, prec_impl.prepareInvariant(params, derived)
+    ) == prec_impl.calculateInvariantWithError(balances, params, derived)
+
+    fee = D("0.001")
+    sim = ECLPPoolSimulator(params, balances, fee, derived)
+    sim_ref = ECLPPoolSimulator(params, balances, fee, derived, incremental=False)
+    assert sim.run(swaps) == sim_ref.run(swaps)
+    assert sim.balances == sim_ref.balances
+    assert sim.r == sim_ref.r
+
+
+@given(
+    params=gen_params(),
+    balances=gen_balances(2, bpool_params),
+    fee=qdecimals("0", "0.01"),
+    swaps=st.lists(
+        st.builds(Swap, qdecimals(0, 1_000_000), st.booleans(), st.booleans()),
+        min_size=1,
+        max_size=10,
+    ),
+)
+def test_pool_simulator_matches_scalar(params, balances, fee, swaps):
+    derived = prec_impl.calc_derived_values(params)
+    sim = ECLPPoolSimulator(params, balances, fee, derived)
+    balances = [D(b) for b in balances]
+    for swap in swaps:
+        invariant, err = prec_impl.calculateInvariantWithError(
+            balances, params, derived
+        )
+        r = (invariant + 2 * D(err), invariant)
+        ixIn, ixOut = (0, 1) if swap.tokenInIsToken0 else (1, 0)
+        if swap.givenIn:
+            # The fee is taken from the amount in and stays in the pool.
+            amount_in = swap.amount
+            amount_out = prec_impl.calcOutGivenIn(
+                balances,
+                amount_in - amount_in.mul_up(fee),
+                swap.tokenInIsToken0,
+                params,
+                derived,
+                r,
+            )
+            expected = amount_out
+        else:
+            amount_out = swap.amount
+            amount_in = prec_impl.calcInGivenOut(
+                balances, amount_out, swap.tokenInIsToken0, params, derived, r
+            )
+            if amount_in is not None:
+                amount_in = amount_in.div_up(1 - fee)
+            expected = amount_in
+
+        assert sim.swap(swap) == expected
+        if expected is not None:
+            balances[ixIn] += amount_in
+            balances[ixOut] -= amount_out
+        assert sim.balances == balances
+        assert (sim.invariant, sim.invariant_err) == (
+            prec_impl.calculateInvariantWithError(balances, params, derived)
+        )
+
+
+@given(params=gen_params())
+def test_derived_params_store(params):
+    store = eclp_derived_params.DerivedParamsStore(maxsize=2)
+    derived = store.get(params)
+    assert derived == prec_impl.calc_derived_values(params)
+    assert store.get(params) is derived
+    assert (store.hits, store.misses) == (1, 1)
+
+    loaded = eclp_derived_params.DerivedParamsStore()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "derived.json")
+        store.save(path)
+        assert loaded.load(path) == 1
+    assert params in loaded
+    assert loaded.get(params) == derived
+    assert loaded.misses == 0
+
+
+def test_derived_params_store_lru():
+    params = [
+        ECLPMathParamsQD(D("0.97"), D("1.02"), D(c), D(s), D("200"))
+        for c, s in [("0.8", "0.6"), ("0.6", "0.8"), ("1", "0")]
+    ]
+    store = eclp_derived_params.DerivedParamsStore(maxsize=2)
+    store.get(params[0])
+    store.get(params[1])
+    store.get(params[0])
+    store.get(params[2])
+    assert params[0] in store and params[2] in store
+    assert params[1] not in store
+
+
+def test_derived_params_file_up_to_date():
+    """The cached file must be regenerated with scripts/cache_eclp_derived_params.py whenever
+    calc_derived_values() or the ECLP pool configs change."""
+    store = eclp_derived_params.DerivedParamsStore(maxsize=None)
+    store.load(eclp_derived_params.DEFAULT_PATH)
+    for key, derived in store._entries.items():
+        params = ECLPMathParamsQD(*(D.from_raw(x) for x in key))
+        assert derived == prec_impl.calc_derived_values(params)
+
+    fresh = eclp_derived_params.DerivedParamsStore(maxsize=None)
+    fresh.add_pool_configs()
+    assert set(fresh._entries) <= set(store._entries)
+
+
 @given(params=gen_params(), balances=gen_balances(2, bpool_params))
 def test_maxBalances(gyro_eclp_math_testing, params, balances):
     derived = prec_impl.calc_derived_values(params)
@@ -932,3 +1091,58 @@ def test_maxBalances_sense_check(params, balances):
     err_tol = D(err) * params.l * 5
     assert xp_py == convd(eclp.xmax, D3).approxed(abs=err_tol)
     assert yp_py == convd(eclp.ymax, D3).approxed(abs=err_tol)
+
+
+######################################################################################
+### Batch comparisons against Solidity, one contract call per batch of examples
+
+BATCH_SIZE = 20
+
+
+@given(
+    items=st.lists(
+        st.tuples(gen_params(), gen_balances(2, bpool_params)),
+        min_size=1,
+        max_size=BATCH_SIZE,
+    )
+)
+def test_calculateInvariant_batch(gyro_eclp_math_batch_testing, items):
+    results = util.mtest_calculateInvariantWithError_batch(
+        items, gyro_eclp_math_batch_testing
+    )
+    for (params, balances), ((result_py, err_py), result_sol) in zip(items, results):
+        assert not result_sol.reverted
+        invariant_sol, err_sol = result_sol.value
+        derived = prec_impl.calc_derived_values(params)
+        # Same tolerances as test_calculateInvariant()
+        denominator = prec_impl.calcAChiAChiInXp(params, derived) - D2(1)
+        err = D2("5e-18") if denominator > 1 else D2("5e-18") / D2(denominator)
+        err = D(err.raw)
+        assert result_py == invariant_sol.approxed(abs=(err + D("500e-18")))
+        assert err_py == err_sol.approxed(abs=D("500e-18"))
+
+
+@given(
+    items=st.lists(
+        st.tuples(
+            gen_params(),
+            gen_balances(2, bpool_params),
+            qdecimals(0, 1_000_000_000),
+            st.booleans(),
+        ),
+        min_size=1,
+        max_size=BATCH_SIZE,
+    )
+)
+def test_calcOutGivenIn_batch(gyro_eclp_math_batch_testing, items):
+    results = util.mtest_calcOutGivenIn_batch(items, gyro_eclp_math_batch_testing)
+    for amount_out_py, result_sol in results:
+        if amount_out_py is None:
+            assert result_sol.reverted
+        elif result_sol.reverted:
+            # calcYGivenX() and calcXGivenY() round up by up to 5e-18 more than python, which can push the new
+            # balance out over the old one.
+            assert amount_out_py <= D("5e-18")
+        else:
+            assert result_sol.value <= amount_out_py
+            assert result_sol.value == amount_out_py.approxed(abs=D("5e-18"))
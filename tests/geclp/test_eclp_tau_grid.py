@@ -0,0 +1,70 @@
+import hypothesis.strategies as st
+from brownie.test import given
+from hypothesis import settings
+
+from tests.geclp import eclp, eclp_100, util
+from tests.geclp.eclp_tau_grid import TauGrid
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
+
+TOLERANCE = 1e-9
+
+
+def mk_params(params) -> eclp.Params:
+    return eclp.Params(params.alpha, params.beta, params.c, -params.s, params.l)
+
+
+def to_100(p: eclp.Params) -> eclp_100.Params:
+    return eclp_100.Params(*(D3(x.raw) for x in (p.alpha, p.beta, p.rx, p.ry, p.l)))
+
+
+# Building a grid takes up to a second.
+@settings(max_examples=50)
+@given(
+    params=util.gen_params(),
+    fractions=st.lists(st.floats(0, 1), min_size=1, max_size=20),
+)
+def test_within_bound(params, fractions):
+    p = mk_params(params)
+    grid = TauGrid(p, TOLERANCE)
+    assert grid.max_error_bound() <= TOLERANCE
+    p100 = to_100(p)
+    for fraction in fractions + [0, 1]:
+        px = p.alpha + (p.beta - p.alpha) * D(fraction)
+        (tx, ty), error = grid.tau_with_error(px)
+        assert error <= TOLERANCE
+        exact_x, exact_y = p100.tau(D3(px.raw))
+        if error == 0:
+            # Evaluated exactly, by the model
+            assert (tx, ty) == p.tau(px)
+        else:
+            assert abs(float(D3(tx.raw) - exact_x)) <= error
+            assert abs(float(D3(ty.raw) - exact_y)) <= error
+
+
+def test_outside_range_is_exact():
+    c = s = D("0.5").sqrt()
+    p = eclp.Params(D("0.97"), D("1.02"), c, -s, D("2"))
+    grid = TauGrid(p, TOLERANCE)
+    for px in (D("0.5"), D("1.5")):
+        assert grid.tau_with_error(px) == (p.tau(px), 0)
+
+
+def test_unreachable_tolerance():
+    c = s = D("0.5").sqrt()
+    p = eclp.Params(D("0.97"), D("1.02"), c, -s, D("2"))
+    grid = TauGrid(p, 1e-18)
+    assert grid.n_cells == 1
+    assert grid.exact_fraction() == 1
+    assert grid.tau(D(1)) == p.tau(D(1))
+
+
+def test_from_px_v():
+    c, s = D("0.9"), D("0.19").sqrt()
+    p = eclp.Params(D("0.5"), D("2"), c, -s, D("100"))
+    grid = TauGrid(p, TOLERANCE)
+    for px in (D("0.5"), D("0.7"), D("1.3"), D("2")):
+        exact = eclp.ECLP.from_px_v(px, D(1000), p)
+        interpolated = eclp.ECLP.from_px_v(px, D(1000), p, grid.tau)
+        assert abs(interpolated.x - exact.x) <= D("1e-4")
+        assert abs(interpolated.y - exact.y) <= D("1e-4")
@@ -0,0 +1,76 @@
+import hypothesis.strategies as st
+from brownie.test import given
+from hypothesis import settings
+
+from tests.geclp import eclp_tiered, util
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParams
+from tests.support.util_common import gen_balances
+from tests.support.utils import qdecimals
+
+TIER_FLOAT, TIER_38, TIER_100 = (
+    eclp_tiered.TIER_FLOAT,
+    eclp_tiered.TIER_38,
+    eclp_tiered.TIER_100,
+)
+
+
+@st.composite
+def gen_swap(draw):
+    params = draw(util.gen_params())
+    balances = draw(gen_balances(2, util.bpool_params))
+    token_in_is_token0 = draw(st.booleans())
+    i = 0 if token_in_is_token0 else 1
+    amount = draw(qdecimals(min_value=0, max_value=D("0.5") * balances[i]))
+    return params, balances, token_in_is_token0, amount
+
+
+def check_matches_100(f, *args):
+    """Tiered evaluation makes the same revert decision as 100 decimals, and each tier is within its error."""
+    reference = f(*args, tiers=(TIER_100,))
+    result = f(*args)
+    assert (result.value is None) == (reference.value is None)
+    for tier in (TIER_FLOAT, TIER_38):
+        single = f(*args, tiers=(tier, TIER_100))
+        assert (single.value is None) == (reference.value is None)
+        if single.value is not None and single.tier == tier.name:
+            diff = abs(float(single.value - reference.value))
+            assert diff <= eclp_tiered.SAFETY_FACTOR * single.error
+
+
+@settings(max_examples=1000)
+@given(
+    params=util.gen_params(),
+    balances=gen_balances(2, util.bpool_params),
+)
+def test_invariant(params, balances):
+    check_matches_100(eclp_tiered.invariant, balances, params)
+
+
+@settings(max_examples=1000)
+@given(args=gen_swap())
+def test_calc_out_given_in(args):
+    params, balances, token_in_is_token0, amount = args
+    check_matches_100(
+        eclp_tiered.calc_out_given_in, balances, amount, token_in_is_token0, params
+    )
+
+
+@settings(max_examples=1000)
+@given(args=gen_swap())
+def test_calc_in_given_out(args):
+    params, balances, token_in_is_token0, amount = args
+    check_matches_100(
+        eclp_tiered.calc_in_given_out, balances, amount, token_in_is_token0, params
+    )
+
+
+def test_tolerance_escalates():
+    c = s = D("0.5").sqrt()
+    params = ECLPMathParams(D("0.97"), D("1.02"), c, s, D("2"))
+    balances = (D(100), D(100))
+    assert eclp_tiered.invariant(balances, params).tier == TIER_FLOAT.name
+    result = eclp_tiered.invariant(balances, params, tolerance=1e-30)
+    assert result.tier == TIER_38.name
+    assert result.error <= 1e-30
+    assert eclp_tiered.invariant(balances, params, tolerance=0).tier == TIER_100.name
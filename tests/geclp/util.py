@@ -6,7 +6,9 @@ from brownie import reverts
 
 from tests.geclp import eclp as mimpl
 from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import eclp_derived_params
 from tests.libraries import pool_math_implementation
+from tests.support.batch_call import DEFAULT_BATCH_SIZE, ItemResult, call_batched
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
 from tests.support.types import ECLPMathParams, ECLPMathDerivedParams, Vector2
@@ -32,7 +34,7 @@ def params2MathParams(params: ECLPMathParams) -> mimpl.Params:
 
 
 def mathParams2DerivedParams(mparams: mimpl.Params) -> ECLPMathDerivedParams:
-    return prec_impl.calc_derived_values(
+    return eclp_derived_params.calc_derived_values(
         mparams
     )  # Type mismatch but "duck" compatible.
 
@@ -62,7 +64,7 @@ def gen_params(draw):
 @st.composite
 def gen_params_eclp_dinvariant(draw):
     params = draw(gen_params())
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     balances = draw(gen_balances(2, bpool_params))
     # assume(balances[0] > 0 and balances[1] > 0)
     r = prec_impl.calculateInvariant(balances, params, derived)
@@ -270,7 +272,7 @@ def mtest_virtualOffsets_with_derived(params, invariant, gyro_eclp_math_testing)
 
 
 def mtest_maxBalances(params, invariant, gyro_eclp_math_testing):
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
     # just pick something for overestimate
     r = (D(invariant) * (D(1) + D("1e-15")), invariant)
@@ -295,7 +297,7 @@ def mtest_maxBalances(params, invariant, gyro_eclp_math_testing):
 def mtest_calculateInvariant(
     params, balances, derivedparams_is_sol: bool, gyro_eclp_math_testing
 ):
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     uinvariant_sol = gyro_eclp_math_testing.calculateInvariant(
@@ -315,7 +317,7 @@ def mtest_calculatePrice(
     assume(balances != (0, 0))
 
     mparams = params2MathParams(params)
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     eclp = mimpl.ECLP.from_x_y(balances[0], balances[1], mparams)
@@ -331,7 +333,7 @@ def mtest_calculatePrice(
 def mtest_calcYGivenX(params, x, r, derivedparams_is_sol: bool, gyro_eclp_math_testing):
     assume(x == 0 if r[1] == 0 else True)
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     y = prec_impl.calcYGivenX(x, params, derived, r)
@@ -350,7 +352,7 @@ def mtest_calcYGivenX(params, x, r, derivedparams_is_sol: bool, gyro_eclp_math_t
 def mtest_calcXGivenY(params, y, r, derivedparams_is_sol: bool, gyro_eclp_math_testing):
     assume(y == 0 if r[1] == 0 else True)
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     x = prec_impl.calcXGivenY(y, params, derived, r)
@@ -376,7 +378,7 @@ def mtest_calcOutGivenIn(
     ixIn = 0 if tokenInIsToken0 else 1
     ixOut = 1 - ixIn
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     invariant, inv_err = prec_impl.calculateInvariantWithError(
@@ -459,7 +461,7 @@ def mtest_calcInGivenOut(
 
     assume(amountOut <= balances[ixOut])
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     invariant, inv_err = prec_impl.calculateInvariantWithError(
@@ -531,7 +533,7 @@ def mtest_calcInGivenOut(
 # TODO: needs refactor
 def mtest_liquidityInvariantUpdate(params_eclp_dinvariant, gyro_eclp_math_testing):
     params, balances, dinvariant = params_eclp_dinvariant
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
     invariant = prec_impl.calculateInvariant(balances, params, derived)
     deltaBalances = (
@@ -573,6 +575,80 @@ def mtest_liquidityInvariantUpdate(params_eclp_dinvariant, gyro_eclp_math_testin
 #     assert dy == (dinvariant / r * geclp.y).approxed(abs=1e-5)
 
 
+#####################################################################
+### batch versions of the above, for comparing many inputs in a single call to GyroECLPMathBatchTesting
+# Each returns, per item, the python result (None where the Solidity function should revert) and the Solidity
+# ItemResult, with values unscaled.
+
+
+def _unscale_result(result: ItemResult) -> ItemResult:
+    if result.reverted:
+        return result
+    if isinstance(result.value, tuple):
+        return result._replace(value=tuple(unscale(list(result.value))))
+    return result._replace(value=unscale(result.value))
+
+
+def _invariant_batch(fn_sol, fn_py, items, batch_size):
+    inputs, expected = [], []
+    for params, balances in items:
+        derived = eclp_derived_params.calc_derived_values(params)
+        derived_scaled = prec_impl.scale_derived_values(derived)
+        inputs.append((scale(balances), scale(params), derived_scaled))
+        expected.append(fn_py(balances, params, derived))
+    results = call_batched(fn_sol, inputs, batch_size)
+    return list(zip(expected, map(_unscale_result, results)))
+
+
+def _swap_batch(fn_sol, fn_py, items, batch_size):
+    inputs, expected = [], []
+    for params, balances, amount, tokenInIsToken0 in items:
+        derived = eclp_derived_params.calc_derived_values(params)
+        derived_scaled = prec_impl.scale_derived_values(derived)
+        invariant, inv_err = prec_impl.calculateInvariantWithError(
+            balances, params, derived
+        )
+        r = (invariant + 2 * D(inv_err), invariant)
+        inputs.append(
+            (
+                scale(balances),
+                scale(amount),
+                tokenInIsToken0,
+                scale(params),
+                derived_scaled,
+                scale(r),
+            )
+        )
+        expected.append(fn_py(balances, amount, tokenInIsToken0, params, derived, r))
+    results = call_batched(fn_sol, inputs, batch_size)
+    return list(zip(expected, map(_unscale_result, results)))
+
+
+def mtest_calculateInvariantWithError_batch(
+    items, gyro_eclp_math_batch_testing, batch_size=DEFAULT_BATCH_SIZE
+):
+    """items are (params, balances)"""
+    return _invariant_batch(
+        gyro_eclp_math_batch_testing.calculateInvariantWithErrorBatch,
+        prec_impl.calculateInvariantWithError,
+        items,
+        batch_size,
+    )
+
+
+def mtest_calcOutGivenIn_batch(
+    items, gyro_eclp_math_batch_testing, batch_size=DEFAULT_BATCH_SIZE
+):
+    """items are (params, balances, amountIn, tokenInIsToken0). The invariant is computed in python, as in
+    mtest_calcOutGivenIn()."""
+    return _swap_batch(
+        gyro_eclp_math_batch_testing.calcOutGivenInBatch,
+        prec_impl.calcOutGivenIn,
+        items,
+        batch_size,
+    )
+
+
 #####################################################################
 ### for testing invariant changes across swaps
 
@@ -605,7 +681,7 @@ def mtest_invariant_across_calcOutGivenIn(
     fees = bpool_params.min_fee * amountIn
     amountIn -= fees
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     invariant_before = prec_impl.calculateInvariant(balances, params, derived)
@@ -729,7 +805,7 @@ def mtest_invariant_across_calcInGivenOut(
 
     assume(amountOut <= balances[ixOut])
 
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     invariant_before = prec_impl.calculateInvariant(balances, params, derived)
@@ -842,7 +918,7 @@ def mtest_invariant_across_liquidityInvariantUpdate(
     params_eclp_invariantUpdate, gyro_eclp_math_testing
 ):
     params, balances, bpt_supply, isIncrease, dsupply = params_eclp_invariantUpdate
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
 
     denominator = prec_impl.calcAChiAChiInXp(params, derived) - D2(1)
     # Debug code for debugging the tests (sample generation)
@@ -909,7 +985,7 @@ def mtest_invariant_across_liquidityInvariantUpdate(
 # ):
 #     params, balances, dinvariant = params_eclp_dinvariant
 
-#     derived = prec_impl.calc_derived_values(params)
+#     derived = eclp_derived_params.calc_derived_values(params)
 #     derived_scaled = prec_impl.scale_derived_values(derived)
 
 #     invariant, inv_err = prec_impl.calculateInvariantWithError(
@@ -961,7 +1037,7 @@ def mtest_invariant_across_liquidityInvariantUpdate(
 
 
 def mtest_zero_tokens_in(gyro_eclp_math_testing, params, balances):
-    derived = prec_impl.calc_derived_values(params)
+    derived = eclp_derived_params.calc_derived_values(params)
     derived_scaled = prec_impl.scale_derived_values(derived)
 
     invariant_sol, inv_err_sol = gyro_eclp_math_testing.calculateInvariantWithError(
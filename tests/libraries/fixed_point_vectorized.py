@@ -0,0 +1,125 @@
+"""Elementwise versions of the GyroFixedPoint operations and GyroPoolMath._sqrt() on NumPy arrays of raw 18-decimal
+fixed-point integers.
+
+All values are the uint256 values the contracts see, held as Python ints in object arrays so that intermediate products
+don't overflow. Rounding matches the Solidity libraries exactly. Arguments are assumed non-negative, and uint256
+overflow is not checked. Functions that can revert return None in the respective entries instead.
+
+Use `from_decimals()` / `to_decimals()` to convert from / to QuantizedDecimal arrays.
+"""
+
+import numpy as np
+
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+ONE = 10**18
+
+MIDDECIMAL = 10**9
+
+_SQRT_1E_NEG = {
+    1: 316227766016837933,
+    3: 31622776601683793,
+    5: 3162277660168379,
+    7: 316227766016837,
+    9: 31622776601683,
+    11: 3162277660168,
+    13: 316227766016,
+    15: 31622776601,
+    17: 3162277660,
+}
+
+
+def as_ints(a) -> np.ndarray:
+    """Object array of Python ints, so that products of 18-decimal values don't overflow."""
+    a = np.asarray(a)
+    if a.dtype == object:
+        return a
+    if a.dtype.kind not in "iu":
+        raise TypeError(f"Expected raw fixed-point integers, got dtype {a.dtype}")
+    return a.astype(object)
+
+
+def select(ok, values, default) -> np.ndarray:
+    # Operations on 0-d object arrays give plain ints, which np.where() would try to convert to int64.
+    return np.where(ok, np.asarray(values, dtype=object), default)
+
+
+def or_none(ok, values) -> np.ndarray:
+    return select(ok, values, None)
+
+
+def from_decimals(xs) -> np.ndarray:
+    """QuantizedDecimal (or anything D() accepts) values -> raw 18-decimal integers."""
+    return np.vectorize(lambda x: D(x).raw_int, otypes=[object])(xs)
+
+
+def to_decimals(xs) -> np.ndarray:
+    """Raw 18-decimal integers -> QuantizedDecimal. None entries are kept."""
+    return np.vectorize(
+        lambda x: None if x is None else D.from_raw(int(x)), otypes=[object]
+    )(xs)
+
+
+### Fixed-point operations of GyroFixedPoint, elementwise. All arguments are non-negative.
+
+
+def mulDown(a, b):
+    return a * b // ONE
+
+
+def mulUp(a, b):
+    return -(-(a * b) // ONE)
+
+
+def divDown(a, b):
+    return a * ONE // b
+
+
+def divUp(a, b):
+    return -(-(a * ONE) // b)
+
+
+def mulDownLargeSmall(a, b):
+    return (a // ONE) * b + mulDown(a % ONE, b)
+
+
+def divDownLarge(a, b, d=MIDDECIMAL, e=MIDDECIMAL):
+    """Requires b > 0 (and d * e == ONE)."""
+    return a * d // (1 + (b - 1) // e)
+
+
+### GyroPoolMath._sqrt()
+
+
+def _intLog2Halved(x: int) -> int:
+    return (x.bit_length() - 1) // 2
+
+
+def _makeInitialGuess(x: int) -> int:
+    if x >= ONE:
+        return (1 << _intLog2Halved(x // ONE)) * ONE
+    for k in range(1, 18):
+        if x <= 10**k:
+            # 10^(k-18) has a square root of 10^((k-18)/2)
+            return _SQRT_1E_NEG[18 - k] if k % 2 == 1 else 10 ** ((k + 18) // 2)
+    return x
+
+
+_makeInitialGuessVec = np.vectorize(_makeInitialGuess, otypes=[object])
+
+
+def sqrt(input, tolerance: int) -> np.ndarray:
+    """Same Newton iteration as GyroPoolMath._sqrt(). None where the final tolerance check fails."""
+    input = as_ints(input)
+    nonzero = input != 0
+    x = select(nonzero, input, 1)
+    guess = _makeInitialGuessVec(x)
+    for _ in range(7):
+        guess = (guess + x * ONE // guess) // 2
+    guess = select(nonzero, guess, 0)
+
+    guessSquared = mulDown(guess, guess)
+    tol = mulUp(guess, tolerance)
+    # input.sub(tol) reverts if tol > input.
+    ok = (guessSquared <= input + tol) & (input >= tol) & (guessSquared >= input - tol)
+    return or_none(~nonzero | ok, guess)
@@ -0,0 +1,62 @@
+"""Calling the batch functions of the math testing contracts (e.g., GyroECLPMathBatchTesting), which evaluate many
+inputs in one call and report reverts per item. This saves one RPC round trip per input.
+
+A batch function takes an array of inputs and returns one array per return value of the underlying function, followed
+by an array of error strings: empty if the item succeeded, else its revert reason (or NO_REASON if it reverted without
+one, e.g., on an invalid opcode).
+"""
+
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+# Must match GyroECLPMathBatchTesting.NO_REASON and ITEM_GAS
+NO_REASON = "NO_REASON"
+ITEM_GAS = 500_000
+
+# Gas limit of calls on the development network (the block gas limit of brownie's ganache)
+CALL_GAS_LIMIT = 12_000_000
+# Gas of a batch outside of the calls of the items, i.e., for decoding the inputs and encoding the results. Generous.
+BATCH_OVERHEAD_GAS = 2_000_000
+# Largest batch that fits the call gas limit even if every item uses up all of its ITEM_GAS
+DEFAULT_BATCH_SIZE = (CALL_GAS_LIMIT - BATCH_OVERHEAD_GAS) // ITEM_GAS
+
+
+class ItemResult(NamedTuple):
+    # The return value (a tuple if there are several); None if the item reverted.
+    value: Any
+    # None if the item succeeded
+    revert_reason: Optional[str]
+
+    @property
+    def reverted(self) -> bool:
+        return self.revert_reason is not None
+
+
+def decode_batch(ret: Sequence) -> List[ItemResult]:
+    """Results of one call of a batch function, from its return value."""
+    *values, errors = ret
+    results = []
+    for i, error in enumerate(errors):
+        if error:
+            results.append(ItemResult(None, error))
+        elif len(values) == 1:
+            results.append(ItemResult(values[0][i], None))
+        else:
+            results.append(ItemResult(tuple(v[i] for v in values), None))
+    return results
+
+
+def call_batched(
+    fn: Callable, inputs: Sequence, batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[ItemResult]:
+    """Evaluate the batch function `fn` (e.g., `gyro_eclp_math_batch_testing.calcOutGivenInBatch`) on `inputs`, with
+    one call per `batch_size` inputs.
+
+    Each item may use up to the contract's ITEM_GAS, so `batch_size` should be at most DEFAULT_BATCH_SIZE unless the
+    call gas limit is higher than CALL_GAS_LIMIT. Otherwise the last items of a batch get less gas than they need.
+    """
+    if batch_size < 1:
+        raise ValueError(f"invalid batch size {batch_size}")
+    results = []
+    for start in range(0, len(inputs), batch_size):
+        results.extend(decode_batch(fn(list(inputs[start : start + batch_size]))))
+    return results
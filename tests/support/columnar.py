@@ -0,0 +1,137 @@
+"""Append-only columnar storage for data collected during test runs (e.g., error values, see
+tests/dummy/collect_solidity_error_values.py).
+
+Rows are buffered per column and written as Arrow record batches every `batch_size` rows, so memory use is bounded by
+one batch no matter how many examples are run. The output is an uncompressed Arrow IPC file, i.e., a Feather (v2) file:
+pd.read_feather() reads it as before, and open_table() and iter_dataframes() memory-map it without copying the data.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# Arrow types of the Python values a column can hold, in the order they're checked (bool is a subclass of int).
+_ARROW_TYPES = [
+    (bool, pa.bool_()),
+    (int, pa.int64()),
+    (float, pa.float64()),
+    (str, pa.string()),
+]
+
+
+def _infer_type(name: str, value) -> pa.DataType:
+    for t, arrow_type in _ARROW_TYPES:
+        if isinstance(value, t):
+            return arrow_type
+    raise TypeError(
+        f"column {name!r}: unsupported type {type(value).__name__}; convert to float, int, bool or str"
+    )
+
+
+class ColumnarWriter:
+    """Writes rows (dicts mapping column names to values) to an Arrow IPC file at `path`.
+
+    The schema is given as a dict of column names to Arrow types or, if None, inferred from the first row. All rows
+    must have exactly the columns of the schema. Use as a context manager, or call close() to write the remaining rows
+    and the file footer; the file can't be read before that.
+    """
+
+    def __init__(
+        self,
+        path,
+        schema: Optional[Dict[str, pa.DataType]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        if batch_size < 1:
+            raise ValueError(f"invalid batch size {batch_size}")
+        self.path = path
+        self.batch_size = batch_size
+        self.n_rows = 0
+        self._schema: Optional[pa.Schema] = None
+        self._columns: Dict[str, List] = {}
+        self._writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+        self._closed = False
+        if schema is not None:
+            self._open(pa.schema(list(schema.items())))
+
+    def _open(self, schema: pa.Schema):
+        self._schema = schema
+        self._columns = {name: [] for name in schema.names}
+        self._writer = pa.ipc.new_file(str(self.path), schema)
+
+    @property
+    def schema(self) -> Optional[pa.Schema]:
+        return self._schema
+
+    def append(self, row: dict):
+        if self._closed:
+            raise ValueError("writer is closed")
+        if self._schema is None:
+            self._open(
+                pa.schema([(name, _infer_type(name, v)) for name, v in row.items()])
+            )
+        if row.keys() != self._columns.keys():
+            raise ValueError(
+                f"row has columns {list(row)}, expected {self._schema.names}"
+            )
+        for name, values in self._columns.items():
+            values.append(row[name])
+        self.n_rows += 1
+        if len(values) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as one record batch."""
+        if self._writer is None or not self.n_buffered:
+            return
+        arrays = [
+            pa.array(self._columns[field.name], type=field.type)
+            for field in self._schema
+        ]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        for values in self._columns.values():
+            values.clear()
+
+    @property
+    def n_buffered(self) -> int:
+        """Number of rows not written yet"""
+        return len(next(iter(self._columns.values()), []))
+
+    def close(self):
+        if self._closed:
+            return
+        if self._writer is None:
+            raise ValueError(f"no rows or schema, can't write {self.path}")
+        self.flush()
+        self._writer.close()
+        self._closed = True
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        # Also on errors, so the rows collected until then can be analyzed.
+        if self._writer is not None:
+            self.close()
+
+
+def open_table(path) -> pa.Table:
+    """The table written by a ColumnarWriter (or any uncompressed Feather file), memory-mapped."""
+    return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+
+
+def open_dataframe(path) -> pd.DataFrame:
+    """The table at `path` as one DataFrame. This concatenates the record batches, i.e., copies the data once; use
+    open_table() or iter_dataframes() to avoid that."""
+    return open_table(path).to_pandas(split_blocks=True, self_destruct=True)
+
+
+def iter_dataframes(path) -> Iterator[pd.DataFrame]:
+    """The table at `path` as one DataFrame per record batch. Numeric columns without missing values aren't copied
+    but refer to the memory-mapped file (and are read-only)."""
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i).to_pandas(split_blocks=True)
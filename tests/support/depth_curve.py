@@ -0,0 +1,262 @@
+"""Liquidity depth curves of 2CLP, 3CLP and ECLP pools: amount out and post-trade price for a grid of amounts in,
+against a fixed pool state.
+
+Amounts out are the ones the contracts compute (without fees and token scaling), from the existing math
+implementations: the 2CLP and 3CLP use the vectorized raw fixed-point versions (g2clp/g3clp `math_vectorized`), the ECLP
+uses the batch functions of `eclp_prec_implementation`. The invariant and virtual offsets are computed once per curve,
+and for the ECLP, so are all amount-independent terms of the quadratic swap equation.
+
+Post-trade prices are the marginal prices at the new balances, in units of the token out per token in, computed in
+floating point. They are the prices a router sees for the next, infinitesimal trade in the same direction.
+
+Results are cached per (pool state, grid) and returned as read-only float64 arrays, with NaN where the swap would
+revert.
+"""
+
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tests.g2clp import math_vectorized as mv2
+from tests.g3clp import math_vectorized as mv3
+from tests.geclp import eclp_derived_params, eclp_numpy
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.libraries.fixed_point_vectorized import ONE, mulDown
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+# Number of curves kept per pool type
+CACHE_SIZE = 1024
+
+
+class AmountGrid(NamedTuple):
+    """`n` amounts in, spaced geometrically from `min_amount` to `max_amount` (both included)."""
+
+    min_amount: D
+    max_amount: D
+    n: int
+
+    def amounts(self) -> Tuple[D, ...]:
+        if self.n == 1:
+            return (self.min_amount,)
+        lo, hi = float(self.min_amount), float(self.max_amount)
+        inner = (D(lo * (hi / lo) ** (i / (self.n - 1))) for i in range(1, self.n - 1))
+        return (self.min_amount, *inner, self.max_amount)
+
+
+def geometric_grid(min_amount, max_amount, n: int) -> AmountGrid:
+    min_amount, max_amount = D(min_amount), D(max_amount)
+    if not 0 < min_amount <= max_amount:
+        raise ValueError(
+            f"need 0 < min_amount <= max_amount, got {min_amount}, {max_amount}"
+        )
+    if n < 1 or (n == 1 and min_amount != max_amount):
+        raise ValueError(f"invalid number of amounts {n}")
+    return AmountGrid(min_amount, max_amount, n)
+
+
+class DepthCurve(NamedTuple):
+    amounts_in: np.ndarray
+    # NaN where the swap reverts
+    amounts_out: np.ndarray
+    # Marginal price after the trade, token out per token in. NaN where the swap reverts.
+    prices: np.ndarray
+    # Marginal price before the trade, token out per token in
+    spot_price: float
+
+
+def clear_cache():
+    for f in (_depth_curve_2clp, _depth_curve_3clp, _depth_curve_eclp):
+        f.cache_clear()
+
+
+def _read_only(*arrays: np.ndarray):
+    for a in arrays:
+        a.setflags(write=False)
+
+
+def _constant_product_curve(
+    grid: AmountGrid, balance_in: int, balance_out: int, offset_in, offset_out
+) -> DepthCurve:
+    """Curve of calcOutGivenIn() of the 2CLP, which the 3CLP shares (with equal virtual offsets). All values are raw
+    fixed-point integers."""
+    amounts = np.array([a.raw_int for a in grid.amounts()], dtype=object)
+    amounts_out = mv2.calcOutGivenIn(
+        balance_in, balance_out, amounts, offset_in, offset_out
+    )
+    reverted = amounts_out == None  # noqa: E711 (elementwise)
+    amounts_out = np.where(reverted, 0, amounts_out)
+    # Exact virtual reserves, without the safety margins of calcOutGivenIn()
+    virt_in = balance_in + int(offset_in) + amounts
+    virt_out = balance_out + int(offset_out) - amounts_out
+    prices = np.where(reverted, np.nan, (virt_out / virt_in).astype(np.float64))
+    amounts_out = np.where(reverted, np.nan, (amounts_out / ONE).astype(np.float64))
+    curve = DepthCurve(
+        (amounts / ONE).astype(np.float64),
+        amounts_out,
+        prices,
+        (balance_out + int(offset_out)) / (balance_in + int(offset_in)),
+    )
+    _read_only(curve.amounts_in, curve.amounts_out, curve.prices)
+    return curve
+
+
+def _reverted_curve(grid: AmountGrid) -> DepthCurve:
+    amounts_in = np.array([float(a) for a in grid.amounts()])
+    nan = np.full_like(amounts_in, np.nan)
+    _read_only(amounts_in, nan)
+    return DepthCurve(amounts_in, nan, nan, np.nan)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _depth_curve_2clp(
+    balances: Tuple[D, D],
+    sqrt_alpha: D,
+    sqrt_beta: D,
+    token_in_is_token0: bool,
+    grid: AmountGrid,
+) -> DepthCurve:
+    x, y = (b.raw_int for b in balances)
+    invariant = mv2.calculateInvariant(
+        ([x], [y]), sqrt_alpha.raw_int, sqrt_beta.raw_int
+    )[0]
+    if invariant is None:
+        return _reverted_curve(grid)
+    offset0 = int(mv2.calculateVirtualParameter0(invariant, sqrt_beta.raw_int))
+    offset1 = int(mv2.calculateVirtualParameter1(invariant, sqrt_alpha.raw_int))
+    if token_in_is_token0:
+        return _constant_product_curve(grid, x, y, offset0, offset1)
+    return _constant_product_curve(grid, y, x, offset1, offset0)
+
+
+def depth_curve_2clp(
+    balances: Iterable,
+    sqrt_alpha,
+    sqrt_beta,
+    token_in_is_token0: bool,
+    grid: AmountGrid,
+) -> DepthCurve:
+    """Depth curve of a 2CLP with the given (scaled) balances and price bounds."""
+    x, y = balances
+    return _depth_curve_2clp(
+        (D(x), D(y)), D(sqrt_alpha), D(sqrt_beta), token_in_is_token0, grid
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _depth_curve_3clp(
+    balances: Tuple[D, D, D],
+    root3_alpha: D,
+    ix_in: int,
+    ix_out: int,
+    grid: AmountGrid,
+) -> DepthCurve:
+    raw_balances = [b.raw_int for b in balances]
+    invariant = mv3.calculateInvariant(
+        [[b] for b in raw_balances], root3_alpha.raw_int
+    )[0]
+    if invariant is None:
+        return _reverted_curve(grid)
+    # As in Gyro3CLPPool._calculateVirtualOffset(). Both assets of the pair have the same offset.
+    offset = mulDown(invariant, root3_alpha.raw_int)
+    return _constant_product_curve(
+        grid, raw_balances[ix_in], raw_balances[ix_out], offset, offset
+    )
+
+
+def depth_curve_3clp(
+    balances: Iterable, root3_alpha, ix_in: int, ix_out: int, grid: AmountGrid
+) -> DepthCurve:
+    """Depth curve of a 3CLP with the given (scaled) balances for swapping asset `ix_in` for `ix_out`."""
+    if ix_in == ix_out or not {ix_in, ix_out} <= {0, 1, 2}:
+        raise ValueError(f"invalid asset indices {ix_in}, {ix_out}")
+    return _depth_curve_3clp(
+        tuple(D(b) for b in balances), D(root3_alpha), ix_in, ix_out, grid
+    )
+
+
+def _eclp_slope(x, r: Tuple[float, float], fp: eclp_numpy.FloatParams, swapped: bool):
+    """-d/dx of calcYGivenX() (calcXGivenY() if swapped) at the new balance x, in floating point, i.e., the marginal
+    price of the asset given in units of the other one.
+
+    This differentiates the quadratic of solveQuadraticSwap(), using the over- and underestimate of the invariant
+    r = (r[0], r[1]) in the same terms as the swap does. For large l, the swap curve deviates noticeably from the ideal
+    one because of that, and the price from the point relative to the virtual offsets (as in
+    GyroECLPMath.calcSpotPrice0in1()) would not be its slope."""
+    if swapped:
+        s, c = fp.c, fp.s
+        tb0, tb1 = -fp.tauAlpha[0], fp.tauAlpha[1]
+    else:
+        s, c = fp.s, fp.c
+        tb0, tb1 = fp.tauBeta
+    lam, lamBar, dSq = fp.l, fp.lamBar, fp.dSq
+    sTerm = 1 - lamBar * s * s / dSq
+
+    # See calcXpXpDivLambdaLambda() and prepareQuadraticSwap() for which terms use which r.
+    r_a = r[0] if tb0 * tb1 > 0 else r[1]
+    r_b = r[0] if tb0 < 0 else r[1]
+    xpxp = (
+        r[0] * r[0] * c * c * tb0 * tb0 / dSq**2
+        + (
+            r_a * r_a * 2 * s * c * tb0 * tb1 / dSq**2
+            - r_b * x * 2 * c * tb0 / dSq
+            + (
+                r[0] * r[0] * s * s * tb1 * tb1 / dSq**2
+                - r[1] * x * 2 * s * tb1 / dSq
+                + x * x
+            )
+            / lam
+        )
+        / lam
+    )
+    dxpxp_dx = (
+        -2 * r_b * c * tb0 / dSq + (-2 * r[1] * s * tb1 / dSq + 2 * x) / lam
+    ) / lam
+    qc = np.sqrt(r[1] * r[1] * sTerm - xpxp)
+    return (s * c * lamBar / dSq - dxpxp_dx / (2 * qc)) / sTerm
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _depth_curve_eclp(
+    balances: Tuple[D, D],
+    params: prec_impl.Params,
+    derived: prec_impl.DerivedParams,
+    token_in_is_token0: bool,
+    grid: AmountGrid,
+) -> DepthCurve:
+    amounts = grid.amounts()
+    invariant, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    # Over- and underestimate, as used by the pool
+    r = (invariant + 2 * D(err), invariant)
+    amounts_out = prec_impl.calcOutGivenInBatch(
+        balances, amounts, token_in_is_token0, params, derived, r
+    )
+
+    amounts_in = np.array([float(a) for a in amounts])
+    amounts_out = np.array([np.nan if a is None else float(a) for a in amounts_out])
+    ix_in = 0 if token_in_is_token0 else 1
+    balance_in = float(balances[ix_in])
+    fp = eclp_numpy.float_params(params, derived)
+    r_float = (float(r[0]), float(r[1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices = _eclp_slope(
+            balance_in + amounts_in, r_float, fp, not token_in_is_token0
+        )
+        spot_price = _eclp_slope(balance_in, r_float, fp, not token_in_is_token0)
+    prices = np.where(np.isnan(amounts_out), np.nan, prices)
+    _read_only(amounts_in, amounts_out, prices)
+    return DepthCurve(amounts_in, amounts_out, prices, float(spot_price))
+
+
+def depth_curve_eclp(
+    balances: Iterable,
+    params: prec_impl.Params,
+    token_in_is_token0: bool,
+    grid: AmountGrid,
+    derived: Optional[prec_impl.DerivedParams] = None,
+) -> DepthCurve:
+    """Depth curve of an ECLP with the given (scaled) balances. `derived` is computed from `params` if not given."""
+    if derived is None:
+        derived = eclp_derived_params.calc_derived_values(params)
+    x, y = balances
+    return _depth_curve_eclp((D(x), D(y)), params, derived, token_in_is_token0, grid)
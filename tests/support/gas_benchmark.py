@@ -0,0 +1,169 @@
+"""Results of the gas benchmark (scripts/gas_benchmark.py) and their comparison against stored baselines.
+
+Results are stored as JSON, one file per pool type, mapping each scenario to the gas used by the transaction and, if the
+Tracer could process it, the number of calls and total gas of each function involved.
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Optional
+
+from tabulate import tabulate
+
+from tests.support.trace_analyzer import Context, FunctionGas
+
+
+class ScenarioResult(NamedTuple):
+    gas_used: int
+    functions: Dict[str, FunctionGas] = {}
+
+    @classmethod
+    def from_tx(cls, gas_used: int, context: Optional[Context]) -> "ScenarioResult":
+        """`context` is the trace of the transaction, or None if the Tracer failed on it."""
+        if context is None:
+            return cls(gas_used)
+        return cls(gas_used, context.gas_by_function())
+
+
+BenchmarkResults = Dict[str, ScenarioResult]
+
+
+def results_to_json(results: BenchmarkResults) -> dict:
+    return {
+        scenario: {
+            "gas_used": result.gas_used,
+            "functions": {
+                name: f._asdict() for name, f in sorted(result.functions.items())
+            },
+        }
+        for scenario, result in results.items()
+    }
+
+
+def results_from_json(data: dict) -> BenchmarkResults:
+    return {
+        scenario: ScenarioResult(
+            r["gas_used"],
+            {name: FunctionGas(**f) for name, f in r.get("functions", {}).items()},
+        )
+        for scenario, r in data.items()
+    }
+
+
+def save_results(filename: str, results: BenchmarkResults):
+    with open(filename, "w") as f:
+        json.dump(results_to_json(results), f, indent=2)
+        f.write("\n")
+
+
+def load_results(filename: str) -> BenchmarkResults:
+    with open(filename) as f:
+        return results_from_json(json.load(f))
+
+
+class Change(NamedTuple):
+    scenario: str
+    # "gas_used" for the whole transaction, otherwise the qualified function name
+    metric: str
+    baseline: int
+    current: int
+
+    @property
+    def delta(self) -> int:
+        return self.current - self.baseline
+
+    @property
+    def relative(self) -> float:
+        return self.delta / self.baseline if self.baseline else float("inf")
+
+
+class Comparison(NamedTuple):
+    # Changes beyond the tolerances; a positive delta is a regression.
+    changes: List[Change]
+    # Scenarios in the baseline that are missing from the results
+    missing_scenarios: List[str]
+    # (scenario, function) that are only in the baseline / only in the results. Functions can disappear when they get
+    # inlined, or when the Tracer fails on a transaction.
+    missing_functions: List[tuple]
+    new_functions: List[tuple]
+
+    @property
+    def regressions(self) -> List[Change]:
+        return [c for c in self.changes if c.delta > 0]
+
+    @property
+    def improvements(self) -> List[Change]:
+        return [c for c in self.changes if c.delta < 0]
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.regressions or self.missing_scenarios)
+
+
+def compare(
+    results: BenchmarkResults,
+    baseline: BenchmarkResults,
+    rel_tolerance: float = 0.005,
+    abs_tolerance: int = 50,
+) -> Comparison:
+    """Gas changes are significant if they exceed both tolerances, i.e., `abs_tolerance` gas and `rel_tolerance` of the
+    baseline."""
+    changes, missing_functions, new_functions = [], [], []
+
+    def check(scenario: str, metric: str, baseline_gas: int, current_gas: int):
+        delta = current_gas - baseline_gas
+        if abs(delta) > max(abs_tolerance, rel_tolerance * baseline_gas):
+            changes.append(Change(scenario, metric, baseline_gas, current_gas))
+
+    for scenario, base in baseline.items():
+        if scenario not in results:
+            continue
+        current = results[scenario]
+        check(scenario, "gas_used", base.gas_used, current.gas_used)
+        for name, f in base.functions.items():
+            if name in current.functions:
+                check(scenario, name, f.gas, current.functions[name].gas)
+            elif current.functions:
+                missing_functions.append((scenario, name))
+        if base.functions:
+            new_functions.extend(
+                (scenario, name)
+                for name in current.functions
+                if name not in base.functions
+            )
+
+    return Comparison(
+        changes,
+        [scenario for scenario in baseline if scenario not in results],
+        missing_functions,
+        new_functions,
+    )
+
+
+def format_comparison(comparison: Comparison) -> str:
+    lines = []
+    if comparison.changes:
+        lines.append(
+            tabulate(
+                [
+                    (
+                        c.scenario,
+                        c.metric,
+                        c.baseline,
+                        c.current,
+                        f"{c.delta:+}",
+                        f"{c.relative:+.2%}",
+                    )
+                    for c in comparison.changes
+                ],
+                headers=("Scenario", "Metric", "Baseline", "Current", "Delta", "%"),
+            )
+        )
+    else:
+        lines.append("No significant changes.")
+    for scenario in comparison.missing_scenarios:
+        lines.append(f"Missing scenario: {scenario}")
+    for scenario, name in comparison.missing_functions:
+        lines.append(f"No longer called: {name} ({scenario})")
+    for scenario, name in comparison.new_functions:
+        lines.append(f"Newly called: {name} ({scenario})")
+    return "\n".join(lines)
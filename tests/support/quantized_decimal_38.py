@@ -9,12 +9,21 @@
 # approximation of uint256), but with 38 instead of 18 decimals after the point.
 #
 # See the call to set_decimals().
+#
+# Values are stored as a plain python int scaled by 10**DECIMAL_PRECISION, like the raw uint256/int256 values in
+# GyroFixedPoint / SignedFixedPoint. Rounding is towards zero by default (mulDown / divDown for non-negative values) and
+# away from zero for mul_up / div_up (mulUp / divUp). `raw` still returns a `decimal.Decimal` so values can be moved
+# between the different precision variants via D2(D(x).raw) etc.
+#
+# NOTE: `set_decimals()` changes the scale of *newly created* values only. Don't mix values created before and after
+# the call.
 
 from __future__ import annotations
 
 import decimal
 import math
-from functools import total_ordering
+from fractions import Fraction
+from functools import lru_cache, total_ordering
 from typing import Any, Optional, Union
 
 import pytest
@@ -28,170 +37,344 @@ MAX_PREC_VALUE = 78
 decimal.setcontext(decimal.Context(prec=78))
 decimal.getcontext().prec = MAX_PREC_VALUE
 
+# Values with more digits than the precision of the decimal context raise `decimal.InvalidOperation`, like the
+# quantize() call of the Decimal-backed implementation did. Note that the context is shared between the different
+# precision variants. We only look at it for values above this bound.
+_MAX_ABS_VALUE = 10**MAX_PREC_VALUE
+
+# Only used for the operations that we don't implement on ints directly (non-integer, non-1/2 powers).
+_POW_CONTEXT = decimal.Context(prec=MAX_PREC_VALUE)
+
 
 def set_decimals(ndecimals: int):
-    global DECIMAL_PRECISION, DECIMAL_MULT, QUANTIZED_EXP
+    global DECIMAL_PRECISION, DECIMAL_MULT, QUANTIZED_EXP, _ONE
     DECIMAL_PRECISION = ndecimals
     QUANTIZED_EXP = decimal.Decimal(1) / decimal.Decimal(10**DECIMAL_PRECISION)
     # 1.000000... multiplier to increase the precision to the required level by multiplying
     DECIMAL_MULT = QUANTIZED_EXP * decimal.Decimal(10**DECIMAL_PRECISION)
+    # Raw representation of 1
+    _ONE = 10**DECIMAL_PRECISION
 
 
 set_decimals(38)
 
 
+def _div_down(a: int, b: int) -> int:
+    """a / b rounded towards zero"""
+    if (a >= 0) == (b > 0):
+        return a // b
+    return -(-a // b)
+
+
+def _div_up(a: int, b: int) -> int:
+    """a / b rounded away from zero"""
+    if (a >= 0) == (b > 0):
+        return -(-a // b)
+    return a // b
+
+
+def _div_rounding(a: int, b: int, rounding: str) -> int:
+    """a / b rounded according to one of the `decimal` rounding modes."""
+    if rounding == decimal.ROUND_DOWN:
+        return _div_down(a, b)
+    if rounding == decimal.ROUND_UP:
+        return _div_up(a, b)
+    negative = (a < 0) != (b < 0)
+    q, r = divmod(abs(a), abs(b))
+    if r != 0:
+        twice_r = 2 * r
+        if rounding == decimal.ROUND_CEILING:
+            q += not negative
+        elif rounding == decimal.ROUND_FLOOR:
+            q += negative
+        elif rounding == decimal.ROUND_HALF_UP:
+            q += twice_r >= abs(b)
+        elif rounding == decimal.ROUND_HALF_DOWN:
+            q += twice_r > abs(b)
+        elif rounding == decimal.ROUND_HALF_EVEN:
+            q += twice_r > abs(b) or (twice_r == abs(b) and q % 2 == 1)
+        elif rounding == decimal.ROUND_05UP:
+            q += q % 5 == 0
+        else:
+            raise ValueError(f"Unknown rounding mode: {rounding}")
+    return -q if negative else q
+
+
+def _decimal_to_raw(value: decimal.Decimal, rounding: str) -> int:
+    num, den = value.as_integer_ratio()
+    return _div_rounding(num * _ONE, den, rounding)
+
+
+@lru_cache(maxsize=4096)
+def _str_to_raw(value: str, one: int) -> int:
+    num, den = decimal.Decimal(value).as_integer_ratio()
+    return _div_down(num * one, den)
+
+
+def _check_range(raw: int) -> int:
+    if not -_MAX_ABS_VALUE < raw < _MAX_ABS_VALUE:
+        prec = decimal.getcontext().prec
+        if not abs(raw) < 10**prec:
+            raise decimal.InvalidOperation(
+                f"Value out of range for {prec} digits: {raw}"
+            )
+    return raw
+
+
+def _from_raw(raw: int) -> QuantizedDecimal:
+    res = object.__new__(QuantizedDecimal)
+    res._int = _check_range(raw)
+    return res
+
+
+def _as_ratio(value: Any) -> Optional[tuple[int, int]]:
+    """Represent `value` as an exact fraction (numerator, denominator), or None if the type is not supported.
+
+    Foreign fixed-point types (e.g., the 38-decimal variant) are converted via their `raw` Decimal.
+    """
+    if isinstance(value, decimal.Decimal):
+        return value.as_integer_ratio()
+    if isinstance(value, str):
+        return decimal.Decimal(value).as_integer_ratio()
+    raw = getattr(value, "raw", None)
+    if isinstance(raw, decimal.Decimal):
+        return raw.as_integer_ratio()
+    return None
+
+
 @total_ordering
 class QuantizedDecimal:
-    """Wrapper of `decimal.Decimal` with quantized semantics
+    """Fixed-point number with quantized semantics
     meaning that all operations will be quantized down to the `DECIMAL_PRECISION`
     set in `constants`
     """
 
+    __slots__ = ("_int",)
+
     def __init__(self, value: DecimalLike = "0", context: decimal.Context = None):
         if isinstance(value, QuantizedDecimal):
-            value = value * DECIMAL_MULT
-            self._value = value._value
+            self._int = value._int
+        elif isinstance(value, int):
+            self._int = _check_range(value * _ONE)
+        elif isinstance(value, str):
+            self._int = _check_range(_str_to_raw(value, _ONE))
         elif isinstance(value, decimal.Decimal):
             rounding = decimal.ROUND_DOWN
             if context is not None:
                 rounding = context.rounding
-            value = value * DECIMAL_MULT
-            self._value = self._quantize(value, rounding=rounding)
+            self._int = _check_range(_decimal_to_raw(value, rounding))
+        elif isinstance(value, float):
+            self._int = _check_range(
+                _decimal_to_raw(decimal.Decimal(value), decimal.ROUND_HALF_DOWN)
+            )
         else:
-            rounding = decimal.ROUND_DOWN
-            if isinstance(value, float):
-                rounding = decimal.ROUND_HALF_DOWN
-            high_prec_value = decimal.Decimal(value, context=context) * DECIMAL_MULT
-            self._value = self._quantize(high_prec_value, rounding=rounding)
+            ratio = _as_ratio(value)
+            if ratio is None:
+                raise TypeError(f"Cannot convert {value!r} to QuantizedDecimal")
+            self._int = _check_range(_div_down(ratio[0] * _ONE, ratio[1]))
+
+    @classmethod
+    def from_raw(cls, raw: int) -> QuantizedDecimal:
+        """Construct from the scaled integer representation, e.g., a value returned by a contract."""
+        return _from_raw(raw)
 
     @property
-    def raw(self):
-        return self._value
+    def raw(self) -> decimal.Decimal:
+        return decimal.Decimal(self._int).scaleb(-DECIMAL_PRECISION, _POW_CONTEXT)
 
-    @staticmethod
-    def _quantize(
-        value: decimal.Decimal, rounding=decimal.ROUND_DOWN
-    ) -> decimal.Decimal:
-        return value.quantize(QUANTIZED_EXP, rounding=rounding)
+    @property
+    def raw_int(self) -> int:
+        """The scaled integer representation (i.e., the value as it would be stored in a uint256/int256)."""
+        return self._int
 
     def quantize_to_lower_precision(self, rounding=decimal.ROUND_DOWN):
-        return self._value.quantize(QUANTIZED_EXP, rounding=rounding)
+        return self.raw.quantize(QUANTIZED_EXP, rounding=rounding)
 
     def __add__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value + self._get_value(other))
+        if isinstance(other, QuantizedDecimal):
+            return _from_raw(self._int + other._int)
+        if isinstance(other, int):
+            return _from_raw(self._int + other * _ONE)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(self._int * den + num * _ONE, den))
 
-    def __radd__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value + self._get_value(other))
+    __radd__ = __add__
 
     def __sub__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value - self._get_value(other))
+        if isinstance(other, QuantizedDecimal):
+            return _from_raw(self._int - other._int)
+        if isinstance(other, int):
+            return _from_raw(self._int - other * _ONE)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(self._int * den - num * _ONE, den))
 
     def __rsub__(self, other: DecimalLike):
-        return QuantizedDecimal(self._get_value(other) - self._value)
+        if isinstance(other, int):
+            return _from_raw(other * _ONE - self._int)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(num * _ONE - self._int * den, den))
+
+    def _mul(self, other: DecimalLike, div):
+        if isinstance(other, QuantizedDecimal):
+            return _from_raw(div(self._int * other._int, _ONE))
+        if isinstance(other, int):
+            return _from_raw(self._int * other)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(div(self._int * num, den))
+
+    def _truediv(self, other: DecimalLike, div):
+        if isinstance(other, QuantizedDecimal):
+            return _from_raw(div(self._int * _ONE, other._int))
+        if isinstance(other, int):
+            return _from_raw(div(self._int, other))
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(div(self._int * den, num))
 
     def __mul__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value * self._get_value(other))
+        return self._mul(other, _div_down)
 
-    def __rmul__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value * self._get_value(other))
+    __rmul__ = __mul__
 
     def __truediv__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value / self._get_value(other))
+        return self._truediv(other, _div_down)
 
     def __rtruediv__(self, other: DecimalLike):
-        return QuantizedDecimal(self._get_value(other) / self._value)
+        if isinstance(other, int):
+            return _from_raw(_div_down(other * _ONE * _ONE, self._int))
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(num * _ONE * _ONE, den * self._int))
 
     def __floordiv__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value // self._get_value(other))
+        # Like Decimal, // truncates towards zero.
+        if isinstance(other, QuantizedDecimal):
+            return _from_raw(_div_down(self._int, other._int) * _ONE)
+        if isinstance(other, int):
+            return _from_raw(_div_down(self._int, other * _ONE) * _ONE)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(self._int * den, num * _ONE) * _ONE)
 
     def __rfloordiv__(self, other: DecimalLike):
-        return QuantizedDecimal(self._get_value(other) // self._value)
+        if isinstance(other, int):
+            return _from_raw(_div_down(other * _ONE, self._int) * _ONE)
+        ratio = _as_ratio(other)
+        if ratio is None:
+            return NotImplemented
+        num, den = ratio
+        return _from_raw(_div_down(num * _ONE, den * self._int) * _ONE)
 
     def __pow__(self, other: DecimalLike):
-        return QuantizedDecimal(self._value ** self._get_value(other))
+        if isinstance(other, QuantizedDecimal):
+            if 2 * other._int == _ONE:
+                return self.sqrt()
+            if other._int % _ONE == 0:
+                other = other._int // _ONE
+        if isinstance(other, int):
+            if other == 0:
+                return _from_raw(_ONE)
+            if other > 0:
+                return _from_raw(_div_down(self._int**other, _ONE ** (other - 1)))
+            return _from_raw(_div_down(_ONE ** (1 - other), self._int ** (-other)))
+        exponent = other.raw if isinstance(other, QuantizedDecimal) else other
+        if isinstance(exponent, str):
+            exponent = decimal.Decimal(exponent)
+        return QuantizedDecimal(_POW_CONTEXT.power(self.raw, exponent))
 
     def __eq__(self, other: Any):
         if isinstance(other, QuantizedDecimal):
-            return (
-                self.quantize_to_lower_precision()
-                == other.quantize_to_lower_precision()
-            )
-        return self.quantize_to_lower_precision() == other
+            return self._int == other._int
+        if isinstance(other, int):
+            return self._int == other * _ONE
+        return self.raw == other
 
     def __ne__(self, other: Any):
-        if isinstance(other, QuantizedDecimal):
-            return (
-                self.quantize_to_lower_precision()
-                != other.quantize_to_lower_precision()
-            )
-        return self.quantize_to_lower_precision() != other
+        return not self == other
 
     def __lt__(self, other: DecimalLike):
         if isinstance(other, QuantizedDecimal):
-            return (
-                self.quantize_to_lower_precision() < other.quantize_to_lower_precision()
-            )
+            return self._int < other._int
+        if isinstance(other, int):
+            return self._int < other * _ONE
         return self < QuantizedDecimal(other)
 
     def __hash__(self):
-        return hash(self._value)
+        # Must agree with the hashes of equal int / Decimal values.
+        if self._int % _ONE == 0:
+            return hash(self._int // _ONE)
+        return hash(Fraction(self._int, _ONE))
 
     def __neg__(self):
-        return QuantizedDecimal(-self._value)
+        return _from_raw(-self._int)
 
     def __abs__(self):
-        return QuantizedDecimal(abs(self._value))
+        return _from_raw(abs(self._int))
 
     def __int__(self):
-        return int(self._value)
+        return _div_down(self._int, _ONE)
 
     def __float__(self):
-        return float(self._value)
+        return self._int / _ONE
 
     def is_zero(self):
-        return self == 0
+        return self._int == 0
 
     def sqrt(self):
         """For consistency with Decimal"""
-        return self ** QuantizedDecimal("0.5")
+        if self._int < 0:
+            raise decimal.InvalidOperation(f"sqrt of negative number: {self}")
+        return _from_raw(math.isqrt(self._int * _ONE))
 
     def floor(self):
-        return QuantizedDecimal(math.floor(self._value))
+        return _from_raw(self._int // _ONE * _ONE)
 
     def mul_up(self, other: DecimalLike):
-        context = decimal.getcontext().copy()
-        context.rounding = decimal.ROUND_UP
-        return QuantizedDecimal(self._value * self._get_value(other), context=context)
+        res = self._mul(other, _div_up)
+        if res is NotImplemented:
+            raise TypeError(f"Unsupported operand for mul_up: {other!r}")
+        return res
 
     def div_up(self, other: DecimalLike):
-        context = decimal.getcontext().copy()
-        context.rounding = decimal.ROUND_UP
-        return QuantizedDecimal(self._value / self._get_value(other), context=context)
+        res = self._truediv(other, _div_up)
+        if res is NotImplemented:
+            raise TypeError(f"Unsupported operand for div_up: {other!r}")
+        return res
 
     @classmethod
     def from_float(cls, value: float) -> QuantizedDecimal:
         return cls(value)
 
-    @staticmethod
-    def _get_value(value: DecimalLike) -> decimal.Decimal:
-        if isinstance(value, QuantizedDecimal):
-            return value._value  # pylint: disable=protected-access
-        elif isinstance(value, (int, str)):
-            return decimal.Decimal(value)
-        return value
-
     def __repr__(self):
-        return repr(self._value)
+        return repr(self.raw)
 
     def __str__(self):
-        return str(self._value)
+        return str(self.raw)
 
     def __format__(self, format_spec: str):
         # This fixes a bug where .approxed() cannot be displayed when tolerances are given in QuantizedDecimal (as they should be!).
         if format_spec.endswith("e"):
             return format(float(self), format_spec)
         else:
-            return format(self._value, format_spec)
+            return format(self.raw, format_spec)
 
     def approxed(self, **kwargs):
         return pytest.approx(self.raw, **kwargs)
@@ -1,25 +1,54 @@
 from __future__ import annotations
 
+import bisect
 import builtins
+import codecs
 import dataclasses
 import glob
+import hashlib
+import itertools
 import json
+import os
 import re
+import tempfile
 from dataclasses import dataclass, field
 from enum import Enum
-from functools import lru_cache
+from functools import cached_property
 from os import path
-from typing import Callable, Dict, List, Optional, Set, Tuple, TypeVar, Union
-
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
 import web3
 
 ROOT_DIR = path.join(path.dirname(__file__), "../../")
+TRACE_CACHE_DIR = path.join(ROOT_DIR, "build", "trace_cache")
+# Bump whenever the cached representation of SourceData changes.
+TRACE_CACHE_VERSION = 1
 
 LIBRARY_PLACEHOLDER = re.compile(r"__\$[a-zA-Z0-9_]+\$__")
 ZERO_ADDRESS = "0" * 40
 PUSH1 = 0x60
 PUSH32 = 0x7F
 CALL_OPS = ("CALL", "DELEGATECALL", "STATICCALL")
+# Size in bytes of each opcode's instruction, including the data of PUSHes
+_INSTRUCTION_SIZES = bytes(
+    op - PUSH1 + 2 if PUSH1 <= op <= PUSH32 else 1 for op in range(256)
+)
+STRUCT_LOGS_START = re.compile(r'"structLogs"\s*:\s*\[')
 
 
 class JumpType(Enum):
@@ -82,6 +111,70 @@ class Location:
         )
 
 
+JUMP_TYPES = list(JumpType)
+_JUMP_TYPE_CODES = {jump_type.value: i for i, jump_type in enumerate(JUMP_TYPES)}
+
+
+class SourceMap:
+    """Source map of a bytecode, one row per instruction, stored as one array per field.
+
+    Source indices are ints (-1 for generated code) and jump types indices into JUMP_TYPES. `Location`s are only
+    created on access.
+    """
+
+    COLUMNS = ("offsets", "lengths", "source_indices", "jump_types", "modifier_depths")
+
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+        source_indices: np.ndarray,
+        jump_types: np.ndarray,
+        modifier_depths: np.ndarray,
+    ):
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.source_indices = np.asarray(source_indices, dtype=np.int32)
+        self.jump_types = np.asarray(jump_types, dtype=np.int8)
+        self.modifier_depths = np.asarray(modifier_depths, dtype=np.int32)
+
+    @classmethod
+    def from_locations(cls, locations: List[Location]) -> SourceMap:
+        return cls(
+            [l.offset for l in locations],
+            [l.length for l in locations],
+            [int(l.source_index) for l in locations],
+            [JUMP_TYPES.index(l.jump_type) for l in locations],
+            [l.modifier_depth for l in locations],
+        )
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, instruction_index: int) -> Location:
+        return Location(
+            source_index=str(self.source_indices[instruction_index]),
+            offset=int(self.offsets[instruction_index]),
+            length=int(self.lengths[instruction_index]),
+            jump_type=JUMP_TYPES[self.jump_types[instruction_index]],
+            modifier_depth=int(self.modifier_depths[instruction_index]),
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, SourceMap):
+            return NotImplemented
+        return all(
+            np.array_equal(a, b)
+            for a, b in zip(self.columns().values(), other.columns().values())
+        )
+
+    def __repr__(self):
+        return f"SourceMap({len(self)} instructions)"
+
+
 @dataclass
 class Definition:
     name: str
@@ -115,18 +208,38 @@ class FunctionDefinition(Definition):
         )
 
 
+D = TypeVar("D", bound=Definition)
+T = TypeVar("T")
+
+
+class DefinitionIndex(Generic[D]):
+    """Definitions of a single source sorted by offset, to find the one containing a location by binary search.
+
+    Contracts and functions can't be nested in Solidity, so the definitions of one kind are disjoint and only the last
+    one starting at or before a location can contain it.
+    """
+
+    def __init__(self, definitions: List[D]):
+        self._definitions = sorted(definitions, key=lambda d: d.location.offset)
+        self._offsets = [d.location.offset for d in self._definitions]
+
+    def find(self, location: Location) -> Optional[D]:
+        i = bisect.bisect_right(self._offsets, location.offset) - 1
+        if i >= 0 and location.is_within(self._definitions[i].location):
+            return self._definitions[i]
+        return None
+
+
 @dataclass
 class SourceData:
-    D = TypeVar("D", bound=Definition)
-
     path: str
-    ast: dict
     index: str
     contracts: List[ContractDefinition]
     functions: List[FunctionDefinition]
-    instruction_mapping: Dict[int, int]
+    # Instruction index of each pc, see `compute_pc_mapping()`
+    instruction_mapping: np.ndarray
     content: str
-    source_map: List[Location]
+    source_map: SourceMap
     bytecode: bytes
 
     def has_contract(self, name: str) -> bool:
@@ -134,18 +247,31 @@ class SourceData:
 
     def get_pc_location(self, pc: int) -> Location:
         instruction_index = self.instruction_mapping[pc]
+        if instruction_index < 0:
+            raise KeyError(f"No instruction at pc {pc}")
         return self.source_map[instruction_index]
 
-    def _find_container_at(self, loc: Location, containers: List[D]) -> Optional[D]:
-        for container in containers:
-            if loc.is_within(container.location):
-                return container
+    @cached_property
+    def _line_starts(self) -> List[int]:
+        return [0] + [m.end() for m in re.finditer("\n", self.content)]
+
+    def line_at(self, offset: int) -> int:
+        """1-based line number of a character offset"""
+        return bisect.bisect_right(self._line_starts, offset)
+
+    @cached_property
+    def _function_index(self) -> DefinitionIndex[FunctionDefinition]:
+        return DefinitionIndex(self.functions)
+
+    @cached_property
+    def _contract_index(self) -> DefinitionIndex[ContractDefinition]:
+        return DefinitionIndex(self.contracts)
 
     def find_function_at(self, location: Location) -> Optional[FunctionDefinition]:
-        return self._find_container_at(location, self.functions)
+        return self._function_index.find(location)
 
     def find_contract_at(self, location: Location) -> Optional[ContractDefinition]:
-        return self._find_container_at(location, self.contracts)
+        return self._contract_index.find(location)
 
     @classmethod
     def from_build(cls, build_data) -> SourceData:
@@ -157,7 +283,6 @@ class SourceData:
         bytecode = parse_bytecode(build_data["deployedBytecode"])
         return cls(
             path=build_data["sourcePath"],
-            ast=ast,
             index=index,
             contracts=contracts,
             instruction_mapping=compute_pc_mapping(bytecode),
@@ -167,38 +292,251 @@ class SourceData:
             bytecode=bytecode,
         )
 
+    def save(self, filename: str):
+        """Writes the parsed data in a compact binary form (see `SourceData.load()`)."""
+        meta = {
+            "path": self.path,
+            "index": self.index,
+            "contracts": [[c.name, c.location.to_list()] for c in self.contracts],
+            "functions": [
+                [f.name, f.contract_name, f.location.to_list()] for f in self.functions
+            ],
+        }
+        with open(filename, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                content=np.array(self.content),
+                bytecode=np.frombuffer(self.bytecode, dtype=np.uint8),
+                instruction_mapping=self.instruction_mapping,
+                **self.source_map.columns(),
+            )
+
+    @classmethod
+    def load(cls, filename: str) -> SourceData:
+        with np.load(filename, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].item())
+            return cls(
+                path=meta["path"],
+                index=meta["index"],
+                contracts=[
+                    ContractDefinition(name, _location_from_list(loc))
+                    for name, loc in meta["contracts"]
+                ],
+                functions=[
+                    FunctionDefinition(name, _location_from_list(loc), contract_name)
+                    for name, contract_name, loc in meta["functions"]
+                ],
+                instruction_mapping=data["instruction_mapping"],
+                content=data["content"].item(),
+                source_map=SourceMap(*(data[name] for name in SourceMap.COLUMNS)),
+                bytecode=data["bytecode"].tobytes(),
+            )
+
+    def __eq__(self, other):
+        if not isinstance(other, SourceData):
+            return NotImplemented
+        return all(
+            (
+                np.array_equal(a, b)
+                if isinstance(a, np.ndarray)
+                else type(a) == type(b) and a == b
+            )
+            for a, b in (
+                (getattr(self, f.name), getattr(other, f.name))
+                for f in dataclasses.fields(self)
+            )
+        )
+
     def __repr__(self):
         return f"SourceData(path={self.path})"
 
 
-class Sources:
-    D = TypeVar("D", bound=Definition)
+def _location_from_list(values: list) -> Location:
+    offset, length, source_index, jump_type, modifier_depth = values
+    return Location(
+        source_index, offset, length, JumpType.from_raw(jump_type), modifier_depth
+    )
+
+
+class CachedSource(NamedTuple):
+    index: str
+    contract_names: List[str]
+    load: Callable[[], SourceData]
+
+
+class SourceCache:
+    """On-disk cache of the parsed build artifacts in build/contracts, keyed by the content hash of the build file.
+
+    `index.json` records the hash, source index and contract names of every build file, so that `Sources` can be set up
+    without parsing any JSON; the hash is recomputed only when a build file's size or mtime changes. The parsed data of
+    each build file is stored in `<hash>.npz` (see `SourceData.save()`) and only read once the source is needed.
+    """
+
+    def __init__(self, directory: str = TRACE_CACHE_DIR):
+        self.directory = directory
+        self._index_path = path.join(directory, "index.json")
+        self._files: Dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            if index["version"] == TRACE_CACHE_VERSION:
+                self._files = index["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _entry_path(self, digest: str) -> str:
+        return path.join(self.directory, f"{digest}.npz")
+
+    def get(self, build_file: str) -> CachedSource:
+        stat = os.stat(build_file)
+        key = path.basename(build_file)
+        entry = self._files.get(key)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+            or not path.exists(self._entry_path(entry["hash"]))
+        ):
+            with open(build_file, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            entry_path = self._entry_path(digest)
+            if path.exists(entry_path):
+                source_data = SourceData.load(entry_path)
+            else:
+                source_data = SourceData.from_build(json.loads(raw))
+                self._atomic_write(entry_path, source_data.save)
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": digest,
+                "index": source_data.index,
+                "contracts": [c.name for c in source_data.contracts],
+            }
+            self._files[key] = entry
+            self._dirty = True
+            return CachedSource(entry["index"], entry["contracts"], lambda: source_data)
+
+        entry_path = self._entry_path(entry["hash"])
+        return CachedSource(
+            entry["index"], entry["contracts"], lambda: SourceData.load(entry_path)
+        )
+
+    def flush(self):
+        """Writes the index if it changed."""
+        if not self._dirty:
+            return
+
+        def write(filename):
+            with open(filename, "w") as f:
+                json.dump({"version": TRACE_CACHE_VERSION, "files": self._files}, f)
 
-    def __init__(self, sources: Dict[str, SourceData]):
+        self._atomic_write(self._index_path, write)
+        self._dirty = False
+
+    def _atomic_write(self, filename: str, write: Callable[[str], None]):
+        # Several processes may fill the cache at once (e.g., parallel gas measurements).
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, filename)
+        finally:
+            if path.exists(tmp):
+                os.remove(tmp)
+
+
+class LazySources(Mapping[str, SourceData]):
+    """Source index -> SourceData, loading each source on first access."""
+
+    def __init__(self, loaders: Dict[str, Callable[[], SourceData]]):
+        self._loaders = loaders
+        self._loaded: Dict[str, SourceData] = {}
+
+    def __getitem__(self, index: str) -> SourceData:
+        if index not in self._loaded:
+            self._loaded[index] = self._loaders[index]()
+        return self._loaded[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+
+class Sources:
+    def __init__(
+        self,
+        sources: Mapping[str, SourceData],
+        contract_indices: Optional[Dict[str, str]] = None,
+    ):
+        """`contract_indices` maps contract names to the index of their source. If not given, it is computed from
+        `sources`, which loads all of them."""
         self._sources = sources
+        if contract_indices is None:
+            contract_indices = {}
+            for source in sources.values():
+                for contract in source.contracts:
+                    contract_indices.setdefault(contract.name, source.index)
+        self._contract_indices = contract_indices
+        # (index of the contract's source, pc) -> location / function / source line of the instruction
+        self._pc_locations: Dict[Tuple[str, int], Location] = {}
+        self._pc_functions: Dict[Tuple[str, int], Optional[FunctionDefinition]] = {}
+        self._pc_lines: Dict[Tuple[str, int], Optional[Tuple[str, int]]] = {}
 
-    @lru_cache()
     def find_contract(self, name: str) -> SourceData:
-        for source in self._sources.values():
-            if source.has_contract(name):
-                return source
-        raise ValueError(f"No contract found with name {name}")
-
-    def _get_location_container(
-        self, location: Location, f: Callable[[SourceData], List[D]]
-    ) -> Optional[D]:
-        if location.source_index == "-1":
-            return
-        source = self._sources[location.source_index]
-        for container in f(source):
-            if location.is_within(container.location):
-                return container
+        index = self._contract_indices.get(name)
+        if index is None:
+            raise ValueError(f"No contract found with name {name}")
+        return self._sources[index]
 
     def get_location_function(self, location: Location) -> Optional[FunctionDefinition]:
-        return self._get_location_container(location, lambda s: s.functions)
+        if location.source_index == "-1":
+            return None
+        return self._sources[location.source_index].find_function_at(location)
 
     def get_location_contract(self, location: Location) -> Optional[ContractDefinition]:
-        return self._get_location_container(location, lambda s: s.contracts)
+        if location.source_index == "-1":
+            return None
+        return self._sources[location.source_index].find_contract_at(location)
+
+    def get_pc_location(self, source: SourceData, pc: int) -> Location:
+        """`source.get_pc_location(pc)`, cached, since the same instructions are executed over and over in a
+        trace."""
+        key = (source.index, pc)
+        location = self._pc_locations.get(key)
+        if location is None:
+            location = self._pc_locations[key] = source.get_pc_location(pc)
+        return location
+
+    def get_pc_function(
+        self, source: SourceData, pc: int
+    ) -> Optional[FunctionDefinition]:
+        """Function containing the instruction at `pc` in the bytecode of `source`. Cached, since the same
+        instructions are executed over and over in a trace."""
+        key = (source.index, pc)
+        if key not in self._pc_functions:
+            self._pc_functions[key] = self.get_location_function(
+                self.get_pc_location(source, pc)
+            )
+        return self._pc_functions[key]
+
+    def get_pc_line(self, source: SourceData, pc: int) -> Optional[Tuple[str, int]]:
+        """(source path, line number) of the instruction at `pc` in the bytecode of `source`. Cached."""
+        key = (source.index, pc)
+        if key not in self._pc_lines:
+            location = self.get_pc_location(source, pc)
+            line_source = self._sources.get(location.source_index)
+            self._pc_lines[key] = (
+                None
+                if line_source is None
+                else (line_source.path, line_source.line_at(location.offset))
+            )
+        return self._pc_lines[key]
 
     def get_location_code(self, location: Location) -> str:
         content = self._sources[location.source_index].content
@@ -206,19 +544,35 @@ class Sources:
 
     def get_pc_code(self, contract_name: str, pc: int) -> str:
         source = self.find_contract(contract_name)
-        instruction_index = source.instruction_mapping[pc]
-        return self.get_location_code(source.source_map[instruction_index])
+        return self.get_location_code(source.get_pc_location(pc))
 
     @classmethod
-    def load(cls):
+    def load(cls, use_cache: bool = True) -> Sources:
         build_files = glob.glob(path.join(ROOT_DIR, "build", "contracts", "*.json"))
-        sources: Dict[str, SourceData] = {}
+        if not use_cache:
+            sources: Dict[str, SourceData] = {}
+            for build_file in build_files:
+                with open(build_file) as f:
+                    data = json.load(f)
+                source_data = SourceData.from_build(data)
+                sources[source_data.index] = source_data
+            return cls(sources)
+
+        cache = SourceCache()
+        cached_sources: Dict[str, CachedSource] = {}
         for build_file in build_files:
-            with open(build_file) as f:
-                data = json.load(f)
-            source_data = SourceData.from_build(data)
-            sources[source_data.index] = source_data
-        return cls(sources)
+            cached = cache.get(build_file)
+            cached_sources[cached.index] = cached
+        cache.flush()
+
+        contract_indices: Dict[str, str] = {}
+        for cached in cached_sources.values():
+            for name in cached.contract_names:
+                contract_indices.setdefault(name, cached.index)
+        return cls(
+            LazySources({index: c.load for index, c in cached_sources.items()}),
+            contract_indices,
+        )
 
 
 def parse_bytecode(bytecode: Union[str, bytes]) -> bytes:
@@ -229,17 +583,18 @@ def parse_bytecode(bytecode: Union[str, bytes]) -> bytes:
     return bytecode
 
 
-def compute_pc_mapping(bytecode: bytes):
-    mapping = {}
-    instruction_offset, pc = 0, 0
+def compute_pc_mapping(bytecode: bytes) -> np.ndarray:
+    """Index of the instruction starting at each pc, or -1 for pcs within the data of a PUSH."""
+    # Whether a byte is an opcode depends on all PUSHes before it, so this needs a sequential scan, but it only
+    # visits instructions and looks up their size in a table.
+    sizes = bytecode.translate(_INSTRUCTION_SIZES)
+    is_instruction = bytearray(len(bytecode))
+    pc = 0
     while pc < len(bytecode):
-        opcode = bytecode[pc]
-        mapping[pc] = instruction_offset
-        instruction_offset += 1
-        pc += 1
-        if PUSH1 <= opcode <= PUSH32:
-            pc += opcode - PUSH1 + 1
-    return mapping
+        is_instruction[pc] = 1
+        pc += sizes[pc]
+    starts = np.frombuffer(bytes(is_instruction), dtype=np.bool_)
+    return np.where(starts, np.cumsum(starts) - 1, -1).astype(np.int32)
 
 
 def find_definitions(root) -> Tuple[List[ContractDefinition], List[FunctionDefinition]]:
@@ -278,13 +633,32 @@ def generate_deployments():
     return deployments
 
 
-def parse_source_map(source_map) -> List[Location]:
-    result = []
-    current_source_map = None
-    for location in source_map:
-        current_source_map = Location.from_raw_bytecode(location, current_source_map)
-        result.append(current_source_map)
-    return result
+def parse_source_map(source_map: List[str]) -> SourceMap:
+    """`source_map` are the entries of a compressed solc source map ("s:l:f:j:m"), where empty fields repeat the
+    previous entry."""
+    # Most instructions share their location with many others, so fields are only converted once per distinct row.
+    row = ("0", "0", "-1", JumpType.Regular.value, "0")
+    row_ids: Dict[Tuple[str, ...], int] = {}
+    instruction_rows = []
+    for entry in source_map:
+        if entry:
+            fields = entry.split(":")
+            row = (
+                tuple(f or previous for f, previous in zip(fields, row))
+                + row[len(fields) :]
+            )
+        row_id = row_ids.get(row)
+        if row_id is None:
+            row_id = row_ids[row] = len(row_ids)
+        instruction_rows.append(row_id)
+    distinct_rows = np.array(
+        [
+            (int(s), int(l), int(f), _JUMP_TYPE_CODES[j], int(m))
+            for s, l, f, j, m in row_ids
+        ],
+        dtype=np.int32,
+    ).reshape(-1, 5)
+    return SourceMap(*distinct_rows[np.array(instruction_rows, dtype=np.int64)].T)
 
 
 class CallType(Enum):
@@ -311,6 +685,12 @@ class CallType(Enum):
         }[self]
 
 
+class FunctionGas(NamedTuple):
+    calls: int
+    # Total gas of all calls, including nested calls
+    gas: int
+
+
 @dataclass
 class Context:
     contract_name: str
@@ -376,6 +756,21 @@ class Context:
             )
         return line + children
 
+    def gas_by_function(self) -> Dict[str, FunctionGas]:
+        """Number of calls and total gas per function, over this context and all its descendants"""
+        result: Dict[str, FunctionGas] = {}
+
+        def visit(context: Context):
+            calls, gas = result.get(context.qualified_function_name, (0, 0))
+            result[context.qualified_function_name] = FunctionGas(
+                calls + 1, gas + context.total_gas_consumed
+            )
+            for _, child in context.children:
+                visit(child)
+
+        visit(self)
+        return result
+
     def update_names(self, sources: Sources, location: Location):
         if not self.contract_name:
             contract = sources.get_location_contract(location)
@@ -388,12 +783,258 @@ class Context:
                 self.function_name = function.name
 
 
+def merge_contexts(contexts: List[Context]) -> Context:
+    """Sums the gas of traces with the same call structure, e.g., of one scenario for different pool parameters.
+    The n-th call of a function from a context is matched with the n-th call of that function in the other contexts;
+    calls that only occur in some of the contexts are kept. Unfinished contexts don't contribute gas.
+    """
+    finished = [c for c in contexts if c.final_gas]
+    merged = Context(
+        contexts[0].contract_name,
+        contexts[0].function_name,
+        sum(c.initial_gas for c in finished),
+        sum(c.final_gas for c in finished),
+    )
+    groups: Dict[Tuple[CallType, str, int], List[Context]] = {}
+    for context in contexts:
+        occurrences: Dict[Tuple[CallType, str], int] = {}
+        for call_type, child in context.children:
+            name = (call_type, child.qualified_function_name)
+            n = occurrences[name] = occurrences.get(name, -1) + 1
+            groups.setdefault((*name, n), []).append(child)
+    merged.children = [
+        (call_type, merge_contexts(children))
+        for (call_type, _, _), children in groups.items()
+    ]
+    return merged
+
+
+MEMORY_EXPANSION = "(memory expansion)"
+# Static cost of the opcodes whose only dynamic cost is memory expansion
+MEMORY_OPS = {"MLOAD": 3, "MSTORE": 3, "MSTORE8": 3}
+
+OPCODE_CLASSES = {
+    "storage": ("SLOAD", "SSTORE"),
+    "add/sub": ("ADD", "SUB"),
+    "mul/div": ("MUL", "DIV", "SDIV", "MOD", "SMOD", "ADDMOD", "MULMOD", "EXP"),
+    "comparison/bitwise": (
+        *("LT", "GT", "SLT", "SGT", "EQ", "ISZERO"),
+        *("AND", "OR", "XOR", "NOT", "BYTE", "SHL", "SHR", "SAR", "SIGNEXTEND"),
+    ),
+    "memory": ("MLOAD", "MSTORE", "MSTORE8", "MSIZE"),
+    "memory expansion": (MEMORY_EXPANSION,),
+    "copy": ("CALLDATACOPY", "CODECOPY", "EXTCODECOPY", "RETURNDATACOPY"),
+    "hashing": ("SHA3", "KECCAK256"),
+    "control flow": ("JUMP", "JUMPI", "JUMPDEST", "PC", "STOP"),
+    "calls": (
+        *("CALL", "CALLCODE", "DELEGATECALL", "STATICCALL", "CREATE", "CREATE2"),
+        *("RETURN", "REVERT"),
+    ),
+    "logs": tuple(f"LOG{i}" for i in range(5)),
+    "stack": (
+        "POP",
+        *(f"PUSH{i}" for i in range(1, 33)),
+        *(f"DUP{i}" for i in range(1, 17)),
+        *(f"SWAP{i}" for i in range(1, 17)),
+    ),
+}
+_OPCODE_CLASS_BY_OP = {op: cls for cls, ops in OPCODE_CLASSES.items() for op in ops}
+
+
+def opcode_class(op: str) -> str:
+    """Class of an opcode in OPCODE_CLASSES; everything else (context, block info, ...) is "environment"."""
+    return _OPCODE_CLASS_BY_OP.get(op, "environment")
+
+
+class ProfileKey(NamedTuple):
+    # Qualified names of the external and internal calls on the stack, outermost first
+    frames: Tuple[str, ...]
+    # (source path, line number), or None for instructions without a source location
+    line: Optional[Tuple[str, int]]
+    op: str
+
+
+@dataclass
+class GasProfile:
+    """Gas of the steps of a trace, aggregated by call stack, source line and opcode.
+
+    Gas is exclusive: a call is only charged its own overhead, the gas used by the callee is attributed to the steps of
+    the callee. The dynamic part of MLOAD / MSTORE / MSTORE8 is recorded as MEMORY_EXPANSION.
+    """
+
+    costs: Dict[ProfileKey, int] = field(default_factory=dict)
+
+    def add(
+        self,
+        frames: Tuple[str, ...],
+        line: Optional[Tuple[str, int]],
+        op: str,
+        gas: int,
+    ):
+        if op in MEMORY_OPS and gas > MEMORY_OPS[op]:
+            self.add(frames, line, MEMORY_EXPANSION, gas - MEMORY_OPS[op])
+            gas = MEMORY_OPS[op]
+        key = ProfileKey(frames, line, op)
+        self.costs[key] = self.costs.get(key, 0) + gas
+
+    def update(self, other: "GasProfile"):
+        """Adds the gas of `other`, e.g., the profile of the same scenario for other pool parameters."""
+        for key, gas in other.costs.items():
+            self.costs[key] = self.costs.get(key, 0) + gas
+
+    @property
+    def total_gas(self) -> int:
+        return sum(self.costs.values())
+
+    def _aggregate(self, f: Callable[[ProfileKey], T]) -> Dict[T, int]:
+        """Sum of the gas per f(key), most expensive first"""
+        result: Dict[T, int] = {}
+        for key, gas in self.costs.items():
+            k = f(key)
+            result[k] = result.get(k, 0) + gas
+        return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+    def by_line(self) -> Dict[Tuple[str, int], int]:
+        by_line = self._aggregate(lambda key: key.line)
+        by_line.pop(None, None)
+        return by_line
+
+    def by_opcode(self) -> Dict[str, int]:
+        return self._aggregate(lambda key: key.op)
+
+    def by_opcode_class(self) -> Dict[str, int]:
+        return self._aggregate(lambda key: opcode_class(key.op))
+
+    def by_function(self) -> Dict[str, int]:
+        """Exclusive gas per (innermost) function"""
+        return self._aggregate(lambda key: key.frames[-1])
+
+    def collapsed_stacks(self, leaf: Optional[str] = None) -> List[str]:
+        """Lines "frame;frame;... gas" as consumed by flamegraph.pl, inferno or speedscope. `leaf` can be "line" or
+        "opcode" to add the source line or the opcode as the innermost frame."""
+        if leaf not in (None, "line", "opcode"):
+            raise ValueError(f"Unknown leaf {leaf}")
+
+        def stack(key: ProfileKey) -> str:
+            frames = list(key.frames)
+            if leaf == "line":
+                frames.append(f"{key.line[0]}:{key.line[1]}" if key.line else "?")
+            elif leaf == "opcode":
+                frames.append(key.op)
+            return ";".join(frames)
+
+        return [f"{s} {gas}" for s, gas in sorted(self._aggregate(stack).items())]
+
+    def write_collapsed_stacks(self, filename: str, leaf: Optional[str] = None):
+        with open(filename, "w") as f:
+            f.writelines(line + "\n" for line in self.collapsed_stacks(leaf))
+
+    def format_line_heatmap(self, source: SourceData, bar_width: int = 20) -> str:
+        """The content of `source` with the gas spent on each line and a bar relative to the most expensive line."""
+        gas_by_line = {
+            line: gas
+            for (path, line), gas in self.by_line().items()
+            if path == source.path
+        }
+        max_gas = max(gas_by_line.values(), default=0)
+        lines = []
+        for lineno, code in enumerate(source.content.splitlines(), 1):
+            gas = gas_by_line.get(lineno, 0)
+            if gas:
+                bar = "█" * max(1, round(bar_width * gas / max_gas))
+                lines.append(f"{gas:>10,} {bar:<{bar_width}} {lineno:>5} | {code}")
+            else:
+                lines.append(f"{'':>10} {'':<{bar_width}} {lineno:>5} | {code}")
+        return "\n".join(lines)
+
+
 def normalize_address(address: str) -> str:
-    return web3.Web3.toChecksumAddress(
-        int.from_bytes(bytes.fromhex(address), "big").to_bytes(20, "big").hex()
+    # Stack values are hex strings, with or without 0x depending on the node.
+    return web3.Web3.toChecksumAddress(int(address, 16).to_bytes(20, "big").hex())
+
+
+def iter_struct_logs(
+    chunks: Iterable[Union[bytes, str]], trim_size: int = 1 << 16
+) -> Iterator[dict]:
+    """Incrementally parses the struct logs out of a debug_traceTransaction JSON-RPC response that arrives in chunks,
+    yielding one step at a time. Only the unparsed part of the response is buffered."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+
+    def read_more() -> bool:
+        nonlocal buffer
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer += utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    match = STRUCT_LOGS_START.search(buffer)
+    while match is None:
+        if not read_more():
+            raise ValueError(f"No struct logs in response: {buffer[:500]}")
+        match = STRUCT_LOGS_START.search(buffer)
+    buffer, pos = buffer[match.end() :], 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            step, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Incomplete step (or nothing left in the buffer)
+            buffer, pos = buffer[pos:], 0
+            if not read_more():
+                raise ValueError("Response ended within the struct logs")
+            continue
+        yield step
+        if pos > trim_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def stream_struct_logs(
+    txid: str, endpoint_uri: Optional[str] = None, chunk_size: int = 1 << 16
+) -> Iterator[dict]:
+    """Struct logs of a transaction, streamed from the node's HTTP endpoint (the one brownie is connected to by
+    default). Storage and memory are not requested since the Tracer doesn't use them."""
+    import requests
+    from brownie import web3 as brownie_web3
+
+    if endpoint_uri is None:
+        endpoint_uri = brownie_web3.provider.endpoint_uri
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "debug_traceTransaction",
+        "params": [txid, {"disableStorage": True, "disableMemory": True}],
+    }
+    with requests.post(endpoint_uri, json=payload, stream=True) as response:
+        response.raise_for_status()
+        yield from iter_struct_logs(response.iter_content(chunk_size))
+
+
+def _frames(call_stack: List[Tuple[Context, List[Context]]]) -> Tuple[str, ...]:
+    return tuple(
+        c.qualified_function_name
+        for context, internal_call_stack in call_stack
+        for c in [context, *internal_call_stack]
     )
 
 
+def _with_next(items: Iterable[dict]) -> Iterator[Tuple[dict, Optional[dict]]]:
+    items = iter(items)
+    current = next(items, None)
+    for following in items:
+        yield current, following
+        current = following
+    if current is not None:
+        yield current, None
+
+
 class Tracer:
     def __init__(self, sources: Sources, deployments: Dict[str, List[str]]):
         self.sources = sources
@@ -406,28 +1047,68 @@ class Tracer:
 
         return "<Unknown>"
 
-    def trace_tx(self, tx) -> Context:
+    def trace_tx(self, tx, stream: bool = False) -> Context:
+        """With `stream=True`, the trace is consumed step by step from the node instead of materializing `tx.trace`,
+        which can take gigabytes for large transactions."""
+        if stream:
+            return self.trace(tx.contract_name, stream_struct_logs(tx.txid))
         return self.trace(tx.contract_name, tx.trace)
 
-    def trace(self, contract_name: str, traces: List[dict]) -> Context:
+    def profile_tx(self, tx, stream: bool = False) -> Tuple[Context, GasProfile]:
+        profile = GasProfile()
+        if stream:
+            context = self.trace(
+                tx.contract_name, stream_struct_logs(tx.txid), profile=profile
+            )
+        else:
+            context = self.trace(tx.contract_name, tx.trace, profile=profile)
+        return context, profile
+
+    def trace(
+        self,
+        contract_name: str,
+        traces: Iterable[dict],
+        profile: Optional[GasProfile] = None,
+    ) -> Context:
+        """`traces` are the struct logs from debug_traceTransaction, as a list or any other iterable. Only the
+        current and the next step are looked at, so memory use is bounded by the call depth.
+
+        If `profile` is given, the gas of every step is added to it.
+        """
+        traces = iter(traces)
+        first = next(traces)
         root_context = Context(
             contract_name=contract_name,
             function_name="",
-            initial_gas=traces[0]["gas"],
+            initial_gas=first["gas"],
         )
 
         call_stack = [(root_context, [])]
+        # (frames, line, op, gas before the call) for each external call on the stack, to charge the call's own
+        # cost once it returns
+        pending_calls = []
 
-        for i, trace in enumerate(traces):
+        last = first
+        for trace, next_trace in _with_next(itertools.chain([first], traces)):
+            last = trace
             context, internal_call_stack = call_stack[-1]
             source = self.sources.find_contract(context.contract_name)
-            location = source.get_pc_location(trace["pc"])
+            location = self.sources.get_pc_location(source, trace["pc"])
+            op = trace["op"]
             if location.source_index == "-1":
+                if profile is not None:
+                    profile.add(_frames(call_stack), None, op, trace["gasCost"])
                 continue
 
             context.update_names(self.sources, location)
 
-            op = trace["op"]
+            if profile is not None:
+                frames = _frames(call_stack)
+                line = self.sources.get_pc_line(source, trace["pc"])
+                if op in CALL_OPS:
+                    pending_calls.append((frames, line, op, trace["gas"]))
+                else:
+                    profile.add(frames, line, op, trace["gasCost"])
 
             if op in CALL_OPS:
                 target_address = normalize_address(trace["stack"][-2])
@@ -435,7 +1116,7 @@ class Tracer:
                 new_context = Context(
                     contract_name=contract_name,
                     function_name="",
-                    initial_gas=traces[i + 1]["gas"],
+                    initial_gas=next_trace["gas"],
                 )
                 context.children.append((CallType.from_op(op), new_context))
                 call_stack.append((new_context, []))
@@ -443,10 +1124,20 @@ class Tracer:
             elif op in ("RETURN", "REVERT"):
                 context.final_gas = trace["gas"]
                 call_stack.pop()
+                if profile is not None and pending_calls:
+                    frames, line, call_op, gas_before = pending_calls.pop()
+                    used_by_callee = context.initial_gas - (
+                        trace["gas"] - trace["gasCost"]
+                    )
+                    profile.add(
+                        frames,
+                        line,
+                        call_op,
+                        gas_before - next_trace["gas"] - used_by_callee,
+                    )
 
             elif op == "JUMP" and location.jump_type == JumpType.In:
-                next_location = source.get_pc_location(traces[i + 1]["pc"])
-                func = self.sources.get_location_function(next_location)
+                func = self.sources.get_pc_function(source, next_trace["pc"])
                 parent_context = (
                     internal_call_stack[-1] if internal_call_stack else context
                 )
@@ -468,7 +1159,7 @@ class Tracer:
                     internal_call_stack[-1].final_gas = trace["gas"]
                     internal_call_stack.pop()
 
-        root_context.final_gas = traces[-1]["gas"]
+        root_context.final_gas = last["gas"]
 
         return root_context
 
@@ -0,0 +1,73 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from tests.support.batch_call import (
+    BATCH_OVERHEAD_GAS,
+    CALL_GAS_LIMIT,
+    DEFAULT_BATCH_SIZE,
+    ITEM_GAS,
+    NO_REASON,
+    ItemResult,
+    call_batched,
+    decode_batch,
+)
+
+BATCH_CONTRACT = (
+    Path(__file__).parents[1]
+    / "contracts"
+    / "eclp"
+    / "testing"
+    / "GyroECLPMathBatchTesting.sol"
+)
+
+
+class FakeBatch:
+    """Batch function of integer division by the input, reverting on 0 and on negative inputs."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, inputs):
+        self.calls.append(inputs)
+        quotients, remainders, errors = [], [], []
+        for x in inputs:
+            ok = x > 0
+            quotients.append(100 // x if ok else 0)
+            remainders.append(100 % x if ok else 0)
+            errors.append("" if ok else (NO_REASON if x == 0 else "BAL#001"))
+        return quotients, remainders, errors
+
+
+def test_decode_single_value():
+    assert decode_batch(([5, 0], ["", "GYR#357"])) == [
+        ItemResult(5, None),
+        ItemResult(None, "GYR#357"),
+    ]
+
+
+def test_call_batched():
+    fn = FakeBatch()
+    results = call_batched(fn, [1, 0, 3, -1, 7], batch_size=2)
+    assert fn.calls == [[1, 0], [3, -1], [7]]
+    assert results == [
+        ItemResult((100, 0), None),
+        ItemResult(None, NO_REASON),
+        ItemResult((33, 1), None),
+        ItemResult(None, "BAL#001"),
+        ItemResult((14, 2), None),
+    ]
+    assert [r.reverted for r in results] == [False, True, False, True, False]
+    assert call_batched(fn, []) == []
+    with pytest.raises(ValueError):
+        call_batched(fn, [1], batch_size=0)
+
+
+def test_default_batch_size_fits_gas_limit():
+    source = BATCH_CONTRACT.read_text()
+    assert f'NO_REASON = "{NO_REASON}"' in source
+    item_gas = re.search(r"ITEM_GAS = ([\d_]+);", source).group(1)
+    assert int(item_gas) == ITEM_GAS
+    assert DEFAULT_BATCH_SIZE >= 1
+    assert DEFAULT_BATCH_SIZE * ITEM_GAS + BATCH_OVERHEAD_GAS <= CALL_GAS_LIMIT
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from scripts import coingecko
+
+ASSET_PLATFORMS = [
+    {"id": "ethereum", "chain_identifier": 1},
+    {"id": "polygon-pos", "chain_identifier": 137},
+    {"id": "some-non-evm-chain", "chain_identifier": None},
+]
+
+COINS = [
+    {"id": "dai", "platforms": {"ethereum": "0xaaaa", "polygon-pos": "0xBBBB"}},
+    {"id": "dai-clone", "platforms": {"ethereum": "0xAAAA"}},
+    {"id": "no-platforms", "platforms": {"ethereum": ""}},
+    {"id": "usdc", "platforms": {"ethereum": "0xcccc"}},
+]
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    requests = []
+
+    def get_json(path):
+        requests.append(path)
+        if path == "asset_platforms":
+            return ASSET_PLATFORMS
+        if path.startswith("coins/list"):
+            return COINS
+        if path.startswith("simple/price"):
+            ids = path.split("ids=")[1].split("&")[0].split(",")
+            return {cid: {"usd": {"dai": 1.0, "usdc": 0.99}[cid]} for cid in ids}
+        raise ValueError(path)
+
+    monkeypatch.setattr(coingecko, "_get_json", get_json)
+    monkeypatch.setattr(coingecko, "CACHE_DIR", tmp_path)
+    coingecko.get_coin_index.cache_clear()
+    yield requests
+    coingecko.get_coin_index.cache_clear()
+
+
+def test_coin_index():
+    index = coingecko.CoinIndex(COINS, ASSET_PLATFORMS)
+    assert index.get_platform_id(137) == "polygon-pos"
+    assert index.get_coin_id("0xAaaa", "ethereum") == "dai"
+    assert index.get_coin_id("0xbbbb", "polygon-pos") == "dai"
+    with pytest.raises(ValueError):
+        index.get_coin_id("0xbbbb", "ethereum")
+    with pytest.raises(ValueError):
+        index.get_platform_id(42)
+
+
+def test_catalogue_cached_on_disk(fake_api, tmp_path):
+    assert coingecko.get_asset_platform_id(1) == "ethereum"
+    assert coingecko.get_coin_ids(["0xCCCC"], "ethereum") == ["usdc"]
+    assert (tmp_path / "coins.json").exists()
+    n_requests = len(fake_api)
+
+    coingecko.get_coin_index.cache_clear()
+    assert coingecko.get_coin_ids(["0xaaaa"], "ethereum") == ["dai"]
+    assert len(fake_api) == n_requests
+
+
+def test_coingecko_source(fake_api):
+    source = coingecko.CoingeckoSource()
+    prices = coingecko.get_prices(["0xaaaa", "0xcccc"], 1, source)
+    assert prices == {"0xaaaa": 1.0, "0xcccc": 0.99}
+    price_requests = [r for r in fake_api if r.startswith("simple/price")]
+    assert len(price_requests) == 1
+    n_requests = len(fake_api)
+
+    # Prices are cached per chain.
+    assert coingecko.get_prices(["0xcccc"], 1, source) == {"0xcccc": 0.99}
+    assert len(fake_api) == n_requests
+    assert coingecko.get_prices(["0xbbbb"], 137, source) == {"0xbbbb": 1.0}
+    assert fake_api[-1] == "simple/price?ids=dai&vs_currencies=usd"
+
+
+def test_json_file_source(tmp_path):
+    filename = tmp_path / "prices.json"
+    with open(filename, "w") as f:
+        json.dump({"1": {"0xAAAA": 1.0, "0xcccc": "0.99"}}, f)
+    source = coingecko.JsonFileSource(str(filename))
+    assert coingecko.get_prices(["0xaaaa", "0xCCCC"], 1, source) == {
+        "0xaaaa": 1.0,
+        "0xCCCC": 0.99,
+    }
+    with pytest.raises(ValueError):
+        source.get_prices(["0xaaaa"], 137)
@@ -0,0 +1,65 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from tests.support.columnar import (
+    ColumnarWriter,
+    iter_dataframes,
+    open_dataframe,
+    open_table,
+)
+
+
+def rows(n):
+    return [dict(error=i / 3, ix=i, ok=i % 2 == 0, label=f"r{i}") for i in range(n)]
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "errors.feather"
+    with ColumnarWriter(path, batch_size=4) as writer:
+        for row in rows(10):
+            writer.append(row)
+        assert writer.n_buffered == 2
+    expected = pd.DataFrame(rows(10))
+    assert writer.n_rows == 10
+    assert writer.schema.types == [pa.float64(), pa.int64(), pa.bool_(), pa.string()]
+    pd.testing.assert_frame_equal(open_dataframe(path), expected)
+    pd.testing.assert_frame_equal(pd.read_feather(path), expected)
+    assert open_table(path).column("error").num_chunks == 3
+    batches = list(iter_dataframes(path))
+    assert [len(df) for df in batches] == [4, 4, 2]
+    pd.testing.assert_frame_equal(
+        pd.concat(batches, ignore_index=True), expected, check_index_type=False
+    )
+    # Refers to the memory-mapped file
+    assert not batches[0]["error"].to_numpy().flags.writeable
+
+
+def test_explicit_schema(tmp_path):
+    path = tmp_path / "errors.feather"
+    with ColumnarWriter(path, schema={"error": pa.float32()}):
+        pass
+    assert open_table(path).schema == pa.schema([("error", pa.float32())])
+    assert len(open_dataframe(path)) == 0
+
+
+def test_invalid_rows(tmp_path):
+    with ColumnarWriter(tmp_path / "errors.feather") as writer:
+        with pytest.raises(TypeError):
+            writer.append(dict(error=object()))
+        writer.append(dict(error=1.0))
+        with pytest.raises(ValueError):
+            writer.append(dict(error=1.0, ix=1))
+    with pytest.raises(ValueError):
+        writer.append(dict(error=1.0))
+    assert open_table(tmp_path / "errors.feather").num_rows == 1
+
+
+def test_written_on_error(tmp_path):
+    path = tmp_path / "errors.feather"
+    with pytest.raises(RuntimeError):
+        with ColumnarWriter(path, batch_size=3) as writer:
+            for row in rows(5):
+                writer.append(row)
+            raise RuntimeError
+    assert open_table(path).num_rows == 5
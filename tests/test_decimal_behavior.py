@@ -5,6 +5,7 @@ import hypothesis.strategies as st
 from hypothesis import example, settings, assume
 from brownie.test import given
 
+from tests.support import quantized_decimal
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.utils import scale, qdecimals, unscale
 from math import floor, log2, log10, ceil
@@ -95,3 +96,63 @@ def test_sqrtNewtonInitialGuess(math_testing, a):
         assert result_sol == a_oom.sqrt()
     else:  # a in (0.1, 1)
         assert result_sol == a
+
+
+ONE = 10**18
+
+
+@given(
+    a=st.integers(min_value=0, max_value=10**40),
+    b=st.integers(min_value=0, max_value=10**40),
+)
+@example(a=0, b=1)
+@example(a=1, b=1)
+@example(a=ONE - 1, b=ONE + 1)
+def test_fixed_point_rounding(a, b):
+    # Mirrors mulDown / mulUp / divDown / divUp in GyroFixedPoint.sol on raw values.
+    x, y = D.from_raw(a), D.from_raw(b)
+    product = a * b
+    assert (x * y).raw_int == product // ONE
+    assert x.mul_up(y).raw_int == (0 if product == 0 else (product - 1) // ONE + 1)
+    if b == 0:
+        return
+    assert (x / y).raw_int == a * ONE // b
+    assert x.div_up(y).raw_int == (0 if a == 0 else (a * ONE - 1) // b + 1)
+
+
+@given(
+    a=st.integers(min_value=-(10**40), max_value=10**40),
+    b=st.integers(min_value=-(10**40), max_value=10**40),
+)
+def test_signed_fixed_point_rounding(a, b):
+    # Mirrors mulDownMag / mulUpMag / divDownMag / divUpMag in SignedFixedPoint.sol: down rounds towards zero, up
+    # rounds away from zero.
+    x, y = D.from_raw(a), D.from_raw(b)
+    sign = -1 if (a < 0) != (b < 0) else 1
+    product = abs(a * b)
+    assert (x * y).raw_int == sign * (product // ONE)
+    assert x.mul_up(y).raw_int == sign * -(-product // ONE)
+    if b == 0:
+        return
+    assert (x / y).raw_int == sign * (abs(a) * ONE // abs(b))
+    assert x.div_up(y).raw_int == sign * -(-abs(a) * ONE // abs(b))
+
+
+@given(a=qdecimals(-(10**20), 10**20), b=qdecimals(-(10**20), 10**20))
+def test_decimal_conversion_roundtrip(a, b):
+    assert D(a.raw) == a
+    assert D.from_raw(a.raw_int) == a
+    assert (a < b) == (a.raw < b.raw)
+    assert (a == b) == (a.raw == b.raw)
+    assert hash(a) == hash(a.raw)
+    assert (a + b).raw == a.raw + b.raw
+    assert (a - b).raw == a.raw - b.raw
+
+
+@given(a=qdecimals("0.01", 10**6), b=qdecimals(-3, 3))
+@example(a=D("0.9999"), b=D(1) / 3)
+def test_decimal_fractional_pow(a, b):
+    # Non-integer exponents are evaluated on the underlying Decimal, in the implementation's precision, and then
+    # truncated.
+    expected = quantized_decimal._POW_CONTEXT.power(a.raw, b.raw)
+    assert a**b == D(expected)
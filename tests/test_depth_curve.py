@@ -0,0 +1,163 @@
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+from brownie.test import given
+from hypothesis import assume
+
+import tests.g3clp.v3_math_implementation as math_implementation_3clp
+from tests.g2clp import math_vectorized as mv2
+from tests.geclp import eclp_numpy
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.test_eclp_prec_impl import bpool_params, gen_params
+from tests.support import depth_curve
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.util_common import gen_balances
+from tests.support.utils import qdecimals
+
+GRID = depth_curve.geometric_grid("0.001", 10**9, 40)
+
+
+def check_prices(curve, amount_curve, noise=lambda local: 1e-17):
+    """Post-trade prices are the slopes of the curve: the average price over a small trade lies between the prices
+    before and after it. `noise(local curve)` bounds the rounding error of the difference of its amounts out.
+    """
+    for amount_in, price in zip(curve.amounts_in, curve.prices):
+        if np.isnan(price):
+            continue
+        local = amount_curve(
+            depth_curve.geometric_grid(amount_in, amount_in * (1 + 1e-2), 2)
+        )
+        if np.isnan(local.amounts_out).any():
+            continue
+        delta_in = np.diff(local.amounts_in)[0]
+        slope = np.diff(local.amounts_out)[0] / delta_in
+        tolerance = noise(local) / delta_in
+        assert local.prices[1] * (1 - 1e-6) - tolerance <= slope
+        assert slope <= local.prices[0] * (1 + 1e-6) + tolerance
+
+
+def test_geometric_grid():
+    amounts = depth_curve.geometric_grid(1, 1000, 4).amounts()
+    assert amounts[0] == 1 and amounts[-1] == 1000
+    assert [float(a) for a in amounts] == pytest.approx([1, 10, 100, 1000])
+    assert depth_curve.geometric_grid(5, 5, 1).amounts() == (D(5),)
+    with pytest.raises(ValueError):
+        depth_curve.geometric_grid(0, 1, 2)
+    with pytest.raises(ValueError):
+        depth_curve.geometric_grid(2, 1, 2)
+
+
+@given(
+    balances=st.tuples(qdecimals(1, 10**11), qdecimals(1, 10**11)),
+    sqrt_alpha=qdecimals("0.02", "0.99995"),
+    sqrt_beta=qdecimals("1.00005", "1.8"),
+    token_in_is_token0=st.booleans(),
+)
+def test_2clp(balances, sqrt_alpha, sqrt_beta, token_in_is_token0):
+    curve = depth_curve.depth_curve_2clp(
+        balances, sqrt_alpha, sqrt_beta, token_in_is_token0, GRID
+    )
+    xs, ys = ([b.raw_int] for b in balances)
+    expected = mv2.quoteOutGivenIn(
+        (xs * len(GRID.amounts()), ys * len(GRID.amounts())),
+        [a.raw_int for a in GRID.amounts()],
+        token_in_is_token0,
+        sqrt_alpha.raw_int,
+        sqrt_beta.raw_int,
+    )
+    for amount_out, exact in zip(curve.amounts_out, expected):
+        if exact is None:
+            assert np.isnan(amount_out)
+        else:
+            assert amount_out == float(D.from_raw(exact))
+    # Prices fall as the amount in grows.
+    prices = curve.prices[~np.isnan(curve.prices)]
+    assert np.all(np.diff(prices) <= 0)
+    assert prices.size == 0 or prices[0] <= curve.spot_price
+    check_prices(
+        curve,
+        lambda grid: depth_curve.depth_curve_2clp(
+            balances, sqrt_alpha, sqrt_beta, token_in_is_token0, grid
+        ),
+    )
+
+
+@given(
+    balances=st.tuples(*[qdecimals(1, 10**11)] * 3),
+    root3_alpha=qdecimals("0.2", "0.99996666555"),
+    ixs=st.permutations([0, 1, 2]),
+)
+def test_3clp(balances, root3_alpha, ixs):
+    ix_in, ix_out = ixs[:2]
+    curve = depth_curve.depth_curve_3clp(balances, root3_alpha, ix_in, ix_out, GRID)
+    invariant = math_implementation_3clp.calculateInvariant(balances, root3_alpha)
+    virtual_offset = invariant * root3_alpha
+    for amount_in, amount_out in zip(GRID.amounts(), curve.amounts_out):
+        # The math implementation rounds the final division up, the contract rounds it down, and the invariant may
+        # differ in the last digits.
+        expected = math_implementation_3clp.calcOutGivenIn(
+            balances[ix_in], balances[ix_out], amount_in, virtual_offset
+        )
+        if np.isnan(amount_out):
+            assert expected > balances[ix_out] * (1 - D("1e-15"))
+        else:
+            assert amount_out == pytest.approx(float(expected), rel=1e-12, abs=1e-17)
+    check_prices(
+        curve,
+        lambda grid: depth_curve.depth_curve_3clp(
+            balances, root3_alpha, ix_in, ix_out, grid
+        ),
+    )
+
+
+@given(
+    params=gen_params(),
+    balances=gen_balances(2, bpool_params),
+    token_in_is_token0=st.booleans(),
+)
+def test_eclp(params, balances, token_in_is_token0):
+    assume(balances[0] > 0 and balances[1] > 0)
+    derived = prec_impl.calc_derived_values(params)
+    curve = depth_curve.depth_curve_eclp(
+        balances, params, token_in_is_token0, GRID, derived
+    )
+    invariant, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    r = (invariant + 2 * D(err), invariant)
+    for amount_in, amount_out in zip(GRID.amounts(), curve.amounts_out):
+        expected = prec_impl.calcOutGivenIn(
+            balances, amount_in, token_in_is_token0, params, derived, r
+        )
+        if expected is None:
+            assert np.isnan(amount_out)
+        else:
+            assert amount_out == float(expected)
+
+    # The rounding errors of the prec implementation grow with l^2 and can dominate the slope for large l.
+    fp = eclp_numpy.float_params(params, derived)
+
+    def noise(local):
+        quotes = eclp_numpy.calc_out_given_in(
+            [balances] * 2, local.amounts_in, token_in_is_token0, fp
+        )
+        return quotes.errors.sum()
+
+    check_prices(
+        curve,
+        lambda grid: depth_curve.depth_curve_eclp(
+            balances, params, token_in_is_token0, grid, derived
+        ),
+        noise,
+    )
+
+
+def test_cached():
+    c = s = D("0.5").sqrt()
+    params = prec_impl.Params(D("0.97"), D("1.02"), c, s, D("2"))
+    balances = (D(100), D(100))
+    curve = depth_curve.depth_curve_eclp(balances, params, True, GRID)
+    assert depth_curve.depth_curve_eclp(balances, params, True, GRID) is curve
+    assert depth_curve.depth_curve_eclp(balances, params, False, GRID) is not curve
+    with pytest.raises(ValueError):
+        curve.amounts_out[0] = 0
+    depth_curve.clear_cache()
+    assert depth_curve.depth_curve_eclp(balances, params, True, GRID) is not curve
@@ -0,0 +1,75 @@
+from tests.support.gas_benchmark import (
+    Change,
+    ScenarioResult,
+    compare,
+    format_comparison,
+    load_results,
+    save_results,
+)
+from tests.support.trace_analyzer import FunctionGas
+
+BASELINE = {
+    "1: Join": ScenarioResult(
+        200_000,
+        {
+            "Pool.onJoinPool": FunctionGas(1, 50_000),
+            "Math.calc": FunctionGas(2, 10_000),
+        },
+    ),
+    "2: Swap": ScenarioResult(80_000),
+}
+
+
+def test_results_roundtrip(tmp_path):
+    save_results(tmp_path / "results.json", BASELINE)
+    assert load_results(tmp_path / "results.json") == BASELINE
+
+
+def test_compare_within_tolerance():
+    results = {
+        "1: Join": ScenarioResult(
+            200_040,
+            {
+                "Pool.onJoinPool": FunctionGas(1, 50_200),
+                "Math.calc": FunctionGas(2, 10_000),
+            },
+        ),
+        "2: Swap": ScenarioResult(79_800),
+    }
+    comparison = compare(results, BASELINE, rel_tolerance=0.005, abs_tolerance=50)
+    assert comparison.changes == []
+    assert not comparison.failed
+    assert format_comparison(comparison) == "No significant changes."
+
+
+def test_compare_regressions():
+    results = {
+        "1: Join": ScenarioResult(
+            199_000,
+            {
+                "Pool.onJoinPool": FunctionGas(1, 49_000),
+                "Math.calc": FunctionGas(2, 10_100),
+                "Math.other": FunctionGas(1, 1_000),
+            },
+        ),
+    }
+    comparison = compare(results, BASELINE, rel_tolerance=0.001, abs_tolerance=50)
+    assert comparison.regressions == [Change("1: Join", "Math.calc", 10_000, 10_100)]
+    assert comparison.improvements == [
+        Change("1: Join", "gas_used", 200_000, 199_000),
+        Change("1: Join", "Pool.onJoinPool", 50_000, 49_000),
+    ]
+    assert comparison.missing_scenarios == ["2: Swap"]
+    assert comparison.new_functions == [("1: Join", "Math.other")]
+    assert comparison.failed
+    assert "Missing scenario: 2: Swap" in format_comparison(comparison)
+
+
+def test_compare_without_traces():
+    # Functions aren't compared if the tracer failed on either side.
+    results = {
+        "1: Join": ScenarioResult(200_000),
+        "2: Swap": ScenarioResult(80_000, {"Pool.onSwap": FunctionGas(1, 30_000)}),
+    }
+    comparison = compare(results, BASELINE)
+    assert comparison == ([], [], [], [])
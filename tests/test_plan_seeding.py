@@ -0,0 +1,149 @@
+import json
+from decimal import Decimal
+
+import pytest
+from brownie import ZERO_ADDRESS
+
+from scripts import coingecko, plan_seeding, rate_providers
+from scripts.constants import TOKEN_ADDRESSES
+
+ADDRESSES = TOKEN_ADDRESSES[1]
+
+
+@pytest.fixture
+def fixed_prices():
+    prices = {ADDRESSES[t]: 1.0 for t in ("GYD", "USDC", "USDT", "DAI")}
+    coingecko.set_default_source(coingecko.FixedPriceSource({1: prices}))
+    yield prices
+    coingecko.set_default_source(None)
+
+
+def test_load_pool_configs():
+    pool_configs = plan_seeding.load_pool_configs(plan_seeding.POOL_CONFIG_DIR, 1)
+    assert "eclp-gyd-usdc-mainnet" in pool_configs
+    assert all(t in ADDRESSES for cfg in pool_configs.values() for t in cfg["tokens"])
+
+
+def test_pool_config_rates_mainnet(monkeypatch):
+    # All configs in one batch, as in plan_seeding.main(). Rates are read on a fork, so only the rate provider
+    # addresses are checked here.
+    pool_configs = plan_seeding.load_pool_configs(plan_seeding.POOL_CONFIG_DIR, 1)
+    read = []
+
+    def read_rates(addresses, ttl):
+        addresses = list(addresses)
+        read.extend(addresses)
+        return {a: Decimal(2) for a in addresses}
+
+    monkeypatch.setattr(rate_providers, "read_rates", read_rates)
+    rates = rate_providers.get_pool_config_rates(list(pool_configs.values()))
+    assert [len(r) for r in rates] == [
+        len(cfg["tokens"]) for cfg in pool_configs.values()
+    ]
+    assert ZERO_ADDRESS not in read
+    by_name = dict(zip(pool_configs, rates))
+    assert by_name["eclp-gyd-sdai-mainnet"] == [Decimal(1), Decimal(2)]
+    # rate_providers given as a list
+    assert by_name["test-const-scaled-eclp-tusd-usdc"] == [Decimal(2), Decimal(1)]
+
+
+@pytest.mark.parametrize("chain_id", plan_seeding.NETWORK_SUFFIXES)
+def test_load_pool_configs_other_networks(chain_id):
+    pool_configs = plan_seeding.load_pool_configs(
+        plan_seeding.POOL_CONFIG_DIR, chain_id
+    )
+    for name in pool_configs:
+        for other_chain_id, suffix in plan_seeding.NETWORK_SUFFIXES.items():
+            if other_chain_id != chain_id:
+                assert not name.endswith(f"-{suffix}")
+
+
+def test_load_pool_configs_skips_other_networks():
+    arbitrum = plan_seeding.load_pool_configs(plan_seeding.POOL_CONFIG_DIR, 42161)
+    assert "eclp-sfrax-frax-arbitrum" in arbitrum
+    assert "eclp-sfrax-frax-optimism" not in arbitrum
+    assert "eclp-wsteth-reth-mainnet" not in arbitrum
+    mainnet = plan_seeding.load_pool_configs(plan_seeding.POOL_CONFIG_DIR, 1)
+    assert "eclp-usdc-usdt-arbitrum" not in mainnet
+    assert "eclp-weth-reth-zkevm" not in mainnet
+
+
+@pytest.mark.parametrize(
+    "name,chain_id,filename",
+    [
+        ("eclp-gyd-usdc-mainnet", 1, "eclp-gyd-usdc-mainnet.json"),
+        ("eclp-matic-maticx", 137, "eclp-matic-maticx-polygon.json"),
+        # Without the network suffix
+        ("eclp-bootstrapping-gyd-sdai", 1, "eclp-bootstrapping-gyd-sdai.json"),
+        ("2clp-connector-tvadaiv2-dai", 137, "2clp-connector-tvadaiv2-dai.json"),
+        ("2clp-test-weth-wsteth", 1, "2clp-test-weth-wsteth.json"),
+        ("eclp-usdt-usdc", 1, None),
+    ],
+)
+def test_existing_seed_data(name, chain_id, filename):
+    path = plan_seeding.existing_seed_data(plan_seeding.SEED_DATA_DIR, name, chain_id)
+    if filename is None:
+        assert path is None
+    else:
+        assert path == plan_seeding.SEED_DATA_DIR / filename
+
+
+def test_seed_data_path(tmp_path):
+    path = plan_seeding.seed_data_path(tmp_path, "eclp-gyd-usdc-mainnet", 1)
+    assert path == tmp_path / "eclp-gyd-usdc-mainnet.json"
+    path = plan_seeding.seed_data_path(tmp_path, "eclp-matic-maticx", 137)
+    assert path == tmp_path / "eclp-matic-maticx-polygon.json"
+
+
+def test_price_addresses(monkeypatch):
+    pool_config = {"pool_type": "eclp", "tokens": ["GYD", "USDC"]}
+    assert plan_seeding.price_addresses(pool_config, 1) == [
+        ADDRESSES["GYD"],
+        ADDRESSES["USDC"],
+    ]
+    monkeypatch.setenv("PRICE_GYD", "1")
+    monkeypatch.setenv("PRICE_USDC_VIA_RATE", "USDT")
+    assert plan_seeding.price_addresses(pool_config, 1) == [ADDRESSES["USDT"]]
+
+
+# Tokens sorted by address on mainnet
+THREE_CLP_CONFIG = {
+    "pool_type": "3clp",
+    "tokens": ["DAI", "USDC", "USDT"],
+    "root_3_alpha": "0.99967",
+}
+TWO_CLP_CONFIG = {
+    "pool_type": "2clp",
+    "tokens": ["USDT", "USDC"],
+    "bounds": ["0.999", "1.001"],
+}
+
+
+@pytest.mark.parametrize(
+    "pool_config",
+    [
+        "eclp-gyd-usdc-mainnet",
+        THREE_CLP_CONFIG,
+        # Configured with sqrts, which compute_supply.py doesn't support
+        TWO_CLP_CONFIG,
+    ],
+)
+def test_run_job(pool_config, fixed_prices, tmp_path):
+    if isinstance(pool_config, str):
+        with open(plan_seeding.POOL_CONFIG_DIR / f"{pool_config}.json") as f:
+            pool_config = json.load(f)
+    output = tmp_path / "seed.json"
+    rates = [Decimal(1)] * len(pool_config["tokens"])
+    job = plan_seeding.SeedJob("seed", pool_config, rates, output)
+    assert plan_seeding.run_job(job, 1) is None
+    with open(output) as f:
+        result = json.load(f)
+    assert set(result["amounts"]) == {ADDRESSES[t] for t in pool_config["tokens"]}
+    assert result["price_bpt"] == pytest.approx(1.0)
+
+
+def test_run_job_failure(fixed_prices, tmp_path):
+    pool_config = {"pool_type": "eclp", "tokens": ["GYD", "WETH"]}
+    job = plan_seeding.SeedJob("x", pool_config, [Decimal(1)] * 2, tmp_path / "x")
+    assert plan_seeding.run_job(job, 1) is not None
+    assert not (tmp_path / "x").exists()
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+from brownie import ZERO_ADDRESS
+
+from scripts import rate_providers
+from tests.support.utils import scale
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_cache():
+    # Addresses repeat across tests because of chain isolation.
+    rate_providers.clear_rate_cache()
+    yield
+    rate_providers.clear_rate_cache()
+
+
+@pytest.fixture
+def mock_rate_providers(admin, MockRateProvider):
+    ret = []
+    for rate in ("1.5", "0.5", "2.25"):
+        c = admin.deploy(MockRateProvider)
+        c.mockRate(scale(rate))
+        ret.append(c)
+    return ret
+
+
+def test_get_rates(mock_rate_providers):
+    a, b, _ = (c.address for c in mock_rate_providers)
+    rates = rate_providers.get_rates([a, None, b, a])
+    assert rates == [Decimal("1.5"), Decimal(1), Decimal("0.5"), Decimal("1.5")]
+
+
+def test_get_pool_config_rates(mock_rate_providers):
+    a, b, c = (c.address for c in mock_rate_providers)
+    pool_configs = [
+        {"tokens": ["X", "Y"], "rate_providers": {"Y": a}},
+        {"tokens": ["X", "Y", "Z"], "rate_providers": {"X": b, "Z": c}},
+        {"tokens": ["X", "Y"]},
+        # List form, in token order
+        {"tokens": ["X", "Y"], "rate_providers": [ZERO_ADDRESS, c]},
+    ]
+    assert rate_providers.get_pool_config_rates(pool_configs) == [
+        [Decimal(1), Decimal("1.5")],
+        [Decimal("0.5"), Decimal(1), Decimal("2.25")],
+        [Decimal(1), Decimal(1)],
+        [Decimal(1), Decimal("2.25")],
+    ]
+
+
+def test_batches(mock_rate_providers, monkeypatch):
+    monkeypatch.setattr(rate_providers, "MULTICALL_BATCH_SIZE", 2)
+    addresses = [c.address for c in mock_rate_providers]
+    rates = rate_providers.read_rates(addresses)
+    assert rates == dict(
+        zip(addresses, [Decimal("1.5"), Decimal("0.5"), Decimal("2.25")])
+    )
+
+
+def test_cache(mock_rate_providers):
+    provider = mock_rate_providers[0]
+    assert rate_providers.get_rates([provider.address]) == [Decimal("1.5")]
+    provider.mockRate(scale("3"))
+    # Still cached
+    assert rate_providers.get_rates([provider.address]) == [Decimal("1.5")]
+    assert rate_providers.get_rates([provider.address], ttl=0) == [Decimal(3)]
+    provider.mockRate(scale("4"))
+    rate_providers.clear_rate_cache()
+    assert rate_providers.get_rates([provider.address]) == [Decimal(4)]
+
+
+def test_failed_call(admin, SimpleERC20):
+    # Not a rate provider. (Calls to an EOA wouldn't fail, but return no data.)
+    token = admin.deploy(SimpleERC20)
+    with pytest.raises(ValueError):
+        rate_providers.get_rates([token.address])
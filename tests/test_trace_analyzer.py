@@ -0,0 +1,370 @@
+import json
+
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+from brownie.test import given
+
+from tests.support.trace_analyzer import (
+    CallType,
+    Context,
+    ContractDefinition,
+    DefinitionIndex,
+    FunctionDefinition,
+    FunctionGas,
+    JumpType,
+    Location,
+    SourceCache,
+    SourceData,
+    SourceMap,
+    Sources,
+    GasProfile,
+    MEMORY_EXPANSION,
+    Tracer,
+    compute_pc_mapping,
+    iter_struct_logs,
+    merge_contexts,
+    normalize_address,
+    parse_source_map,
+)
+
+JUMPDEST = 0x5B
+# 20 lines of 10 characters each
+CONTENT = "".join(f"{i:09d}\n" for i in range(20))
+
+# Pool spans [0, 200), with functions f = [10, 50) and g = [60, 100)
+POOL = ContractDefinition(name="Pool", location=Location("0", 0, 200))
+FUNCTIONS = [
+    FunctionDefinition(name="f", contract_name="Pool", location=Location("0", 10, 40)),
+    FunctionDefinition(name="g", contract_name="Pool", location=Location("0", 60, 40)),
+]
+
+# (op, location of the instruction, gas left before it)
+STEPS = [
+    ("PUSH1", Location("0", 12, 2), 1000),
+    ("JUMP", Location("0", 14, 2, JumpType.In), 990),
+    ("JUMPDEST", Location("0", 70, 5), 980),
+    ("JUMP", Location("0", 75, 5, JumpType.Out), 970),
+    ("JUMPDEST", Location("0", 16, 2), 960),
+    ("RETURN", Location("0", 18, 2), 950),
+]
+
+
+def make_source(
+    steps=STEPS, index="0", contracts=(POOL,), functions=FUNCTIONS
+) -> SourceData:
+    # Only single-byte instructions, so that pc == instruction index.
+    bytecode = bytes([JUMPDEST] * len(steps))
+    return SourceData(
+        path=f"contracts/{contracts[0].name}.sol",
+        index=index,
+        contracts=list(contracts),
+        functions=list(functions),
+        instruction_mapping=np.arange(len(bytecode), dtype=np.int32),
+        content=CONTENT,
+        source_map=SourceMap.from_locations([location for _, location, _ in steps]),
+        bytecode=bytecode,
+    )
+
+
+def make_traces(steps=STEPS):
+    # gasCost is only correct within a call frame, adjust where needed.
+    return [
+        {
+            "pc": pc,
+            "op": op,
+            "gas": gas,
+            "gasCost": gas - steps[pc + 1][2] if pc + 1 < len(steps) else 0,
+            "stack": [],
+        }
+        for pc, (op, _, gas) in enumerate(steps)
+    ]
+
+
+def linear_find(definitions, location):
+    for definition in definitions:
+        if location.is_within(definition.location):
+            return definition
+
+
+@given(
+    lengths=st.lists(st.tuples(st.integers(0, 20), st.integers(1, 20)), max_size=20),
+    offset=st.integers(0, 500),
+    length=st.integers(0, 30),
+)
+def test_definition_index_matches_linear_scan(lengths, offset, length):
+    definitions, end = [], 0
+    for i, (gap, definition_length) in enumerate(lengths):
+        definitions.append(
+            FunctionDefinition(
+                name=f"f{i}",
+                contract_name="C",
+                location=Location("0", end + gap, definition_length),
+            )
+        )
+        end += gap + definition_length
+    location = Location("0", offset, length)
+    assert DefinitionIndex(definitions[::-1]).find(location) == linear_find(
+        definitions, location
+    )
+
+
+def test_sources_lookups():
+    source = make_source()
+    sources = Sources({"0": source})
+    assert sources.find_contract("Pool") is source
+    assert sources.get_location_contract(Location("0", 120, 3)) == POOL
+    assert sources.get_location_function(Location("0", 120, 3)) is None
+    assert sources.get_location_function(Location("0", 45, 10)) is None
+    assert sources.get_location_function(Location("-1", 12, 2)) is None
+    for pc, (_, location, _) in enumerate(STEPS):
+        assert sources.get_pc_function(source, pc) == linear_find(FUNCTIONS, location)
+
+
+@pytest.mark.parametrize("as_iterator", [False, True])
+def test_trace_internal_call(as_iterator):
+    tracer = Tracer(Sources({"0": make_source()}), {})
+    traces = make_traces()
+    context = tracer.trace("Pool", iter(traces) if as_iterator else traces)
+
+    assert context.qualified_function_name == "Pool.f"
+    assert context.total_gas_consumed == 50
+    ((call_type, child),) = context.children
+    assert call_type == CallType.INTERNAL
+    assert child.qualified_function_name == "Pool.g"
+    assert child.total_gas_consumed == 20
+    assert context.gas_consumed == 30
+    assert context.gas_by_function() == {
+        "Pool.f": FunctionGas(1, 50),
+        "Pool.g": FunctionGas(1, 20),
+    }
+
+
+def test_merge_contexts():
+    tracer = Tracer(Sources({"0": make_source()}), {})
+    context = tracer.trace("Pool", make_traces())
+    # Same structure, but Pool.g is called twice and costs more
+    other = tracer.trace("Pool", make_traces())
+    other.initial_gas += 100
+    other.children[0][1].initial_gas += 10
+    other.children.append((CallType.INTERNAL, Context("Pool", "g", 500, 480)))
+    other.children.append((CallType.INTERNAL, Context("Pool", "h", 400, 0)))
+
+    merged = merge_contexts([context, other])
+    assert merged.qualified_function_name == "Pool.f"
+    assert merged.total_gas_consumed == 50 + 150
+    assert [
+        (call_type, child.qualified_function_name, child.total_gas_consumed)
+        for call_type, child in merged.children
+    ] == [
+        (CallType.INTERNAL, "Pool.g", 20 + 30),
+        (CallType.INTERNAL, "Pool.g", 20),
+        (CallType.INTERNAL, "Pool.h", 0),
+    ]
+    assert merged.gas_by_function() == {
+        "Pool.f": FunctionGas(1, 200),
+        "Pool.g": FunctionGas(2, 70),
+        "Pool.h": FunctionGas(1, 0),
+    }
+
+
+@given(bytecode=st.binary(max_size=200))
+def test_compute_pc_mapping(bytecode):
+    expected = np.full(len(bytecode), -1)
+    instruction_index, pc = 0, 0
+    while pc < len(bytecode):
+        expected[pc] = instruction_index
+        instruction_index += 1
+        if 0x60 <= bytecode[pc] <= 0x7F:  # PUSH1 - PUSH32
+            pc += bytecode[pc] - 0x60 + 1
+        pc += 1
+    assert compute_pc_mapping(bytecode).tolist() == expected.tolist()
+
+
+source_map_fields = st.tuples(
+    st.sampled_from(["", "0", "17", "1234"]),
+    st.sampled_from(["", "0", "5"]),
+    st.sampled_from(["", "0", "1", "-1"]),
+    st.sampled_from(["", "i", "o", "-"]),
+    st.sampled_from(["", "0", "2"]),
+)
+
+
+@given(
+    first=source_map_fields.filter(all),
+    entries=st.lists(st.tuples(source_map_fields, st.integers(0, 5)), max_size=30),
+)
+def test_parse_source_map(first, entries):
+    # Trailing fields can be omitted as well as left empty.
+    raw = [":".join(first)] + [":".join(fields[:n]) for fields, n in entries]
+    expected, previous = [], None
+    for entry in raw:
+        previous = Location.from_raw_bytecode(entry, previous)
+        expected.append(previous)
+    source_map = parse_source_map(raw)
+    assert [source_map[i] for i in range(len(source_map))] == expected
+    assert source_map == SourceMap.from_locations(expected)
+
+
+def test_source_data_save_load(tmp_path):
+    source = make_source()
+    source.content = "contract Pool {}"
+    source.bytecode = bytes([0x60, 0x01]) + source.bytecode[2:]  # PUSH1 0x01
+    source.instruction_mapping = compute_pc_mapping(source.bytecode)
+    source.save(tmp_path / "source.npz")
+
+    loaded = SourceData.load(tmp_path / "source.npz")
+    assert loaded == source
+
+
+def test_source_cache(tmp_path):
+    source_file = tmp_path / "Pool.sol"
+    source_file.write_text("contract Pool { function f() {} }")
+    build_file = tmp_path / "Pool.json"
+    build_file.write_text(
+        json.dumps(
+            {
+                "sourcePath": str(source_file),
+                "deployedBytecode": "0x6001600201",  # PUSH1 1 PUSH1 2 ADD
+                "deployedSourceMap": "0:33:0:-:0;16:15;:::i",
+                "ast": {
+                    "nodeType": "SourceUnit",
+                    "src": "0:33:0",
+                    "nodes": [
+                        {
+                            "nodeType": "ContractDefinition",
+                            "name": "Pool",
+                            "src": "0:33:0",
+                            "nodes": [
+                                {
+                                    "nodeType": "FunctionDefinition",
+                                    "name": "f",
+                                    "src": "16:15:0",
+                                }
+                            ],
+                        }
+                    ],
+                },
+            }
+        )
+    )
+    expected = SourceData.from_build(json.loads(build_file.read_text()))
+
+    cache = SourceCache(tmp_path / "cache")
+    cached = cache.get(build_file)
+    assert (cached.index, cached.contract_names) == ("0", ["Pool"])
+    assert cached.load() == expected
+    cache.flush()
+
+    # Second run: served from the index without parsing the build file.
+    cache = SourceCache(tmp_path / "cache")
+    assert not cache._dirty
+    cached = cache.get(build_file)
+    assert not cache._dirty
+    assert (cached.index, cached.contract_names) == ("0", ["Pool"])
+    assert cached.load() == expected
+    assert cached.load().get_pc_location(4) == Location("0", 16, 15, JumpType.In)
+
+
+@given(chunk_size=st.integers(1, 300), trim_size=st.integers(0, 100))
+def test_iter_struct_logs(chunk_size, trim_size):
+    traces = make_traces()
+    traces[1]["stack"] = ["0" * 64, "ff" * 32]
+    response = json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": {"gas": 50, "failed": False, "structLogs": traces},
+        },
+        indent=1,
+    ).encode()
+    chunks = [response[i : i + chunk_size] for i in range(0, len(response), chunk_size)]
+    assert list(iter_struct_logs(chunks, trim_size)) == traces
+
+    with pytest.raises(ValueError):
+        list(iter_struct_logs([response[: len(response) // 2]]))
+    with pytest.raises(ValueError):
+        list(iter_struct_logs([b'{"jsonrpc": "2.0", "id": 1, "error": {}}']))
+
+
+def test_gas_profile_internal_call():
+    source = make_source()
+    tracer = Tracer(Sources({"0": source}), {})
+    profile = GasProfile()
+    context = tracer.trace("Pool", make_traces(), profile=profile)
+
+    assert profile.total_gas == context.total_gas_consumed == 50
+    assert profile.by_function() == {"Pool.f": 30, "Pool.g": 20}
+    assert profile.by_line() == {
+        ("contracts/Pool.sol", 2): 30,
+        ("contracts/Pool.sol", 8): 20,
+    }
+    assert profile.by_opcode() == {"JUMP": 20, "JUMPDEST": 20, "PUSH1": 10, "RETURN": 0}
+    assert profile.by_opcode_class() == {"control flow": 40, "stack": 10, "calls": 0}
+    assert profile.collapsed_stacks() == ["Pool.f 30", "Pool.f;Pool.g 20"]
+    assert profile.collapsed_stacks(leaf="line") == [
+        "Pool.f;Pool.g;contracts/Pool.sol:8 20",
+        "Pool.f;contracts/Pool.sol:2 30",
+    ]
+
+    heatmap = profile.format_line_heatmap(source).splitlines()
+    assert len(heatmap) == 20
+    assert heatmap[1] == f"{30:>10} {'█' * 20}     2 | 000000001"
+    assert heatmap[7] == f"{20:>10} {'█' * 13:<20}     8 | 000000007"
+    assert heatmap[0] == f"{'':>31}     1 | 000000000"
+
+
+def test_gas_profile_external_call():
+    # Pool.f calls Other.h, which spans [100, 150) in source 1
+    other = ContractDefinition(name="Other", location=Location("1", 0, 200))
+    other_functions = [
+        FunctionDefinition(
+            name="h", contract_name="Other", location=Location("1", 100, 50)
+        )
+    ]
+    other_steps = [
+        ("PUSH1", Location("1", 110, 2), 900),
+        ("RETURN", Location("1", 120, 2), 897),
+    ]
+    pool_steps = [
+        ("PUSH1", Location("0", 12, 2), 1000),
+        ("CALL", Location("0", 14, 2), 997),
+        ("JUMPDEST", Location("0", 16, 2), 880),
+        ("RETURN", Location("0", 18, 2), 879),
+    ]
+    sources = Sources(
+        {
+            "0": make_source(pool_steps),
+            "1": make_source(other_steps, "1", [other], other_functions),
+        }
+    )
+    other_address = "0x" + "11" * 20
+    tracer = Tracer(sources, {"Other": [normalize_address(other_address[2:])]})
+
+    traces = make_traces(pool_steps)
+    callee_traces = make_traces(other_steps)
+    traces[1]["stack"] = [other_address[2:].zfill(64), "0"]
+    traces[1]["gasCost"] = 97 + 900  # includes the gas sent along
+    traces[1:2] = [traces[1], *callee_traces]
+    profile = GasProfile()
+    context = tracer.trace("Pool", traces, profile=profile)
+
+    assert profile.total_gas == context.total_gas_consumed == 121
+    # 997 - 880 gas for the call, of which 3 are used by Other.h
+    assert profile.by_opcode() == {"CALL": 114, "PUSH1": 6, "JUMPDEST": 1, "RETURN": 0}
+    assert profile.collapsed_stacks() == ["Pool.f 118", "Pool.f;Other.h 3"]
+    ((_, callee),) = context.children
+    assert callee.qualified_function_name == "Other.h"
+
+
+def test_gas_profile_memory_expansion():
+    profile = GasProfile()
+    profile.add(("C.f",), ("C.sol", 1), "MSTORE", 3)
+    profile.add(("C.f",), ("C.sol", 1), "MSTORE", 9)
+    profile.add(("C.f",), ("C.sol", 2), "MLOAD", 3)
+    assert profile.by_opcode() == {"MSTORE": 6, MEMORY_EXPANSION: 6, "MLOAD": 3}
+    assert profile.by_opcode_class() == {"memory": 9, "memory expansion": 6}
+    assert profile.by_line() == {("C.sol", 1): 12, ("C.sol", 2): 3}
+
+    profile.update(profile)
+    assert profile.by_opcode() == {"MSTORE": 12, MEMORY_EXPANSION: 12, "MLOAD": 6}